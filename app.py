@@ -1,17 +1,35 @@
-from flask import Flask, request, jsonify, make_response, url_for
+from flask import Flask, request, jsonify, make_response, url_for, g
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
+import click
 from blueprints.admin import admin_bp
-from blueprints.auth import auth_bp
+from blueprints.auth import auth_bp, password_hasher
 import os
+import itertools
+import time
 from datetime import datetime
-import markdown
-import yaml
-from collections import defaultdict
-import feedgenerator
 import json
 from urllib.parse import urljoin
 from dotenv import load_dotenv
-from utils.jwt_utils import verify_token, admin_required, user_required
+from utils.jwt_utils import get_current_claims, admin_required, user_required
+from utils.post_catalog import PostCatalog
+from utils.content_watcher import ContentWatcher
+from utils import post_query
+from utils.http_cache import conditional
+from utils.compression import CompressedResponseCache
+from utils.settings_store import SettingsStore
+from utils.category_store import CategoryStore, CategoryExists
+from utils.streaming import stream_format, stream_records
+from utils.json_fragments import FragmentCache
+from utils.markdown_renderer import MarkdownRenderer
+from utils.sqlite_catalog import SqliteCatalog
+from utils.index_snapshot import SnapshotCatalog
+from utils.facet_index import FacetIndex, post_tags, post_category, post_month
+from utils.static_export import export_site
+from utils.post_writer import render_post, create_post_file, replace_post_file, post_lock
+from utils.bulk_edit import BulkJobs, replace_tags, replace_category
+from utils.feeds import FeedCache, FEED_FORMATS, render_feed
+from utils.search_index import SearchIndex, plain_text, make_snippet, highlight, query_terms
 
 # 加载环境变量
 load_dotenv()
@@ -21,13 +39,19 @@ SECRET_KEY = os.getenv('FLASK_SECRET_KEY', 'dev-secret-key')
 app = Flask(__name__)
 app.secret_key = SECRET_KEY
 
+# 部署在反向代理之后时，信任的代理层数；大于 0 时从 X-Forwarded-For / X-Forwarded-Proto 取客户端地址与协议，
+# 否则 request.remote_addr 是代理的地址，按 IP 限流会把所有客户端算作同一个
+app.config['TRUSTED_PROXIES'] = int(os.getenv('TRUSTED_PROXIES', '0'))
+if app.config['TRUSTED_PROXIES'] > 0:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['TRUSTED_PROXIES'], x_proto=app.config['TRUSTED_PROXIES'])
+
 # 配置 CORS
 CORS(app, resources={
     r"/api/*": {
         "origins": ["*"],  # 在生产环境中应该设置具体的域名
         "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
         "allow_headers": ["Content-Type", "Authorization"],
-        "expose_headers": ["Content-Length"],
+        "expose_headers": ["Content-Length", "ETag", "Last-Modified"],
         "supports_credentials": True
     }
 })
@@ -47,28 +71,172 @@ app.config['GISCUS'] = {
 }
 app.config['DEBUG_GISCUS'] = True
 
+# 文章列表分页
+app.config['POSTS_PER_PAGE'] = int(os.getenv('POSTS_PER_PAGE', '20'))
+app.config['POSTS_MAX_PER_PAGE'] = int(os.getenv('POSTS_MAX_PER_PAGE', '100'))
+# POST /api/posts/batch 单次最多导入的文章数
+app.config['POSTS_BATCH_MAX'] = int(os.getenv('POSTS_BATCH_MAX', '500'))
+
+# Markdown 渲染缓存：进程内 LRU + instance/ 下的磁盘缓存（多 worker 共享）
+app.config['RENDER_CACHE_DIR'] = os.getenv('RENDER_CACHE_DIR', os.path.join(app.instance_path, 'render_cache'))
+app.config['RENDER_CACHE_SIZE'] = int(os.getenv('RENDER_CACHE_SIZE', '512'))
+# 磁盘缓存的总大小上限，超出后按最近使用时间淘汰，0 为不限
+app.config['RENDER_CACHE_DISK_BYTES'] = int(os.getenv('RENDER_CACHE_DISK_BYTES', str(256 * 1024 * 1024)))
+markdown_renderer = MarkdownRenderer(
+    cache_dir=app.config['RENDER_CACHE_DIR'],
+    max_entries=app.config['RENDER_CACHE_SIZE'],
+    disk_max_bytes=app.config['RENDER_CACHE_DISK_BYTES']
+)
+
+# 订阅：默认条数与 ?limit= 上限；渲染结果按格式、根 URL、标签与条数缓存，文章变化后才重新生成
+app.config['FEED_ITEMS'] = int(os.getenv('FEED_ITEMS', '10'))
+app.config['FEED_MAX_ITEMS'] = int(os.getenv('FEED_MAX_ITEMS', '50'))
+feed_cache = FeedCache()
+
+# 公开只读接口的 Cache-Control，ETag / Last-Modified 由文章目录摘要生成
+app.config['PUBLIC_CACHE_CONTROL'] = os.getenv('PUBLIC_CACHE_CONTROL', 'public, max-age=60')
+
+# 公开只读接口按 Accept-Encoding 返回 gzip（安装 brotli 时优先 br），压缩结果按 ETag 缓存；
+# 小于 COMPRESS_MIN_SIZE 字节的响应不压缩，COMPRESS_CACHE_BYTES 为 0 时关闭
+app.config['COMPRESS_MIN_SIZE'] = int(os.getenv('COMPRESS_MIN_SIZE', '1024'))
+app.config['COMPRESS_CACHE_BYTES'] = int(os.getenv('COMPRESS_CACHE_BYTES', str(32 * 1024 * 1024)))
+if app.config['COMPRESS_CACHE_BYTES'] > 0:
+    app.extensions['compressed_responses'] = CompressedResponseCache(
+        min_size=app.config['COMPRESS_MIN_SIZE'],
+        max_bytes=app.config['COMPRESS_CACHE_BYTES']
+    )
+
+# 网站设置：进程内只读快照，最多每 SETTINGS_REFRESH_INTERVAL 秒检查一次文件变化
+app.config['SETTINGS_FILE'] = os.getenv('SETTINGS_FILE', os.path.join('data', 'settings.json'))
+app.config['SETTINGS_REFRESH_INTERVAL'] = float(os.getenv('SETTINGS_REFRESH_INTERVAL', '0.5'))
+settings_store = SettingsStore(
+    app.config['SETTINGS_FILE'],
+    defaults={
+        'site_title': 'Memory Blog',
+        'site_description': '一个分享技术与生活的个人博客',
+        'site_keywords': '博客,技术,编程,生活',
+        'site_author': '博主',
+        'social_links': {
+            'github': '',
+            'twitter': '',
+            'weibo': '',
+            'zhihu': ''
+        },
+        'seo': {
+            'baidu_verification': '',
+            'google_verification': '',
+            'ga_measurement_id': ''
+        },
+        'features': {
+            'comments_enabled': True,
+            'rss_enabled': True,
+            'toc_enabled': True
+        }
+    },
+    # /api/settings 只返回前台需要的字段
+    public_keys=('site_title', 'site_description', 'site_keywords', 'site_author',
+                 'social_links', 'seo', 'features', 'theme', 'updated_at'),
+    min_interval=app.config['SETTINGS_REFRESH_INTERVAL']
+)
+
+# 分类记录（slug、描述、创建时间），与网站设置一样以 JSON 保存、按快照读取
+app.config['CATEGORIES_FILE'] = os.getenv('CATEGORIES_FILE', os.path.join('data', 'categories.json'))
+category_store = CategoryStore(app.config['CATEGORIES_FILE'], min_interval=app.config['SETTINGS_REFRESH_INTERVAL'])
+
+# 文章目录：进程内缓存，按 stat 结果增量刷新
+app.config['POST_CATALOG_REFRESH_INTERVAL'] = float(os.getenv('POST_CATALOG_REFRESH_INTERVAL', '1.0'))
+# 冷启动等一次变化很多文件时用多少个进程并行解析，0 为串行
+app.config['POST_CATALOG_WORKERS'] = int(os.getenv('POST_CATALOG_WORKERS', '0'))
+post_catalog = PostCatalog(
+    'content',
+    min_interval=app.config['POST_CATALOG_REFRESH_INTERVAL'],
+    renderer=markdown_renderer,
+    workers=app.config['POST_CATALOG_WORKERS']
+)
+
+# 多个 worker 共享的目录后端，列表、过滤、聚合与搜索改为索引查询：
+# CATALOG_BACKEND=sqlite 时把 content/ 镜像到 instance/blog.db；
+# CATALOG_BACKEND=snapshot 时由一个 worker 构建 instance/index.snapshot，其余 worker 只读 mmap
+app.config['CATALOG_BACKEND'] = os.getenv('CATALOG_BACKEND', 'memory')
+app.config['CATALOG_DB'] = os.getenv('CATALOG_DB', os.path.join(app.instance_path, 'blog.db'))
+app.config['CATALOG_SNAPSHOT'] = os.getenv('CATALOG_SNAPSHOT', os.path.join(app.instance_path, 'index.snapshot'))
+
+def make_shared_catalog(backend, workers=None):
+    if workers is None:
+        workers = app.config['POST_CATALOG_WORKERS']
+    if backend == 'sqlite':
+        return SqliteCatalog(
+            app.config['CATALOG_DB'],
+            'content',
+            min_interval=app.config['POST_CATALOG_REFRESH_INTERVAL'],
+            renderer=markdown_renderer,
+            workers=workers
+        )
+    if backend == 'snapshot':
+        return SnapshotCatalog(
+            app.config['CATALOG_SNAPSHOT'],
+            'content',
+            min_interval=app.config['POST_CATALOG_REFRESH_INTERVAL'],
+            renderer=markdown_renderer,
+            workers=workers
+        )
+    return None
+
+shared_catalog = make_shared_catalog(app.config['CATALOG_BACKEND'])
+
+# 全文搜索索引随文章目录增量更新
+search_index = SearchIndex()
+post_catalog.subscribe(search_index)
+
+# 标签 -> 文章索引
+tag_index = FacetIndex(post_tags)
+post_catalog.subscribe(tag_index)
+
+# 分类 -> 文章索引
+category_index = FacetIndex(post_category)
+post_catalog.subscribe(category_index)
+
+# 归档：年月 -> 文章索引
+archive_index = FacetIndex(post_month)
+post_catalog.subscribe(archive_index)
+ARCHIVE_FIELDS = ('filename', 'title', 'date', 'tags', 'category')
+
+# 列表接口中各文章投影的 JSON 片段缓存，与 jsonify 的紧凑输出逐字节一致
+post_fragments = FragmentCache(lambda obj: app.json.dumps(obj, separators=(',', ':')))
+post_catalog.subscribe(post_fragments)
+
+# 标签 / 分类的批量重命名、合并、删除：后台任务用 BULK_WORKERS 个线程并行改写文件，
+# 请求最多等待 BULK_SYNC_WAIT 秒，未完成时返回 202，进度见 /api/admin/jobs/<id>
+app.config['BULK_WORKERS'] = int(os.getenv('BULK_WORKERS', '4'))
+app.config['BULK_SYNC_WAIT'] = float(os.getenv('BULK_SYNC_WAIT', '2.0'))
+app.config['JOBS_DIR'] = os.getenv('JOBS_DIR', os.path.join(app.instance_path, 'jobs'))
+bulk_jobs = BulkJobs(app.config['JOBS_DIR'], 'content', workers=app.config['BULK_WORKERS'])
+
+# 后台监听模式：off（默认）、auto、inotify、poll
+app.config['CONTENT_WATCHER'] = os.getenv('CONTENT_WATCHER', 'off')
+app.config['CONTENT_WATCHER_DEBOUNCE'] = float(os.getenv('CONTENT_WATCHER_DEBOUNCE', '0.2'))
+app.config['CONTENT_WATCHER_POLL_INTERVAL'] = float(os.getenv('CONTENT_WATCHER_POLL_INTERVAL', '2.0'))
+app.config['CONTENT_WATCHER_MAX_LAG'] = float(os.getenv('CONTENT_WATCHER_MAX_LAG', '30'))
+content_watcher = None
+# 后台监听只维护进程内目录，SQLite 后端按请求节流同步或使用 flask catalog-sync
+if app.config['CONTENT_WATCHER'] != 'off' and shared_catalog is None:
+    content_watcher = ContentWatcher(
+        post_catalog,
+        mode=app.config['CONTENT_WATCHER'],
+        debounce=app.config['CONTENT_WATCHER_DEBOUNCE'],
+        poll_interval=app.config['CONTENT_WATCHER_POLL_INTERVAL']
+    )
+    content_watcher.start()
+
 @app.context_processor
 def utility_processor():
     def render_markdown(text):
-        return markdown.markdown(text, extensions=['fenced_code', 'tables', 'toc'])
+        return markdown_renderer.render(text)['html']
     return dict(markdown=render_markdown)
 
 def get_current_user_from_token():
     """从请求中获取当前用户"""
-    token = None
-    
-    if 'Authorization' in request.headers:
-        auth_header = request.headers['Authorization']
-        if auth_header.startswith('Bearer '):
-            token = auth_header[7:]
-    
-    if not token:
-        token = request.cookies.get('token')
-    
-    if not token:
-        return None
-    
-    payload = verify_token(token)
+    payload = get_current_claims()
     if not payload:
         return None
     
@@ -78,135 +246,514 @@ def get_current_user_from_token():
         'role': payload.get('role')
     }
 
-def get_posts():
-    posts = []
-    # 递归遍历 content 目录及其子目录
-    for root, dirs, files in os.walk('content'):
-        for filename in files:
-            if filename.endswith('.md'):
-                file_path = os.path.join(root, filename)
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    if content.startswith('---'):
-                        parts = content.split('---', 2)[1:]
-                        if len(parts) == 2:
-                            metadata = yaml.safe_load(parts[0])
-                            content = parts[1]
-                        else:
-                            metadata = {}
-                            content = content
-                    else:
-                        metadata = {}
-                    
-                    if 'title' not in metadata:
-                        metadata['title'] = os.path.splitext(filename)[0]
-                    
-                    if 'date' not in metadata:
-                        file_mtime = os.path.getmtime(file_path)
-                        metadata['date'] = datetime.fromtimestamp(file_mtime)
-                    else:
-                        from datetime import date
-                        if isinstance(metadata['date'], str):
-                            try:
-                                metadata['date'] = datetime.fromisoformat(metadata['date'])
-                            except ValueError:
-                                metadata['date'] = datetime.now()
-                        elif isinstance(metadata['date'], date) and not isinstance(metadata['date'], datetime):
-                            metadata['date'] = datetime.combine(metadata['date'], datetime.min.time())
-                    
-                    html_content = markdown.markdown(content)
-                    import re
-                    plain_text = re.sub('<[^<]+?>', '', html_content)
-                    summary = plain_text[:200] + '...' if len(plain_text) > 200 else plain_text
-                    
-                    tags = metadata.get('tags', [])
-                    if isinstance(tags, str):
-                        tags = [tag.strip() for tag in tags.split(',')]
-                    
-                    # 生成相对路径作为 filename，替换路径分隔符为连字符
-                    relative_path = os.path.relpath(file_path, 'content')
-                    filename_without_ext = os.path.splitext(relative_path)[0]
-                    # 将路径分隔符替换为连字符，确保前端路由正常工作
-                    clean_filename = filename_without_ext.replace(os.path.sep, '-')
-                    
-                    posts.append({
-                        'filename': clean_filename,
-                        'title': metadata.get('title'),
-                        'date': metadata.get('date'),
-                        'summary': summary,
-                        'content': content,
-                        'metadata': metadata,
-                        'tags': tags,
-                        'author_id': metadata.get('author_id'),
-                        'author_name': metadata.get('author_name')
-                    })
-    
-    return sorted(posts, key=lambda x: x['date'], reverse=True)
+def get_posts(with_body=True):
+    """按日期倒序的全部文章；只用元数据的视图传 with_body=False，共享后端不会读取正文"""
+    if shared_catalog is not None:
+        return list(shared_catalog.query_posts(limit=None, with_body=with_body)[1])
+    return post_catalog.posts()
+
+def get_recent_posts(limit, with_body=False):
+    """最新的 limit 篇文章"""
+    if shared_catalog is not None:
+        return list(shared_catalog.query_posts(limit=limit, with_body=with_body)[1])
+    return post_catalog.posts()[:limit]
+
+def get_post(filename):
+    """按 filename 取单篇文章（含正文）"""
+    if shared_catalog is not None:
+        return shared_catalog.get(filename)
+    return post_catalog.get(filename)
+
+def resolve_post_path(filename):
+    """filename 对应的文件相对路径"""
+    if shared_catalog is not None:
+        return shared_catalog.resolve(filename)
+    return post_catalog.resolve(filename)
+
+def apply_post_changes(rel_paths, categories=()):
+    """写入文章后只把这些文件应用到目录及其标签、归档、搜索索引，不重新扫描 content/
+
+    多个文件一次性应用，二级索引只更新、排序一次。categories 为写入的文章使用的分类，
+    还没有记录的在这里补上，读接口不写分类文件。
+    """
+    if shared_catalog is not None:
+        shared_catalog.update_paths(rel_paths)
+    else:
+        post_catalog.update_paths(rel_paths)
+    categories = [str(name) for name in categories if name]
+    if categories:
+        category_store.ensure(categories)
+
+def tag_paths(tag):
+    """带某个标签的文章路径，经标签索引查找"""
+    if shared_catalog is not None:
+        return shared_catalog.paths(tag=tag)
+    post_catalog.sync()
+    return tag_index.paths(tag)
+
+def category_paths(category):
+    """某个分类下的文章路径，经分类索引查找"""
+    if shared_catalog is not None:
+        return shared_catalog.paths(category=category)
+    post_catalog.sync()
+    return category_index.paths(category)
+
+def post_slug_taken(slug):
+    """filename 是否已被其他文章（如子目录中的文件）占用"""
+    return resolve_post_path(slug) is not None
+
+def corpus_validators(*args, **kwargs):
+    """列表类接口的条件请求验证器：整个目录的摘要与最后修改时间"""
+    if shared_catalog is not None:
+        validators = shared_catalog.validators()
+    else:
+        validators = post_catalog.validators()
+    # 记下查询文章之前的摘要，共享后端的文章片段据此失效
+    g.corpus_digest = validators[0]
+    return validators
+
+def posts_response(envelope, posts, fields):
+    """列表响应：envelope 中的 posts 由缓存的文章 JSON 片段拼接，不再逐篇序列化"""
+    if shared_catalog is not None:
+        digest = g.get('corpus_digest') or corpus_validators()[0]
+        fragments = post_fragments.encode(
+            posts, fields, post_query.project,
+            key=lambda post: (post['filename'], post['title'], post['date']), digest=digest
+        )
+    else:
+        fragments = post_fragments.encode(posts, fields, post_query.project)
+    body = post_fragments.assemble(envelope, 'posts', fragments)
+    return app.response_class(body + '\n', mimetype=app.json.mimetype)
+
+def post_validators(filename):
+    """单篇文章接口的条件请求验证器"""
+    if shared_catalog is not None:
+        return shared_catalog.post_validators(filename)
+    return post_catalog.post_validators(filename)
 
 def get_tags():
-    posts = get_posts()
-    tags = defaultdict(int)
-    
-    for post in posts:
-        for tag in post.get('tags', []):
-            tags[tag] += 1
-    
-    return dict(tags)
+    if shared_catalog is not None:
+        return shared_catalog.tag_counts()
+    post_catalog.sync()
+    return tag_index.counts()
 
-def get_posts_by_tag():
-    posts = get_posts()
-    tag_posts = defaultdict(list)
-    
-    for post in posts:
-        for tag in post.get('tags', []):
-            tag_posts[tag].append(post)
-    
-    for tag in tag_posts:
-        tag_posts[tag] = sorted(tag_posts[tag], key=lambda x: x['date'], reverse=True)
-    
-    return dict(tag_posts)
+def get_month_counts():
+    """{'YYYY-MM': 文章数}"""
+    if shared_catalog is not None:
+        return shared_catalog.month_counts()
+    post_catalog.sync()
+    return archive_index.counts()
+
+def get_category_counts():
+    """{分类名: 文章数}"""
+    if shared_catalog is not None:
+        return shared_catalog.category_counts()
+    post_catalog.sync()
+    return category_index.counts()
 
 class Pagination:
-    def __init__(self, items, page, per_page):
+    def __init__(self, items, page, per_page, total=None):
+        # total 不为 None 时，items 已是数据库查出的当前页
         self.items = items
         self.page = page
         self.per_page = per_page
-        self.total = len(items)
+        self.total = len(items) if total is None else total
         self.pages = (self.total + per_page - 1) // per_page
         self.page = max(1, min(self.page, self.pages))
-        start = (page - 1) * per_page
-        end = start + per_page
-        self.items = items[start:end]
+        if total is None:
+            start = (self.page - 1) * per_page
+            end = start + per_page
+            self.items = items[start:end]
+        else:
+            self.items = list(items)
+
+def paginate_query(query, page, per_page):
+    """对 query(limit, offset) -> (总数, 条目) 形式的数据库查询分页"""
+    page = max(1, page)
+    total, items = query(per_page, (page - 1) * per_page)
+    pages = (total + per_page - 1) // per_page
+    if pages and page > pages:
+        page = pages
+        total, items = query(per_page, (page - 1) * per_page)
+    return Pagination(items, page, per_page, total=total)
+
+def get_int_arg(name, default, minimum=1, maximum=None):
+    """读取整数查询参数，超出范围时截断"""
+    try:
+        value = int(request.args.get(name, default))
+    except ValueError:
+        value = default
+    value = max(minimum, value)
+    if maximum is not None:
+        value = min(maximum, value)
+    return value
+
+def get_per_page():
+    return get_int_arg('per_page', app.config['POSTS_PER_PAGE'], maximum=app.config['POSTS_MAX_PER_PAGE'])
 
 @app.route('/api/posts')
+@conditional(corpus_validators, variant=stream_format)
 def api_posts():
-    all_posts = get_posts()
-    return jsonify(all_posts)
+    """文章列表：支持分页/游标、字段投影、排序和过滤，以及 NDJSON / 分块 JSON 流式导出"""
+    args = request.args
+    try:
+        fields = post_query.parse_fields(args.get('fields'))
+        sort_field, desc = post_query.parse_sort(args.get('sort'))
+        filters = {
+            'tag': args.get('tag'),
+            'category': args.get('category'),
+            'author_id': args.get('author_id'),
+            'date_from': post_query.parse_date(args.get('date_from')),
+            'date_to': post_query.parse_date(args.get('date_to'), end=True)
+        }
+        fmt = stream_format()
+        per_page = get_per_page()
+        cursor = args.get('cursor')
+        with_body = 'content' in fields
+
+        if shared_catalog is not None:
+            after = post_query.decode_cursor(cursor, sort_field) if cursor else None
+            if fmt:
+                total, posts = shared_catalog.query_posts(
+                    sort_field, desc, limit=None, after=after, with_body=with_body, **filters
+                )
+                return stream_records(posts, fmt, lambda post: post_query.project(post, fields))
+            if cursor:
+                total, posts = shared_catalog.query_posts(
+                    sort_field, desc, limit=per_page + 1, after=after, with_body=with_body, **filters
+                )
+                items = list(posts)
+                has_more = len(items) > per_page
+                items = items[:per_page]
+                page = None
+                pages = None
+            else:
+                pagination = paginate_query(
+                    lambda limit, offset: shared_catalog.query_posts(
+                        sort_field, desc, limit=limit, offset=offset, with_body=with_body, **filters
+                    ),
+                    get_int_arg('page', 1), per_page
+                )
+                items = pagination.items
+                total = pagination.total
+                page = pagination.page
+                pages = pagination.pages
+                has_more = pagination.page < pagination.pages
+        else:
+            posts = post_query.filter_posts(get_posts(), **filters)
+            if (sort_field, desc) != ('date', True):
+                posts = post_query.sort_posts(posts, sort_field, desc)
+            total = len(posts)
+
+            # 流式导出：不分页，从游标（如有）开始逐条发送
+            if fmt:
+                start = post_query.cursor_offset(posts, cursor, sort_field, desc) if cursor else 0
+                return stream_records(
+                    itertools.islice(posts, start, None), fmt,
+                    lambda post: post_query.project(post, fields)
+                )
+
+            if cursor:
+                start = post_query.cursor_offset(posts, cursor, sort_field, desc)
+                items = posts[start:start + per_page]
+                page = None
+                pages = None
+                has_more = start + per_page < len(posts)
+            else:
+                pagination = Pagination(posts, get_int_arg('page', 1), per_page)
+                items = pagination.items
+                page = pagination.page
+                pages = pagination.pages
+                has_more = pagination.page < pagination.pages
+    except post_query.QueryError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return posts_response({
+        'total': total,
+        'page': page,
+        'pages': pages,
+        'per_page': per_page,
+        'next_cursor': post_query.encode_cursor(items[-1], sort_field) if has_more and items else None
+    }, items, fields)
 
 @app.route('/api/posts/<filename>')
+@conditional(post_validators)
 def api_post(filename):
-    posts = get_posts()
-    post = next((post for post in posts if post['filename'] == filename), None)
+    post = get_post(filename)
     if post is None:
         return jsonify({'error': 'Post not found'}), 404
+
+    # include=html,toc 时返回服务端渲染（含 Pygments 高亮）的 HTML 与目录
+    include = {item.strip() for item in request.args.get('include', '').split(',')}
+    if include & {'html', 'toc'}:
+        rendered = markdown_renderer.render(post['content'])
+        post = dict(post)
+        if 'html' in include:
+            post['html'] = rendered['html']
+        if 'toc' in include:
+            post['toc'] = rendered['toc']
+            post['toc_tokens'] = rendered['toc_tokens']
     return jsonify(post)
 
 @app.route('/api/tags')
+@conditional(corpus_validators)
 def api_tags():
+    """标签统计：只返回文章数与文章 filename 引用"""
     tags = get_tags()
-    tag_posts = get_posts_by_tag()
+    if shared_catalog is not None:
+        tag_posts = shared_catalog.tag_references()
+    else:
+        tag_posts = {tag: [post['filename'] for post in tag_index.posts(tag)] for tag in tags}
     return jsonify({
         'tags': tags,
         'tag_posts': tag_posts
     })
 
+def get_tag_pagination(tag, page, per_page):
+    """某个标签下按日期倒序的文章分页；标签不存在时返回 None"""
+    if shared_catalog is not None:
+        pagination = paginate_query(
+            lambda limit, offset: shared_catalog.query_posts(limit=limit, offset=offset, tag=tag),
+            page, per_page
+        )
+        return pagination if pagination.total else None
+    post_catalog.sync()
+    if tag not in tag_index:
+        return None
+    return Pagination(tag_index.posts(tag), page, per_page)
+
+@app.route('/api/tags/<tag>')
+@conditional(corpus_validators)
+def api_tag_posts(tag):
+    """某个标签下的文章摘要，分页返回"""
+    per_page = get_per_page()
+    pagination = get_tag_pagination(tag, get_int_arg('page', 1), per_page)
+    if pagination is None:
+        return jsonify({'error': 'Tag not found'}), 404
+
+    return posts_response({
+        'tag': tag,
+        'total': pagination.total,
+        'page': pagination.page,
+        'pages': pagination.pages,
+        'per_page': per_page
+    }, pagination.items, post_query.DEFAULT_FIELDS)
+
+def get_categories():
+    """全部分类：分类记录加上文章数，按文章数倒序；还没有记录的分类按默认属性列出"""
+    counts = get_category_counts()
+    records = category_store.records(counts)
+    categories = [dict(record, article_count=counts.get(record['name'], 0)) for record in records.values()]
+    return sorted(categories, key=lambda x: (-x['article_count'], x['name']))
+
+def find_category(slug):
+    """slug 对应的分类记录；文章中有该分类但还没有记录时返回默认记录，不存在时返回 None"""
+    record = category_store.get(slug)
+    if record is None:
+        record = category_store.records(get_category_counts()).get(slug)
+    return record
+
+def get_category_pagination(category, page, per_page):
+    """某个分类下按日期倒序的文章分页，经分类索引只取当前页"""
+    if shared_catalog is not None:
+        return paginate_query(
+            lambda limit, offset: shared_catalog.query_posts(limit=limit, offset=offset, category=category),
+            page, per_page
+        )
+    post_catalog.sync()
+    return Pagination(category_index.posts(category), page, per_page)
+
+def category_validators(*args, **kwargs):
+    """分类接口的条件请求验证器：文章目录与分类记录的摘要"""
+    digest, last_modified = corpus_validators()
+    snapshot = category_store.snapshot()
+    if snapshot.last_modified and (last_modified is None or snapshot.last_modified > last_modified):
+        last_modified = snapshot.last_modified
+    return f'{digest}:{snapshot.digest}', last_modified
+
+@app.route('/api/categories')
+@conditional(category_validators)
+def api_categories():
+    """分类列表：分类记录与文章数"""
+    return jsonify({'categories': get_categories()})
+
+@app.route('/api/categories/<slug>/posts')
+@conditional(category_validators)
+def api_category_posts(slug):
+    """某个分类下的文章摘要，分页返回"""
+    category = find_category(slug)
+    if category is None:
+        return jsonify({'error': 'Category not found'}), 404
+
+    per_page = get_per_page()
+    pagination = get_category_pagination(category['name'], get_int_arg('page', 1), per_page)
+    return posts_response({
+        'category': category,
+        'total': pagination.total,
+        'page': pagination.page,
+        'pages': pagination.pages,
+        'per_page': per_page
+    }, pagination.items, post_query.DEFAULT_FIELDS)
+
+def get_archive_buckets():
+    """按年、月汇总的文章数，年月均倒序"""
+    years = {}
+    for key, count in get_month_counts().items():
+        year, month = (int(part) for part in key.split('-'))
+        bucket = years.setdefault(year, {'year': year, 'count': 0, 'months': []})
+        bucket['count'] += count
+        bucket['months'].append({'month': month, 'count': count})
+    for bucket in years.values():
+        bucket['months'].sort(key=lambda x: x['month'], reverse=True)
+    return [years[year] for year in sorted(years, reverse=True)]
+
+def month_range(year, month=None):
+    """年或月对应的 [起, 止) 日期范围"""
+    if month is None:
+        return datetime(year, 1, 1), datetime(year + 1, 1, 1)
+    if month == 12:
+        return datetime(year, 12, 1), datetime(year + 1, 1, 1)
+    return datetime(year, month, 1), datetime(year, month + 1, 1)
+
 @app.route('/api/archive')
+@conditional(corpus_validators, variant=stream_format)
 def api_archive():
-    articles = get_posts()
+    """归档：不带参数时只返回各年月的文章数；指定 year（及 month）时分页返回该时段的文章
+
+    format=ndjson / json-stream 时逐条流式发送文章而不分页。
+    """
+    buckets = get_archive_buckets()
+    year = request.args.get('year', type=int)
+    month = request.args.get('month', type=int)
+    fmt = stream_format()
+    if year is None and fmt:
+        # 流式导出全部归档文章，按年月倒序逐条发送
+        if shared_catalog is not None:
+            posts = shared_catalog.query_posts(limit=None)[1]
+        else:
+            posts = (
+                post
+                for bucket in buckets
+                for item in bucket['months']
+                for post in archive_index.posts(f"{bucket['year']:04d}-{item['month']:02d}")
+            )
+        return stream_records(posts, fmt, lambda post: post_query.project(post, ARCHIVE_FIELDS))
+    if year is None:
+        return jsonify({
+            'years': buckets,
+            'total': sum(bucket['count'] for bucket in buckets)
+        })
+
+    bucket = next((bucket for bucket in buckets if bucket['year'] == year), None)
+    if bucket is None:
+        return jsonify({'error': 'Archive not found'}), 404
+    if month is None:
+        months = [item['month'] for item in bucket['months']]
+    elif any(item['month'] == month for item in bucket['months']):
+        months = [month]
+    else:
+        return jsonify({'error': 'Archive not found'}), 404
+
+    try:
+        fields = post_query.parse_fields(request.args.get('fields')) if request.args.get('fields') else ARCHIVE_FIELDS
+    except post_query.QueryError as e:
+        return jsonify({'error': str(e)}), 400
+    per_page = get_per_page()
+    if shared_catalog is not None:
+        date_from, date_to = month_range(year, month)
+        query = lambda limit, offset: shared_catalog.query_posts(
+            limit=limit, offset=offset, date_from=date_from, date_to=date_to
+        )
+        if fmt:
+            return stream_records(query(None, 0)[1], fmt, lambda post: post_query.project(post, fields))
+        pagination = paginate_query(query, get_int_arg('page', 1), per_page)
+    else:
+        # 各月列表已按日期倒序，按月份倒序拼接即为整年的倒序
+        posts = [post for m in months for post in archive_index.posts(f'{year:04d}-{m:02d}')]
+        if fmt:
+            return stream_records(posts, fmt, lambda post: post_query.project(post, fields))
+        pagination = Pagination(posts, get_int_arg('page', 1), per_page)
+    return posts_response({
+        'year': year,
+        'month': month,
+        'months': bucket['months'],
+        'total': pagination.total,
+        'page': pagination.page,
+        'pages': pagination.pages,
+        'per_page': per_page
+    }, pagination.items, fields)
+
+@app.route('/api/health')
+def api_health():
+    """健康检查：文章目录 generation、后台监听延迟与密码哈希队列"""
+    if shared_catalog is not None:
+        health = {
+            'status': 'ok',
+            'backend': app.config['CATALOG_BACKEND'],
+            'generation': shared_catalog.generation,
+            'watcher': None,
+            'password_hashing': password_hasher.stats()
+        }
+        return jsonify(health), 200
+    health = {
+        'status': 'ok',
+        'backend': 'memory',
+        'generation': post_catalog.generation,
+        'slug_collisions': post_catalog.collisions(),
+        'watcher': None,
+        'password_hashing': password_hasher.stats()
+    }
+    if content_watcher is not None:
+        watcher = content_watcher.status()
+        health['watcher'] = watcher
+        lag = watcher['lag_seconds']
+        if not watcher['running']:
+            health['status'] = 'watcher_stopped'
+        elif lag is not None and lag > app.config['CONTENT_WATCHER_MAX_LAG']:
+            health['status'] = 'lagging'
+    return jsonify(health), 200 if health['status'] == 'ok' else 503
+
+@app.route('/api/search')
+@conditional(corpus_validators)
+def api_search():
+    """全文搜索：BM25 排序，标题和标签加权，返回高亮片段"""
+    query = request.args.get('q', '').strip()
+    per_page = get_per_page()
+    if shared_catalog is not None:
+        pagination = paginate_query(
+            lambda limit, offset: shared_catalog.search(query, limit, offset) if query else (0, []),
+            get_int_arg('page', 1), per_page
+        )
+    else:
+        post_catalog.sync()
+        results = search_index.search(query) if query else []
+        pagination = Pagination(results, get_int_arg('page', 1), per_page)
+    terms = query_terms(query)
+
+    items = []
+    for score, post in pagination.items:
+        item = post_query.project(post, post_query.DEFAULT_FIELDS)
+        item['score'] = round(score, 4)
+        item['title_highlight'] = highlight(str(post['title']), terms)
+        item['snippet'] = make_snippet(plain_text(post['content']), terms)
+        items.append(item)
+
     return jsonify({
-        'articles': articles
+        'query': query,
+        'results': items,
+        'total': pagination.total,
+        'page': pagination.page,
+        'pages': pagination.pages,
+        'per_page': per_page
     })
 
+@app.route('/api/pygments.css')
+def api_pygments_css():
+    """服务端代码高亮所需的 Pygments 样式"""
+    response = make_response(markdown_renderer.highlight_css())
+    response.headers['Content-Type'] = 'text/css; charset=utf-8'
+    return response
+
 @app.route('/api/about')
 def api_about():
     return jsonify({'message': 'About page data'})
@@ -215,96 +762,173 @@ def api_about():
 @admin_required
 def api_get_categories():
     """获取所有分类"""
-    posts = get_posts()
-    categories_count = defaultdict(int)
-    
-    for post in posts:
-        category = post.get('metadata', {}).get('category')
-        if category:
-            categories_count[category] += 1
-    
-    categories = []
-    for name, count in categories_count.items():
-        categories.append({
-            'name': name,
-            'slug': name.lower().replace(' ', '-'),
-            'article_count': count,
-            'created_at': datetime.now().isoformat()
-        })
-    
-    categories = sorted(categories, key=lambda x: x['article_count'], reverse=True)
-    
-    return jsonify({'categories': categories}), 200
+    return jsonify({'categories': get_categories()}), 200
+
+def get_description_arg(data):
+    """请求体中的分类描述；未提供时为 None，类型不对时抛出 ValueError"""
+    description = data.get('description') if isinstance(data, dict) else None
+    if description is not None and not isinstance(description, str):
+        raise ValueError('Invalid description')
+    return description
 
 @app.route('/api/admin/categories', methods=['POST'])
 @admin_required
 def api_create_category():
     """创建分类"""
-    data = request.get_json()
-    name = data.get('name')
+    data = request.get_json(silent=True)
+    name = get_name_arg(data)
     
     if not name:
         return jsonify({'error': 'Category name is required'}), 400
+    try:
+        description = get_description_arg(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        category = category_store.create(name, description or '')
+    except CategoryExists:
+        return jsonify({'error': 'Category already exists'}), 409
     
     return jsonify({
         'message': 'Category created successfully',
-        'category': {
-            'name': name,
-            'slug': name.lower().replace(' ', '-'),
-            'article_count': 0,
-            'created_at': datetime.now().isoformat()
-        }
+        'category': dict(category, article_count=0)
     }), 201
 
+def bulk_job_response(kind, params, rel_paths, change, on_complete=None, result_key=None):
+    """提交批量修改任务；在 BULK_SYNC_WAIT 秒内完成时直接返回结果，否则返回 202 与任务地址
+
+    on_complete 在所有文章改写成功后执行（如修改分类记录），失败时不执行；
+    提供 result_key 时，完成的响应中以该字段返回 on_complete 的结果（同时见任务的 result）。
+    """
+    job = bulk_jobs.submit(kind, params, rel_paths, change, apply_post_changes, on_complete)
+    if not bulk_jobs.wait(job['id'], app.config['BULK_SYNC_WAIT']):
+        response = jsonify({'message': 'Job accepted', 'job': bulk_jobs.get(job['id']) or job})
+        response.status_code = 202
+        response.headers['Location'] = url_for('api_get_job', job_id=job['id'])
+        return response
+    job = bulk_jobs.get(job['id']) or job
+    if job['state'] != 'completed':
+        return jsonify({'error': 'Job failed', 'job': job}), 500
+    body = {'message': 'Job completed', 'job': job}
+    if result_key:
+        body[result_key] = job['result']
+    return jsonify(body), 200
+
+def get_name_arg(data, key='name'):
+    """请求体中的名称（非空字符串），无效时返回 None"""
+    name = data.get(key) if isinstance(data, dict) else None
+    if not isinstance(name, str) or not name.strip():
+        return None
+    return name.strip()
+
 @app.route('/api/admin/categories/<category_name>', methods=['PUT'])
 @admin_required
 def api_update_category(category_name):
-    """更新分类"""
-    data = request.get_json()
-    new_name = data.get('name')
-    
-    if not new_name:
+    """修改分类描述或重命名分类，目标分类已存在时即合并"""
+    data = request.get_json(silent=True)
+    new_name = get_name_arg(data)
+    try:
+        description = get_description_arg(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if not new_name and description is None:
         return jsonify({'error': 'Category name is required'}), 400
     
-    return jsonify({
-        'message': 'Category updated successfully',
-        'category': {
-            'name': new_name,
-            'slug': new_name.lower().replace(' ', '-'),
-            'created_at': datetime.now().isoformat()
-        }
-    }), 200
+    rel_paths = category_paths(category_name)
+    if not rel_paths and category_store.find(category_name) is None:
+        return jsonify({'error': 'Category not found'}), 404
+    
+    if not rel_paths or not new_name or new_name == category_name:
+        category = category_store.update(category_name, new_name, description)
+        return jsonify({'message': 'Category updated successfully', 'category': category}), 200
+    
+    # 分类记录在所有文章改写成功后才修改，任务失败时保持原样
+    return bulk_job_response('rename_category', {'source': category_name, 'target': new_name},
+                             rel_paths, replace_category([category_name], new_name),
+                             on_complete=lambda: category_store.update(category_name, new_name, description),
+                             result_key='category')
 
 @app.route('/api/admin/categories/<category_name>', methods=['DELETE'])
 @admin_required
 def api_delete_category(category_name):
-    """删除分类"""
-    return jsonify({'message': 'Category deleted successfully'}), 200
+    """删除分类：删除分类记录并去掉这些文章的分类字段，文章本身保留"""
+    rel_paths = category_paths(category_name)
+    if not rel_paths:
+        if not category_store.delete(category_name):
+            return jsonify({'error': 'Category not found'}), 404
+        return jsonify({'message': 'Category deleted successfully'}), 200
+    
+    # 分类记录在所有文章改写成功后才删除
+    return bulk_job_response('delete_category', {'source': category_name},
+                             rel_paths, replace_category([category_name]),
+                             on_complete=lambda: category_store.delete(category_name))
+
+@app.route('/api/admin/tags/<tag>', methods=['PUT'])
+@admin_required
+def api_rename_tag(tag):
+    """重命名标签，目标标签已存在时即合并"""
+    new_name = get_name_arg(request.get_json(silent=True))
+    if not new_name:
+        return jsonify({'error': 'Tag name is required'}), 400
+    
+    rel_paths = tag_paths(tag)
+    if not rel_paths:
+        return jsonify({'error': 'Tag not found'}), 404
+    
+    return bulk_job_response('rename_tag', {'source': tag, 'target': new_name},
+                             rel_paths, replace_tags([tag], new_name))
+
+@app.route('/api/admin/tags/<tag>', methods=['DELETE'])
+@admin_required
+def api_delete_tag(tag):
+    """从所有文章中删除标签"""
+    rel_paths = tag_paths(tag)
+    if not rel_paths:
+        return jsonify({'error': 'Tag not found'}), 404
+    
+    return bulk_job_response('delete_tag', {'source': tag}, rel_paths, replace_tags([tag]))
+
+@app.route('/api/admin/tags/merge', methods=['POST'])
+@admin_required
+def api_merge_tags():
+    """合并标签：{"sources": [...], "target": "..."}"""
+    data = request.get_json(silent=True)
+    target = get_name_arg(data, 'target')
+    sources = data.get('sources') if isinstance(data, dict) else None
+    if not target or not isinstance(sources, list) or not sources or not all(isinstance(x, str) for x in sources):
+        return jsonify({'error': 'sources and target are required'}), 400
+    
+    rel_paths = list(dict.fromkeys(path for source in sources for path in tag_paths(source)))
+    if not rel_paths:
+        return jsonify({'error': 'Tag not found'}), 404
+    
+    return bulk_job_response('merge_tags', {'sources': sources, 'target': target},
+                             rel_paths, replace_tags(sources, target))
+
+@app.route('/api/admin/jobs/<job_id>')
+@admin_required
+def api_get_job(job_id):
+    """批量任务的状态与进度"""
+    job = bulk_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify({'job': job}), 200
 
 @app.route('/api/admin/tags', methods=['GET'])
 @admin_required
 def api_get_tags():
     """获取所有标签统计"""
-    posts = get_posts()
-    tags_count = defaultdict(int)
-    tags_posts = defaultdict(list)
-    
-    for post in posts:
-        tags = post.get('tags', [])
-        for tag in tags:
-            tags_count[tag] += 1
-            tags_posts[tag].append({
-                'filename': post['filename'],
-                'title': post['title']
-            })
-    
     tags = []
-    for name, count in tags_count.items():
+    for name, count in get_tags().items():
         tags.append({
             'name': name,
             'slug': name.lower().replace(' ', '-'),
             'article_count': count,
-            'articles': tags_posts[name][:5]
+            'articles': [
+                {'filename': post['filename'], 'title': post['title']}
+                for post in get_tag_pagination(name, 1, 5).items
+            ]
         })
     
     tags = sorted(tags, key=lambda x: x['article_count'], reverse=True)
@@ -315,213 +939,205 @@ def api_get_tags():
 @admin_required
 def api_get_settings():
     """获取网站设置"""
-    settings_file = 'data/settings.json'
-    if os.path.exists(settings_file):
-        with open(settings_file, 'r', encoding='utf-8') as f:
-            settings = json.load(f)
-        return jsonify(settings), 200
-    else:
-        default_settings = {
-            'site_title': 'Memory Blog',
-            'site_description': '一个分享技术与生活的个人博客',
-            'site_keywords': '博客,技术,编程,生活',
-            'site_author': '博主',
-            'social_links': {
-                'github': '',
-                'twitter': '',
-                'weibo': '',
-                'zhihu': ''
-            },
-            'seo': {
-                'baidu_verification': '',
-                'google_verification': '',
-                'ga_measurement_id': ''
-            },
-            'features': {
-                'comments_enabled': True,
-                'rss_enabled': True,
-                'toc_enabled': True
-            }
-        }
-        return jsonify(default_settings), 200
+    return jsonify(settings_store.snapshot().settings), 200
 
 @app.route('/api/admin/settings', methods=['PUT'])
 @admin_required
 def api_update_settings():
     """更新网站设置"""
     data = request.get_json()
-    settings_file = 'data/settings.json'
-    
-    current_settings = {}
-    if os.path.exists(settings_file):
-        with open(settings_file, 'r', encoding='utf-8') as f:
-            current_settings = json.load(f)
-    
-    current_settings.update(data)
-    current_settings['updated_at'] = datetime.now().isoformat()
+    if not isinstance(data, dict):
+        return jsonify({'error': 'No data provided'}), 400
     
-    with open(settings_file, 'w', encoding='utf-8') as f:
-        json.dump(current_settings, f, ensure_ascii=False, indent=2)
+    current_settings = settings_store.update(data)
     
     return jsonify({
         'message': 'Settings updated successfully',
         'settings': current_settings
     }), 200
 
-@app.route('/api/posts', methods=['POST'])
-@user_required
-def api_create_post():
-    data = request.get_json()
-    if not data:
-        return jsonify({'error': 'No data provided'}), 400
+def settings_validators(*args, **kwargs):
+    snapshot = settings_store.snapshot()
+    return snapshot.digest, snapshot.last_modified
+
+@app.route('/api/settings')
+@conditional(settings_validators)
+def api_public_settings():
+    """公开的网站设置（只读子集），供前台页面读取"""
+    return jsonify(settings_store.snapshot().public)
+
+def validate_post_input(data, allow_date=False):
+    """校验新建 / 更新文章的请求体，返回 (错误信息或 None, 字段)"""
+    if not isinstance(data, dict):
+        return 'No data provided', None
     
     title = data.get('title')
     content = data.get('content')
     
-    # 从 request 对象获取用户信息（由 user_required 装饰器设置）
-    current_user = {
-        'id': request.user_id,
-        'username': request.username,
-        'role': request.user_role
-    }
-    
-    timestamp = int(datetime.now().timestamp())
-    filename = f"{timestamp}.md"
-    
     # 验证输入
     if not title or not isinstance(title, str) or len(title) > 200:
-        return jsonify({'error': 'Invalid title'}), 400
+        return 'Invalid title', None
     
     if not content or not isinstance(content, str):
-        return jsonify({'error': 'Invalid content'}), 400
+        return 'Invalid content', None
     
     # 验证标签和分类
     tags = data.get('tags', [])
     if tags and not isinstance(tags, list):
-        return jsonify({'error': 'Invalid tags format'}), 400
+        return 'Invalid tags format', None
     
     category = data.get('category')
     if category and not isinstance(category, str):
-        return jsonify({'error': 'Invalid category format'}), 400
+        return 'Invalid category format', None
     
+    fields = {'title': title, 'content': content, 'tags': tags, 'category': category}
+    # 批量导入时可保留原文的发布日期
+    if allow_date and data.get('date'):
+        try:
+            fields['date'] = datetime.fromisoformat(str(data['date']))
+        except ValueError:
+            return 'Invalid date', None
+        # 与其他文章一致使用不带时区的日期，否则无法一起排序
+        if fields['date'].tzinfo is not None:
+            fields['date'] = fields['date'].replace(tzinfo=None)
+    return None, fields
+
+def create_post(fields, current_user, start=0):
+    """新建文章文件（不更新目录），返回相对 content/ 的路径"""
     metadata = {
-        'title': title,
-        'date': datetime.now().isoformat(),
-        'tags': tags,
-        'category': category,
+        'title': fields['title'],
+        'date': fields.get('date') or datetime.now(),
+        'tags': fields['tags'],
+        'category': fields['category'],
         'author_id': current_user['id'],
         'author_name': current_user['username']
     }
+    # 文件名为创建时间戳，同一秒内的多篇依次加 -1、-2 后缀，不会互相覆盖
+    base = str(int(datetime.now().timestamp()))
+    return create_post_file('content', base, render_post(metadata, fields['content']),
+                            taken=post_slug_taken, start=start)
+
+@app.route('/api/posts', methods=['POST'])
+@user_required
+def api_create_post():
+    error, fields = validate_post_input(request.get_json())
+    if error:
+        return jsonify({'error': error}), 400
     
-    article_content = '---\n'
-    for key, value in metadata.items():
-        if value:
-            if isinstance(value, list):
-                article_content += f'{key}: {value}\n'
-            else:
-                article_content += f'{key}: {value}\n'
-    article_content += '---\n\n'
-    article_content += content
+    # 从 request 对象获取用户信息（由 user_required 装饰器设置）
+    current_user = {
+        'id': request.user_id,
+        'username': request.username,
+        'role': request.user_role
+    }
     
     try:
-        # 确保 filename 不包含路径遍历字符
-        if '..' in filename or '/' in filename or '\\' in filename:
-            return jsonify({'error': 'Invalid filename'}), 400
-        
-        # 确保 content 目录存在
-        os.makedirs('content', exist_ok=True)
-        
-        # 安全的文件路径
-        file_path = os.path.join('content', filename)
-        # 确保文件路径在 content 目录内
-        if not os.path.abspath(file_path).startswith(os.path.abspath('content')):
-            return jsonify({'error': 'Invalid file path'}), 400
-        
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(article_content)
-        return jsonify({'message': 'Post created successfully', 'filename': filename}), 201
+        rel_path = create_post(fields, current_user)
+        apply_post_changes([rel_path], [fields['category']])
+        return jsonify({'message': 'Post created successfully', 'filename': rel_path}), 201
     except Exception as e:
+        app.logger.exception('Failed to create post')
         return jsonify({'error': 'Failed to create post'}), 500
 
-@app.route('/api/posts/<filename>', methods=['PUT'])
+@app.route('/api/posts/batch', methods=['POST'])
 @user_required
-def api_update_post(filename):
+def api_create_posts_batch():
+    """批量导入文章：{"posts": [{title, content, tags, category, date}, ...]}
+
+    先校验全部文章，有错误时不写入任何文件；全部写入后对目录和索引只提交一次。
+    """
     data = request.get_json()
-    if not data:
-        return jsonify({'error': 'No data provided'}), 400
+    items = data.get('posts') if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'No posts provided'}), 400
+    if len(items) > app.config['POSTS_BATCH_MAX']:
+        return jsonify({'error': f"At most {app.config['POSTS_BATCH_MAX']} posts per batch"}), 400
     
-    title = data.get('title')
-    content = data.get('content')
+    validated = []
+    errors = []
+    for index, item in enumerate(items):
+        error, fields = validate_post_input(item, allow_date=True)
+        if error:
+            errors.append({'index': index, 'error': error})
+        validated.append(fields)
+    if errors:
+        return jsonify({'error': 'Invalid posts', 'errors': errors}), 400
     
-    # 从 request 对象获取用户信息（由 user_required 装饰器设置）
     current_user = {
         'id': request.user_id,
         'username': request.username,
         'role': request.user_role
     }
     
-    # 验证输入
-    if not title or not isinstance(title, str) or len(title) > 200:
-        return jsonify({'error': 'Invalid title'}), 400
-    
-    if not content or not isinstance(content, str):
-        return jsonify({'error': 'Invalid content'}), 400
-    
-    # 验证标签和分类
-    tags = data.get('tags', [])
-    if tags and not isinstance(tags, list):
-        return jsonify({'error': 'Invalid tags format'}), 400
+    created = []
+    try:
+        for index, fields in enumerate(validated):
+            # 从第 index 个后缀开始尝试，同一秒内的整批文件名不必逐个重试
+            created.append(create_post(fields, current_user, start=index))
+    except Exception:
+        app.logger.exception('Failed to create posts in batch')
+        if created:
+            apply_post_changes(created, [fields['category'] for fields in validated[:len(created)]])
+        return jsonify({'error': 'Failed to create posts', 'created': created}), 500
+    apply_post_changes(created, [fields['category'] for fields in validated])
+    return jsonify({
+        'message': 'Posts created successfully',
+        'count': len(created),
+        'filenames': created
+    }), 201
+
+@app.route('/api/posts/<filename>', methods=['PUT'])
+@user_required
+def api_update_post(filename):
+    error, fields = validate_post_input(request.get_json())
+    if error:
+        return jsonify({'error': error}), 400
     
-    category = data.get('category')
-    if category and not isinstance(category, str):
-        return jsonify({'error': 'Invalid category format'}), 400
+    # 从 request 对象获取用户信息（由 user_required 装饰器设置）
+    current_user = {
+        'id': request.user_id,
+        'username': request.username,
+        'role': request.user_role
+    }
     
     # 验证 filename
     if '..' in filename or '/' in filename or '\\' in filename:
         return jsonify({'error': 'Invalid filename'}), 400
     
-    # 检查文章是否存在
-    post_file = os.path.join('content', f"{filename}.md")
+    # 检查文章是否存在（filename 可能对应子目录中的文件）
+    post = get_post(filename)
+    if not post:
+        return jsonify({'error': 'Post not found'}), 404
+    
+    rel_path = resolve_post_path(filename)
+    post_file = os.path.join('content', rel_path)
     # 确保文件路径在 content 目录内
     if not os.path.abspath(post_file).startswith(os.path.abspath('content')):
         return jsonify({'error': 'Invalid file path'}), 400
     
-    if not os.path.exists(post_file):
-        return jsonify({'error': 'Post not found'}), 404
-    
     # 检查用户是否有权限编辑文章
-    post = next((post for post in get_posts() if post['filename'] == filename), None)
-    if not post:
-        return jsonify({'error': 'Post not found'}), 404
     
     if post['author_id'] != current_user['id'] and current_user['role'] != 'admin':
         return jsonify({'error': 'Permission denied'}), 403
     
     # 更新文章
     metadata = {
-        'title': title,
-        'date': post['date'].isoformat() if hasattr(post['date'], 'isoformat') else post['date'],
-        'tags': tags,
-        'category': category,
+        'title': fields['title'],
+        'date': post['date'],
+        'tags': fields['tags'],
+        'category': fields['category'],
         'author_id': post['author_id'],
         'author_name': post['author_name']
     }
     
-    article_content = '---\n'
-    for key, value in metadata.items():
-        if value:
-            if isinstance(value, list):
-                article_content += f'{key}: {value}\n'
-            else:
-                article_content += f'{key}: {value}\n'
-    article_content += '---\n\n'
-    article_content += content
-    
     try:
-        with open(post_file, 'w', encoding='utf-8') as f:
-            f.write(article_content)
+        # 与后台批量改写持有同一把文章写锁，不会在其读取与替换之间写入而被覆盖
+        with post_lock('content', rel_path):
+            replace_post_file('content', rel_path, render_post(metadata, fields['content']))
+        apply_post_changes([rel_path], [fields['category']])
         return jsonify({'message': 'Post updated successfully'}), 200
     except Exception as e:
+        app.logger.exception('Failed to update post')
         return jsonify({'error': 'Failed to update post'}), 500
 
 @app.route('/debug/giscus')
@@ -537,7 +1153,7 @@ def debug_giscus():
     })
 
 def get_site_stats():
-    posts = get_posts()
+    posts = get_posts(with_body=False)
     tags = get_tags()
     start_date = datetime(2024, 1, 1)
     days_running = (datetime.now() - start_date).days
@@ -556,44 +1172,143 @@ def format_date(date):
             return date
     return date.strftime('%Y-%m-%d')
 
-@app.route('/feed.xml')
-def feed():
-    posts = get_posts()
-    
-    feed = feedgenerator.Rss201rev2Feed(
-        title="我的博客",
-        link=request.url_root,
-        description="我的个人博客RSS订阅",
-        language="zh-cn",
-        author_name="博客作者",
-        feed_url=urljoin(request.url_root, url_for('feed')),
-        image_url=urljoin(request.url_root, 'static/favicon.ico'),
-        copyright=f"Copyright {datetime.now().year} 博客作者",
-        ttl=60
-    )
+def feed_info(tag=None):
+    """订阅频道信息"""
+    title = "我的博客" if tag is None else f"我的博客 - {tag}"
+    description = "我的个人博客RSS订阅" if tag is None else f"我的个人博客「{tag}」标签RSS订阅"
+    return {
+        'title': title,
+        'link': request.url_root,
+        'description': description,
+        'language': "zh-cn",
+        'author_name': "博客作者",
+        'feed_url': urljoin(request.url_root, url_for(request.endpoint, **request.view_args)),
+        'image_url': urljoin(request.url_root, 'static/favicon.ico'),
+        'copyright': f"Copyright {datetime.now().year} 博客作者",
+        'ttl': 60
+    }
+
+def feed_response(fmt, tag=None):
+    """从缓存返回订阅内容，目录摘要变化后才重新查询文章并渲染"""
+    limit = get_int_arg('limit', app.config['FEED_ITEMS'], maximum=app.config['FEED_MAX_ITEMS'])
+    digest, _ = corpus_validators()
 
-    for post in posts[:10]:
-        pub_date = post['date']
-        if isinstance(pub_date, str):
-            try:
-                pub_date = datetime.strptime(pub_date, '%Y-%m-%d')
-            except ValueError:
-                pub_date = datetime.now()
-        
-        post_url = urljoin(request.url_root, url_for('api_post', filename=post['filename']))
-        
-        feed.add_item(
-            title=post['title'],
-            link=post_url,
-            description=post['summary'],
-            pubdate=pub_date,
-            categories=post.get('tags', [])
+    def build():
+        if tag is None:
+            posts = get_recent_posts(limit)
+        else:
+            pagination = get_tag_pagination(tag, 1, limit)
+            if pagination is None:
+                return None
+            posts = pagination.items
+        return render_feed(
+            fmt, posts, feed_info(tag),
+            lambda post: urljoin(request.url_root, url_for('api_post', filename=post['filename']))
         )
-    
-    response = make_response(feed.writeString('utf-8'))
-    response.headers['Content-Type'] = 'application/rss+xml; charset=utf-8'
+
+    body = feed_cache.get((fmt, request.url_root, tag, limit), digest, build)
+    if body is None:
+        return jsonify({'error': 'Tag not found'}), 404
+    response = make_response(body)
+    response.headers['Content-Type'] = FEED_FORMATS[fmt][1]
     return response
 
+@app.route('/feed.xml')
+@conditional(corpus_validators)
+def feed():
+    return feed_response('rss')
+
+@app.route('/atom.xml')
+@conditional(corpus_validators)
+def atom_feed():
+    return feed_response('atom')
+
+@app.route('/feed.json')
+@conditional(corpus_validators)
+def json_feed():
+    return feed_response('json')
+
+@app.route('/tags/<tag>/feed.xml')
+@conditional(corpus_validators)
+def tag_feed(tag):
+    return feed_response('rss', tag)
+
+@app.route('/tags/<tag>/atom.xml')
+@conditional(corpus_validators)
+def tag_atom_feed(tag):
+    return feed_response('atom', tag)
+
+@app.route('/tags/<tag>/feed.json')
+@conditional(corpus_validators)
+def tag_json_feed(tag):
+    return feed_response('json', tag)
+
+@app.cli.command('catalog-sync')
+@click.option('--backend', type=click.Choice(['memory', 'sqlite', 'snapshot']), default=None,
+              help='默认为 CATALOG_BACKEND；memory 只预热渲染缓存')
+@click.option('--workers', type=int, default=None,
+              help='并行解析的进程数，默认为 CPU 核数')
+def catalog_sync_command(backend, workers):
+    """预先解析 content/：同步 SQLite 目录或索引快照，并预热 instance/ 下的渲染缓存"""
+    backend = backend or app.config['CATALOG_BACKEND']
+    workers = workers if workers is not None else os.cpu_count() or 1
+    started = time.monotonic()
+    if backend == 'memory':
+        catalog = PostCatalog('content', renderer=markdown_renderer, workers=workers)
+        catalog.refresh(force=True)
+        click.echo(f'Loaded {len(catalog.posts())} posts with {workers} workers '
+                   f'in {time.monotonic() - started:.2f}s')
+        return
+    catalog = make_shared_catalog(backend, workers)
+    changed, removed = catalog.sync(force=True)
+    click.echo(f'Synced {changed} changed and {removed} removed posts (generation {catalog.generation}) '
+               f'with {workers} workers in {time.monotonic() - started:.2f}s')
+
+@app.cli.command('pygments-css')
+@click.option('--output', default=os.path.join('frontend', 'public', 'pygments.css'), show_default=True,
+              help='输出文件')
+def pygments_css_command(output):
+    """生成代码高亮样式，前端以静态资源引入，静态部署（如 GitHub Pages）时不依赖 /api"""
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        f.write(markdown_renderer.highlight_css())
+    click.echo(f'Wrote {output}')
+
+def export_search_index():
+    """预先计算得分的搜索索引（JSON），供静态站点在浏览器端检索"""
+    if shared_catalog is None:
+        post_catalog.sync()
+        index = search_index
+    else:
+        index = SearchIndex()
+        for post in get_posts():
+            index.add(post['filename'], post)
+    exported = index.export()
+    return app.json.dumps({
+        # 查询按 utils/search_index.tokenize 的规则切词（英文按单词、中文相邻二字），各词得分相加
+        'tokenizer': 'latin-words+cjk-bigrams',
+        'docs': [post_query.project(post, post_query.DEFAULT_FIELDS) for post in exported['docs']],
+        'terms': exported['terms']
+    }).encode('utf-8')
+
+@app.cli.command('export')
+@click.option('--output', default='static_export', show_default=True, help='输出目录')
+@click.option('--base-url', default='http://localhost/', show_default=True,
+              help='站点根 URL，用于订阅中的绝对链接')
+@click.option('--workers', type=int, default=None, help='并行渲染的进程数，默认为 CPU 核数')
+def export_command(output, base_url, workers):
+    """把公开只读 API 导出为静态文件（可部署到 CDN / GitHub Pages），只重写内容变化的文件"""
+    workers = workers if workers is not None else os.cpu_count() or 1
+    started = time.monotonic()
+    with app.app_context():
+        search_json = export_search_index()
+    stats = export_site(
+        app, output, base_url=base_url, workers=workers,
+        extra_files={'api/search-index.json': search_json}
+    )
+    click.echo(f"Exported to {output}: {stats['written']} written, {stats['unchanged']} unchanged, "
+               f"{stats['removed']} removed in {time.monotonic() - started:.2f}s")
+
 @app.errorhandler(404)
 def page_not_found(e):
     return jsonify({'error': 'Page not found'}), 404
@@ -0,0 +1,118 @@
+"""文章解析的微基准：load_post() 的元数据解析与原来的 yaml.safe_load 对比，以及 Markdown 渲染所占的比例
+
+用法：
+    python benchmarks/front_matter_bench.py                 # 使用 content/ 下的文章
+    python benchmarks/front_matter_bench.py --generate 2000 # 生成临时文章（正文约 8KB）
+"""
+import os
+import sys
+import glob
+import time
+import argparse
+import tempfile
+
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import front_matter  # noqa: E402
+from utils.post_catalog import load_post, split_front_matter  # noqa: E402
+
+BODY = ('# 标题\n\n' + '这是一段用于基准测试的正文，包含 `code` 与 [链接](https://example.com)。\n\n' * 80)
+
+
+def generate(directory, count):
+    for i in range(count):
+        with open(os.path.join(directory, f'post-{i:05d}.md'), 'w', encoding='utf-8') as f:
+            f.write(
+                '---\n'
+                f'title: 基准测试文章 {i}\n'
+                f'date: 2026-02-{1 + i % 28:02d}T12:00:00.000001\n'
+                f'tags: [标签{i % 10}, 测试, API]\n'
+                f'category: 分类{i % 5}\n'
+                f'author_id: {i % 3}\n'
+                'author_name: admin\n'
+                '---\n\n' + BODY
+            )
+
+
+def baseline(path):
+    # 重构前 get_posts() 的做法
+    with open(path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    metadata = {}
+    if content.startswith('---'):
+        parts = content.split('---', 2)[1:]
+        if len(parts) == 2:
+            metadata = yaml.safe_load(parts[0]) or {}
+    return metadata
+
+
+def read_header(path):
+    # 与 load_post() 相同：读取整个文件后切分
+    with open(path, 'r', encoding='utf-8') as f:
+        return split_front_matter(f.read())[0]
+
+
+def c_loader(path):
+    header = read_header(path)
+    return yaml.load(header, Loader=front_matter.SafeLoader) or {} if header is not None else {}
+
+
+def parse_metadata(path):
+    header = read_header(path)
+    return front_matter.parse_front_matter(header) or {} if header is not None else {}
+
+
+def full_post(path):
+    return load_post(path, os.path.basename(path))
+
+
+def run(name, func, paths, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for path in paths:
+            func(path)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    per_file = best / len(paths) * 1e6
+    print(f'{name:<32} {best * 1000:9.2f} ms  {per_file:8.1f} us/file')
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--content', default='content')
+    parser.add_argument('--generate', type=int, default=0, help='生成指定数量的临时文章代替 content/')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.generate:
+            generate(directory, args.generate)
+            paths = sorted(glob.glob(os.path.join(directory, '*.md')))
+        else:
+            paths = sorted(glob.glob(os.path.join(args.content, '**', '*.md'), recursive=True))
+        if not paths:
+            sys.exit('No posts found')
+
+        mismatches = [path for path in paths if baseline(path) != parse_metadata(path)]
+        print(f'{len(paths)} files, libyaml: {front_matter.SafeLoader is not yaml.SafeLoader}, '
+              f'fast path coverage: '
+              f'{sum(front_matter.parse_simple(read_header(p) or "") is not None for p in paths)}'
+              f'/{len(paths)}, mismatches: {len(mismatches)}')
+
+        base = run('full read + yaml.safe_load', baseline, paths, args.repeat)
+        for name, func in (
+            ('full read + CSafeLoader', c_loader),
+            ('full read + parse_front_matter', parse_metadata),
+        ):
+            elapsed = run(name, func, paths, args.repeat)
+            print(f'{"":<32} {base / elapsed:9.1f}x')
+        # load_post() 还要渲染 Markdown 生成摘要，元数据解析只占其中一小部分
+        run('load_post (parse + render)', full_post, paths, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
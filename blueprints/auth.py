@@ -1,9 +1,12 @@
 from flask import Blueprint, request, jsonify
 from functools import wraps
 from datetime import datetime
+import os
 import uuid
 import bcrypt
-from utils.jwt_utils import create_token, verify_token, token_required, admin_required
+from utils.password_hashing import PasswordHasher, HasherBusy, TokenBucketLimiter, retry_after
+from utils.user_store import UserStore, UserExists
+from utils.jwt_utils import create_token, get_request_token, get_current_claims, resolve_request_user, revoke_token, admin_required
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -15,44 +18,63 @@ ADMIN_CREDENTIALS = {
     'password_hash': ADMIN_PASSWORD_HASH
 }
 
-users_db = {}
+# 用户表保存在 instance/ 下的 SQLite 中，所有 worker 共享，重启后保留；
+# 读缓存最多每 USER_CACHE_INTERVAL 秒检查一次其他 worker 的写入
+user_store = UserStore(
+    os.getenv('USER_DB', os.path.join('instance', 'users.db')),
+    min_interval=float(os.getenv('USER_CACHE_INTERVAL', '0.5'))
+)
+
+# 登录、注册的 bcrypt 在独立的有界线程池中执行，队列满时快速返回 503，不占满请求 worker
+password_hasher = PasswordHasher(
+    workers=int(os.getenv('AUTH_HASH_WORKERS', '2')),
+    max_queue=int(os.getenv('AUTH_HASH_QUEUE', '16')),
+    timeout=float(os.getenv('AUTH_HASH_TIMEOUT', '10'))
+)
+# 令牌桶限流：每个 IP / 用户名的突发次数与每秒补充速率，超出时返回 429
+ip_limiter = TokenBucketLimiter(
+    rate=float(os.getenv('AUTH_IP_RATE', '0.2')),
+    burst=int(os.getenv('AUTH_IP_BURST', '10'))
+)
+username_limiter = TokenBucketLimiter(
+    rate=float(os.getenv('AUTH_USERNAME_RATE', '0.1')),
+    burst=int(os.getenv('AUTH_USERNAME_BURST', '5'))
+)
+
+def throttle(username=None):
+    """按 IP（及用户名）限流，超出时返回 429 响应"""
+    checks = [(ip_limiter, request.remote_addr or '')]
+    if username:
+        checks.append((username_limiter, username))
+    for limiter, key in checks:
+        wait = limiter.acquire(key)
+        if wait:
+            response = jsonify({'error': 'Too many attempts, please try again later'})
+            response.headers['Retry-After'] = retry_after(wait)
+            return response, 429
+    return None
+
+def hasher_busy():
+    response = jsonify({'error': 'Server is busy, please try again later'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
 
 def init_users():
-    """初始化用户数据库"""
-    global users_db
-    users_db = {
-        'admin': {
-            'id': '1',
-            'username': 'admin',
-            'password_hash': ADMIN_PASSWORD_HASH,
-            'email': 'admin@example.com',
-            'role': 'admin',
-            'created_at': datetime.now().isoformat()
-        }
-    }
+    """初始化用户数据库：管理员账号不存在时写入"""
+    user_store.ensure({
+        'id': '1',
+        'username': 'admin',
+        'password_hash': ADMIN_PASSWORD_HASH,
+        'email': 'admin@example.com',
+        'role': 'admin',
+        'created_at': datetime.now().isoformat()
+    })
 
 init_users()
 
 def get_current_user():
     """获取当前登录用户"""
-    token = None
-    
-    if 'Authorization' in request.headers:
-        auth_header = request.headers['Authorization']
-        if auth_header.startswith('Bearer '):
-            token = auth_header[7:]
-    
-    if not token:
-        token = request.cookies.get('token')
-    
-    if not token:
-        return None
-    
-    payload = verify_token(token)
-    if not payload:
-        return None
-    
-    return payload
+    return get_current_claims()
 
 @auth_bp.route('/api/auth/login', methods=['POST'])
 def login():
@@ -68,10 +90,27 @@ def login():
     if not username or not password:
         return jsonify({'error': 'Username and password are required'}), 400
     
+    throttled = throttle(username)
+    if throttled is not None:
+        return throttled
+    
     user_id = str(uuid.uuid4())
     
+    try:
+        response, status = _check_login(username, password, user_id)
+    except HasherBusy:
+        # 没有校验密码，不计入该用户名的尝试次数
+        username_limiter.refund(username)
+        return hasher_busy()
+    if status == 200:
+        # 用户名限流只针对猜密码，登录成功的这次退还
+        username_limiter.refund(username)
+    return response, status
+
+def _check_login(username, password, user_id):
+    """校验用户名与密码，成功时签发 token"""
     # 验证管理员账号
-    if username == ADMIN_CREDENTIALS['username'] and bcrypt.checkpw(password.encode('utf-8'), ADMIN_CREDENTIALS['password_hash'].encode('utf-8')):
+    if username == ADMIN_CREDENTIALS['username'] and password_hasher.check(password, ADMIN_CREDENTIALS['password_hash']):
         admin_token = create_token(user_id, username, role='admin')
         return jsonify({
             'message': 'Login successful',
@@ -84,9 +123,9 @@ def login():
         }), 200
     
     # 验证注册用户
-    if username in users_db:
-        user = users_db[username]
-        if bcrypt.checkpw(password.encode('utf-8'), user['password_hash'].encode('utf-8')):
+    user = user_store.get_by_username(username)
+    if user is not None:
+        if password_hasher.check(password, user['password_hash']):
             user_token = create_token(user['id'], username, role=user['role'])
             return jsonify({
                 'message': 'Login successful',
@@ -102,23 +141,19 @@ def login():
 
 @auth_bp.route('/api/auth/logout', methods=['POST'])
 def logout():
-    """用户登出API"""
+    """用户登出API：注销当前 token，之后用它访问需要登录的接口返回 401"""
+    token = get_request_token()
+    if token:
+        revoke_token(token)
     return jsonify({'message': 'Logout successful'}), 200
 
 @auth_bp.route('/api/auth/me', methods=['GET'])
 def me():
     """获取当前登录用户信息"""
-    token = None
-    
-    if 'Authorization' in request.headers:
-        auth_header = request.headers['Authorization']
-        if auth_header.startswith('Bearer '):
-            token = auth_header[7:]
-    
+    token, payload = resolve_request_user()
     if not token:
         return jsonify({'error': 'Not authenticated'}), 401
     
-    payload = verify_token(token)
     if not payload:
         return jsonify({'error': 'Invalid or expired token'}), 401
     
@@ -162,20 +197,31 @@ def register():
         return jsonify({'error': 'All fields are required'}), 400
     
     # 检查用户是否已存在
-    if username in users_db:
+    if user_store.get_by_username(username) is not None:
         return jsonify({'error': 'Username already exists'}), 400
     
+    throttled = throttle()
+    if throttled is not None:
+        return throttled
+    
     # 创建新用户
     user_id = str(uuid.uuid4())
-    password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-    users_db[username] = {
-        'id': user_id,
-        'username': username,
-        'password_hash': password_hash,
-        'email': email,
-        'role': 'user',
-        'created_at': datetime.now().isoformat()
-    }
+    try:
+        password_hash = password_hasher.hash(password)
+    except HasherBusy:
+        return hasher_busy()
+    try:
+        user_store.create({
+            'id': user_id,
+            'username': username,
+            'password_hash': password_hash,
+            'email': email,
+            'role': 'user',
+            'created_at': datetime.now().isoformat()
+        })
+    except UserExists:
+        # 哈希期间被其他请求抢先注册
+        return jsonify({'error': 'Username already exists'}), 400
     
     return jsonify({
         'message': 'Registration successful',
@@ -190,17 +236,25 @@ def register():
 @auth_bp.route('/api/admin/users', methods=['GET'])
 @admin_required
 def get_users():
-    """获取所有用户列表（管理员）"""
-    users_list = []
-    for username, user in users_db.items():
-        users_list.append({
+    """用户列表（管理员）：按注册时间分页，q 按用户名或邮箱过滤，role 按角色过滤"""
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 20, type=int), 1), 100)
+    users, total, pages = user_store.list_users(
+        page, per_page, q=request.args.get('q'), role=request.args.get('role')
+    )
+    return jsonify({
+        'users': [{
             'id': user['id'],
             'username': user['username'],
             'email': user['email'],
             'role': user['role'],
             'created_at': user['created_at']
-        })
-    return jsonify({'users': users_list}), 200
+        } for user in users],
+        'total': total,
+        'page': page,
+        'pages': pages,
+        'per_page': per_page
+    }), 200
 
 @auth_bp.route('/api/admin/users/<user_id>/role', methods=['PUT'])
 @admin_required
@@ -212,20 +266,18 @@ def update_user_role(user_id):
     if not new_role or new_role not in ['admin', 'user']:
         return jsonify({'error': 'Invalid role'}), 400
     
-    # 查找用户
-    for username, user in users_db.items():
-        if user['id'] == user_id:
-            users_db[username]['role'] = new_role
-            return jsonify({
-                'message': 'User role updated successfully',
-                'user': {
-                    'id': user['id'],
-                    'username': user['username'],
-                    'role': new_role
-                }
-            }), 200
+    user = user_store.update_role(user_id, new_role)
+    if user is None:
+        return jsonify({'error': 'User not found'}), 404
     
-    return jsonify({'error': 'User not found'}), 404
+    return jsonify({
+        'message': 'User role updated successfully',
+        'user': {
+            'id': user['id'],
+            'username': user['username'],
+            'role': user['role']
+        }
+    }), 200
 
 @auth_bp.route('/api/admin/users/<user_id>', methods=['DELETE'])
 @admin_required
@@ -240,10 +292,7 @@ def delete_user(user_id):
     if user_id == '1':
         return jsonify({'error': 'Cannot delete admin'}), 400
     
-    # 查找并删除用户
-    for username, user in users_db.items():
-        if user['id'] == user_id:
-            del users_db[username]
-            return jsonify({'message': 'User deleted successfully'}), 200
+    if user_store.delete(user_id):
+        return jsonify({'message': 'User deleted successfully'}), 200
     
     return jsonify({'error': 'User not found'}), 404
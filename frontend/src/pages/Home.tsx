@@ -11,10 +11,9 @@ import {
 interface Post {
   filename: string
   title: string
-  content: string
   summary: string
   date: string | Date
-  metadata: any
+  category?: string
   tags?: string[]
 }
 
@@ -225,8 +224,8 @@ const Home: React.FC = () => {
                     <span className="post-date">
                       {typeof post.date === 'string' ? post.date : post.date?.toISOString().split('T')[0]}
                     </span>
-                    {post.metadata?.category && (
-                      <span className="post-category">{post.metadata.category}</span>
+                    {post.category && (
+                      <span className="post-category">{post.category}</span>
                     )}
                   </div>
                   {post.tags && post.tags.length > 0 && (
@@ -271,7 +270,7 @@ const Home: React.FC = () => {
                 transition={{ duration: 0.5, delay: 0.7 }}
               >
                 {/* 计算分类数量 */}
-                {Array.from(new Set(posts.map(post => post.metadata?.category).filter(Boolean))).length}
+                {Array.from(new Set(posts.map(post => post.category).filter(Boolean))).length}
               </motion.div>
               <p className="stat-label">分类数量</p>
             </div>
@@ -15,6 +15,15 @@ interface Post {
   tags?: string[]
   author_id?: string
   author_name?: string
+  html?: string
+  toc_tokens?: TocToken[]
+}
+
+interface TocToken {
+  id: string
+  name: string
+  level: number
+  children: TocToken[]
 }
 
 interface TableOfContents {
@@ -126,11 +135,15 @@ const PostDetail: React.FC = () => {
     try {
       setLoading(true)
       setError('')
-      const postData = await postApi.getPost(filename!)
+      const postData = await postApi.getPost(filename!, 'html,toc')
       if (postData) {
         setPost(postData)
-        // 生成目录
-        generateToc(postData.content)
+        // 生成目录：优先使用服务端渲染的目录树
+        if (postData.toc_tokens) {
+          setToc(postData.toc_tokens.map(tocFromToken))
+        } else {
+          generateToc(postData.content)
+        }
       } else {
         setError('文章不存在')
       }
@@ -142,6 +155,13 @@ const PostDetail: React.FC = () => {
     }
   }
 
+  const tocFromToken = (token: TocToken): TableOfContents => ({
+    id: token.id,
+    text: token.name,
+    level: token.level,
+    children: token.children.length > 0 ? token.children.map(tocFromToken) : undefined
+  })
+
   const generateToc = (content: string) => {
     const toc: TableOfContents[] = []
     const headerRegex = /^(#{1,6})\s+(.*)$/gm
@@ -414,7 +434,9 @@ const PostDetail: React.FC = () => {
                 className="content-body" 
                 ref={contentRef}
                 dangerouslySetInnerHTML={{ 
-                  __html: (marked(post.content) as string)
+                  __html: post.html
+                    ? post.html.replace(/<img([^>]*)src="([^"]*)"([^>]*)>/g, '<img$1src="$2"$3 loading="lazy">')
+                    : (marked(post.content) as string)
                     .replace(/<h([1-6])([^>]*)>(.*?)<\/h[1-6]>/g, (_match: string, level: string, attrs: string, text: string) => {
                       const id = text.toLowerCase().replace(/\s+/g, '-')
                       return `<h${level} id="${id}" ${attrs}>${text}</h${level}>`
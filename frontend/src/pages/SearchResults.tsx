@@ -1,25 +1,26 @@
 import React, { useState, useEffect } from 'react'
 import { useNavigate, useSearchParams } from 'react-router-dom'
 import { motion, AnimatePresence } from 'framer-motion'
-import { postApi } from '../services/api'
+import { searchApi } from '../services/api'
 import { FaArrowLeft, FaSearch, FaTimes } from 'react-icons/fa'
 
 interface Post {
   filename: string
   title: string
-  content: string
+  title_highlight: string
   summary: string
+  snippet: string
   date: string | Date
-  metadata: any
+  category?: string
   tags?: string[]
 }
 
 const SearchResults: React.FC = () => {
   const navigate = useNavigate()
   const [searchParams] = useSearchParams()
-  const [posts, setPosts] = useState<Post[]>([])
   const [filteredPosts, setFilteredPosts] = useState<Post[]>([])
-  const [loading, setLoading] = useState(true)
+  const [total, setTotal] = useState(0)
+  const [loading, setLoading] = useState(false)
   const [error, setError] = useState('')
   const [query, setQuery] = useState('')
 
@@ -27,51 +28,30 @@ const SearchResults: React.FC = () => {
 
   useEffect(() => {
     setQuery(searchQuery)
-    fetchPosts()
-  }, [searchQuery])
-
-  useEffect(() => {
-    if (posts.length > 0 && searchQuery) {
-      filterPosts()
+    if (searchQuery) {
+      fetchResults()
     } else {
       setFilteredPosts([])
+      setTotal(0)
     }
-  }, [posts, searchQuery])
+  }, [searchQuery])
 
-  const fetchPosts = async () => {
+  // 服务端全文搜索，只返回命中文章的摘要和高亮片段
+  const fetchResults = async () => {
     try {
       setLoading(true)
       setError('')
-      const data = await postApi.getAllPosts()
-      setPosts(data)
+      const data = await searchApi.search(searchQuery)
+      setFilteredPosts(data.results)
+      setTotal(data.total)
     } catch (err) {
-      console.error('获取文章失败:', err)
-      setError('获取文章失败，请稍后重试')
+      console.error('搜索失败:', err)
+      setError('搜索失败，请稍后重试')
     } finally {
       setLoading(false)
     }
   }
 
-  const filterPosts = () => {
-    if (!searchQuery) {
-      setFilteredPosts([])
-      return
-    }
-
-    const filtered = posts.filter(post => {
-      const searchLower = searchQuery.toLowerCase()
-      return (
-        post.title?.toLowerCase().includes(searchLower) ||
-        post.summary?.toLowerCase().includes(searchLower) ||
-        post.content?.toLowerCase().includes(searchLower) ||
-        post.tags?.some(tag => tag.toLowerCase().includes(searchLower)) ||
-        post.metadata?.category?.toLowerCase().includes(searchLower)
-      )
-    })
-
-    setFilteredPosts(filtered)
-  }
-
   const handleBack = () => {
     navigate('/')
   }
@@ -192,7 +172,7 @@ const SearchResults: React.FC = () => {
                 animate={{ opacity: 1 }}
                 transition={{ duration: 0.5, delay: 0.2 }}
               >
-                <p>找到 {filteredPosts.length} 篇相关文章</p>
+                <p>找到 {total} 篇相关文章</p>
               </motion.div>
 
               <AnimatePresence mode="wait">
@@ -215,14 +195,20 @@ const SearchResults: React.FC = () => {
                         style={{ cursor: 'pointer' }}
                       >
                         <div className="post-content">
-                          <h3 className="post-title">{post.title}</h3>
-                          <p className="post-excerpt">{post.summary}</p>
+                          <h3
+                            className="post-title"
+                            dangerouslySetInnerHTML={{ __html: post.title_highlight }}
+                          />
+                          <p
+                            className="post-excerpt"
+                            dangerouslySetInnerHTML={{ __html: post.snippet || post.summary }}
+                          />
                           <div className="post-meta">
                             <span className="post-date">
                               {typeof post.date === 'string' ? post.date : post.date?.toISOString().split('T')[0]}
                             </span>
-                            {post.metadata?.category && (
-                              <span className="post-category">{post.metadata.category}</span>
+                            {post.category && (
+                              <span className="post-category">{post.category}</span>
                             )}
                           </div>
                           {post.tags && post.tags.length > 0 && (
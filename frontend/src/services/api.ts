@@ -250,21 +250,56 @@ export const adminApi = {
   }
 };
 
+export interface PostQuery {
+  page?: number;
+  per_page?: number;
+  cursor?: string;
+  fields?: string;
+  sort?: string;
+  tag?: string;
+  category?: string;
+  author_id?: string;
+  date_from?: string;
+  date_to?: string;
+}
+
+export interface PostPage {
+  posts: any[];
+  total: number;
+  page: number | null;
+  pages: number | null;
+  per_page: number;
+  next_cursor: string | null;
+}
+
 export const postApi = {
-  getAllPosts: async () => {
+  getPosts: async (params: PostQuery = {}): Promise<PostPage> => {
     try {
-      const response = await apiClient.get('/posts');
-      // 确保返回的数据是数组
-      return Array.isArray(response.data) ? response.data : [];
+      const response = await apiClient.get('/posts', { params });
+      return response.data;
     } catch (error) {
       console.error('获取文章列表失败:', error);
-      return [];
+      return { posts: [], total: 0, page: null, pages: null, per_page: 0, next_cursor: null };
     }
   },
 
-  getPost: async (filename: string) => {
+  // 按游标逐页拉取全部文章（默认不含正文）
+  getAllPosts: async (params: PostQuery = {}) => {
+    const posts: any[] = [];
+    let cursor: string | undefined;
+    do {
+      const data = await postApi.getPosts({ ...params, per_page: 100, cursor });
+      posts.push(...data.posts);
+      cursor = data.next_cursor || undefined;
+    } while (cursor);
+    return posts;
+  },
+
+  getPost: async (filename: string, include?: string) => {
     try {
-      const response = await apiClient.get(`/posts/${filename}`);
+      const response = await apiClient.get(`/posts/${filename}`, {
+        params: include ? { include } : undefined
+      });
       return response.data;
     } catch (error) {
       console.error('获取文章失败:', error);
@@ -303,6 +338,20 @@ export const postApi = {
   }
 };
 
+export const searchApi = {
+  search: async (q: string, page = 1, perPage = 20) => {
+    try {
+      const response = await apiClient.get('/search', {
+        params: { q, page, per_page: perPage }
+      });
+      return response.data;
+    } catch (error) {
+      console.error('搜索失败:', error);
+      return { query: q, results: [], total: 0, page: 1, pages: 0, per_page: perPage };
+    }
+  }
+};
+
 export const tagApi = {
   getAllTags: async () => {
     try {
@@ -312,17 +361,43 @@ export const tagApi = {
       console.error('获取标签失败:', error);
       return { tags: {}, tag_posts: {} };
     }
+  },
+
+  getTagPosts: async (tag: string, page = 1, perPage = 20) => {
+    try {
+      const response = await apiClient.get(`/tags/${encodeURIComponent(tag)}`, {
+        params: { page, per_page: perPage }
+      });
+      return response.data;
+    } catch (error) {
+      console.error('获取标签文章失败:', error);
+      return { tag, posts: [], total: 0, page: 1, pages: 0, per_page: perPage };
+    }
   }
 };
 
 export const archiveApi = {
+  // 只返回各年月的文章数
   getArchive: async () => {
     try {
       const response = await apiClient.get('/archive');
       return response.data;
     } catch (error) {
       console.error('获取归档数据失败:', error);
-      return { articles: [], stats: {} };
+      return { years: [], total: 0 };
+    }
+  },
+
+  // 展开某一年或某个月时再加载其中的文章
+  getArchivePosts: async (year: number, month?: number, page = 1, perPage = 20) => {
+    try {
+      const response = await apiClient.get('/archive', {
+        params: { year, month, page, per_page: perPage }
+      });
+      return response.data;
+    } catch (error) {
+      console.error('获取归档文章失败:', error);
+      return { year, month, months: [], posts: [], total: 0, page: 1, pages: 0, per_page: perPage };
     }
   }
 };
@@ -343,6 +418,7 @@ export default {
   auth: authApi,
   admin: adminApi,
   post: postApi,
+  search: searchApi,
   tag: tagApi,
   archive: archiveApi,
   about: aboutApi
@@ -0,0 +1,257 @@
+import os
+import re
+import json
+import uuid
+import time
+import logging
+import tempfile
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import yaml
+
+from utils.post_catalog import split_front_matter
+from utils.post_writer import replace_post_file, post_lock
+
+try:
+    import fcntl
+except ImportError:  # Windows 开发环境只跑单个进程，不需要文件锁
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+JOB_ID = re.compile(r'[0-9a-f]{32}')
+
+
+def rewrite_front_matter(content_dir, rel_path, change):
+    """用 change(metadata) 修改单篇文章的元数据并原子替换文件，正文逐字保留
+
+    change 返回新的元数据字典；没有变化时不写文件，返回 False。读取到替换都持有该文章的
+    写锁，期间编辑文章的请求会等待，不会被覆盖。
+    """
+    with post_lock(content_dir, rel_path):
+        with open(os.path.join(content_dir, rel_path), 'r', encoding='utf-8') as f:
+            text = f.read()
+        header, body = split_front_matter(text)
+        metadata = (yaml.safe_load(header) if header is not None else None) or {}
+        if not isinstance(metadata, dict):
+            metadata = {}
+        updated = change(dict(metadata))
+        if updated == metadata:
+            return False
+        if header is None:
+            body = '\n' + body
+        dumped = yaml.safe_dump(updated, allow_unicode=True, sort_keys=False, default_flow_style=None, width=10000)
+        replace_post_file(content_dir, rel_path, f'---\n{dumped}---{body}')
+        return True
+
+
+def _tag_list(tags):
+    if isinstance(tags, str):
+        return [tag.strip() for tag in tags.split(',')]
+    if not isinstance(tags, list):
+        return [tags]
+    return tags
+
+
+def replace_tags(sources, target=None):
+    """把 sources 中的标签改为 target（重命名 / 合并），target 为 None 时删除，结果去重"""
+    sources = {str(source) for source in sources}
+
+    def change(metadata):
+        tags = _tag_list(metadata.get('tags'))
+        if not any(tag is not None and str(tag) in sources for tag in tags):
+            return metadata
+        result = {}
+        for tag in tags:
+            if tag is not None and str(tag) in sources:
+                tag = target
+            if tag is not None:
+                result.setdefault(str(tag), tag)
+        if result:
+            metadata['tags'] = list(result.values())
+        else:
+            metadata.pop('tags', None)
+        return metadata
+
+    return change
+
+
+def replace_category(sources, target=None):
+    """把 sources 中的分类改为 target，target 为 None 时去掉分类"""
+    sources = {str(source) for source in sources}
+
+    def change(metadata):
+        category = metadata.get('category')
+        if not category or str(category) not in sources:
+            return metadata
+        if target:
+            metadata['category'] = target
+        else:
+            metadata.pop('category', None)
+        return metadata
+
+    return change
+
+
+class BulkJobs:
+    """批量修改文章元数据的后台任务
+
+    任务按提交顺序逐个执行，执行时持有 directory/.run.lock 的文件锁，多个 worker 提交的
+    任务同样逐个执行，避免两个任务同时改写同一篇文章；单个任务内用 workers 个线程
+    并行改写文件，全部写完后调用一次 commit(改动的路径)，目录与各索引只提交一次。
+    所有文章都改写成功后才调用 on_complete()，其返回值记为任务的 result。
+    任务状态以 JSON 原子写入 directory/<id>.json，任何 worker 都能查询进度。
+    """
+
+    def __init__(self, directory, content_dir='content', workers=4, keep_seconds=86400, progress_interval=0.5):
+        self.directory = directory
+        self.content_dir = content_dir
+        self.workers = workers
+        self.keep_seconds = keep_seconds
+        self.progress_interval = progress_interval
+        self._queue = ThreadPoolExecutor(max_workers=1, thread_name_prefix='bulk-job')
+        self._lock = threading.Lock()
+        self._events = {}   # 本进程内未结束的任务 -> threading.Event
+
+    def submit(self, kind, params, rel_paths, change, commit, on_complete=None):
+        """提交任务，返回初始状态"""
+        self._prune()
+        job = {
+            'id': uuid.uuid4().hex,
+            'kind': kind,
+            'params': params,
+            'state': 'queued',
+            'total': len(rel_paths),
+            'done': 0,
+            'changed': 0,
+            'failed': [],
+            'error': None,
+            'result': None,
+            'created_at': datetime.now().isoformat(),
+            'started_at': None,
+            'finished_at': None
+        }
+        self._save(job)
+        with self._lock:
+            self._events[job['id']] = threading.Event()
+        self._queue.submit(self._run, job, list(rel_paths), change, commit, on_complete)
+        return dict(job)
+
+    def get(self, job_id):
+        """任务状态，不存在时返回 None"""
+        if not JOB_ID.fullmatch(job_id or ''):
+            return None
+        try:
+            with open(self._path(job_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def wait(self, job_id, timeout):
+        """等待本进程内的任务结束，返回是否已结束"""
+        with self._lock:
+            event = self._events.get(job_id)
+        return event is None or event.wait(timeout)
+
+    def _run(self, job, rel_paths, change, commit, on_complete):
+        fd = self._acquire()
+        try:
+            self._execute(job, rel_paths, change, commit, on_complete)
+        finally:
+            self._release(fd)
+
+    def _acquire(self):
+        # 跨 worker 的任务锁，其他 worker 的任务执行完之前本任务保持 queued
+        os.makedirs(self.directory, exist_ok=True)
+        fd = os.open(os.path.join(self.directory, '.run.lock'), os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        return fd
+
+    def _release(self, fd):
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+    def _execute(self, job, rel_paths, change, commit, on_complete):
+        job['state'] = 'running'
+        job['started_at'] = datetime.now().isoformat()
+        self._save(job)
+        changed = []
+        committed = False
+        last_saved = time.monotonic()
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='bulk-edit') as executor:
+                futures = {
+                    executor.submit(rewrite_front_matter, self.content_dir, rel_path, change): rel_path
+                    for rel_path in rel_paths
+                }
+                for future in as_completed(futures):
+                    rel_path = futures[future]
+                    try:
+                        if future.result():
+                            changed.append(rel_path)
+                    except Exception:
+                        logger.exception('Failed to rewrite %s', rel_path)
+                        job['failed'].append(rel_path)
+                    job['done'] += 1
+                    job['changed'] = len(changed)
+                    if time.monotonic() - last_saved >= self.progress_interval:
+                        self._save(job)
+                        last_saved = time.monotonic()
+            if changed:
+                commit(changed)
+                committed = True
+            if not job['failed'] and on_complete is not None:
+                job['result'] = on_complete()
+            job['state'] = 'failed' if job['failed'] else 'completed'
+        except Exception as e:
+            logger.exception('Bulk job %s failed', job['id'])
+            job['state'] = 'failed'
+            job['error'] = str(e)
+            if changed and not committed:
+                # 已改写的文件仍需应用到目录，否则索引与磁盘不一致
+                try:
+                    commit(changed)
+                except Exception:
+                    logger.exception('Failed to apply changes of bulk job %s', job['id'])
+        finally:
+            job['finished_at'] = datetime.now().isoformat()
+            self._save(job)
+            with self._lock:
+                event = self._events.pop(job['id'], None)
+            if event is not None:
+                event.set()
+
+    def _path(self, job_id):
+        return os.path.join(self.directory, f'{job_id}.json')
+
+    def _save(self, job):
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(job, f, ensure_ascii=False)
+            os.replace(tmp_path, self._path(job['id']))
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def _prune(self):
+        # 清理 keep_seconds 之前的任务记录
+        cutoff = time.time() - self.keep_seconds
+        try:
+            entries = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            try:
+                if entry.name.endswith('.json') and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+            except OSError:
+                pass
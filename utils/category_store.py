@@ -0,0 +1,139 @@
+import itertools
+import re
+from datetime import datetime
+
+from utils.settings_store import SettingsStore
+
+
+class CategoryExists(ValueError):
+    """同名分类已存在"""
+
+
+def category_slug(name):
+    """分类名对应的 slug 基础部分：小写，空白和 / \\ ? # % 换成连字符，可以直接放进 URL 路径"""
+    slug = re.sub(r'[\s/\\?#%]+', '-', str(name).strip().lower()).strip('-')
+    return slug or 'category'
+
+
+def _unique_slug(name, taken):
+    """不在 taken 中的 slug：基础部分被其他分类占用时依次加后缀 -2、-3……"""
+    base = category_slug(name)
+    if base not in taken:
+        return base
+    for n in itertools.count(2):
+        if f'{base}-{n}' not in taken:
+            return f'{base}-{n}'
+
+
+def _find_slug(records, name):
+    """名称为 name 的记录的 slug，没有时返回 None"""
+    for slug, record in records.items():
+        if record['name'] == name:
+            return slug
+    return None
+
+
+def _record(name, slug, description='', created_at=None):
+    return {
+        'name': name,
+        'slug': slug,
+        'description': description,
+        'created_at': created_at
+    }
+
+
+def _now():
+    return datetime.now().isoformat()
+
+
+class CategoryStore:
+    """分类记录（名称、slug、描述、创建时间），以 slug 为键保存在 JSON 文件中
+
+    文章元数据只记录分类名，分类与文章的对应关系由目录的分类索引维护，这里只保存
+    文章之外的属性。读取与写入沿用 SettingsStore：进程内只读快照，写入持有文件锁并原子替换。
+    记录按分类名区分：slug 只相差大小写、空白或特殊字符的不同分类各有一条记录，slug 带后缀区分。
+    """
+
+    def __init__(self, path, min_interval=0.5):
+        self._store = SettingsStore(path, defaults={}, min_interval=min_interval)
+
+    def snapshot(self):
+        """只读快照，settings 为 {slug: 记录}，digest / last_modified 用于条件请求"""
+        return self._store.snapshot()
+
+    def get(self, slug):
+        record = self.snapshot().settings.get(slug)
+        return dict(record) if record is not None else None
+
+    def find(self, name):
+        """名称为 name 的分类记录，没有时返回 None"""
+        records = self.snapshot().settings
+        slug = _find_slug(records, name)
+        return dict(records[slug]) if slug is not None else None
+
+    def records(self, names=()):
+        """{slug: 记录}：已保存的记录，加上 names 中还没有记录的分类（描述为空、创建时间为 None）
+
+        只读，不写入文件；读请求用它列出直接放进 content/ 的文章带来的新分类。没有记录的
+        分类按名称排序后分配 slug，同一组分类每次得到的 slug 相同。
+        """
+        records = dict(self.snapshot().settings)
+        known = {record['name'] for record in records.values()}
+        for name in sorted({str(name) for name in names} - known):
+            slug = _unique_slug(name, records)
+            records[slug] = _record(name, slug)
+        return records
+
+    def ensure(self, names):
+        """为还没有记录的分类补上记录（以此刻为创建时间），已全部存在时不写文件"""
+        known = {record['name'] for record in self.snapshot().settings.values()}
+        missing = sorted({str(name) for name in names} - known)
+        if missing:
+            def change(current):
+                for name in missing:
+                    if _find_slug(current, name) is None:
+                        slug = _unique_slug(name, current)
+                        current[slug] = _record(name, slug, created_at=_now())
+
+            self._store.modify(change)
+
+    def create(self, name, description=''):
+        """新建分类记录，同名分类已存在时抛出 CategoryExists"""
+        def change(current):
+            if _find_slug(current, name) is not None:
+                raise CategoryExists(name)
+            slug = _unique_slug(name, current)
+            current[slug] = _record(name, slug, description, _now())
+            return dict(current[slug])
+
+        return self._store.modify(change)
+
+    def update(self, name, new_name=None, description=None):
+        """修改分类的名称或描述，返回更新后的记录
+
+        新名称已有记录时（合并到已有分类）保留目标分类的记录，删除原记录。
+        """
+        def change(current):
+            slug = _find_slug(current, name)
+            if slug is not None:
+                record = current.pop(slug)
+            else:
+                record = _record(name, _unique_slug(name, current), created_at=_now())
+            if new_name is not None and new_name != record['name']:
+                target = _find_slug(current, new_name)
+                if target is not None:
+                    record = current[target]
+                else:
+                    record = _record(new_name, _unique_slug(new_name, current), record['description'], record['created_at'])
+            if description is not None:
+                record['description'] = description
+            current[record['slug']] = record
+            return dict(record)
+
+        return self._store.modify(change)
+
+    def delete(self, name):
+        """删除分类记录，返回是否存在；快照中没有这条记录时不写文件"""
+        if _find_slug(self.snapshot().settings, name) is None:
+            return False
+        return self._store.modify(lambda current: current.pop(_find_slug(current, name), None) is not None)
@@ -0,0 +1,95 @@
+import gzip
+import threading
+from collections import OrderedDict
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # brotli 为可选依赖，未安装时只提供 gzip
+    brotli = None
+
+GZIP_LEVEL = 9
+# 压缩结果会被缓存，取较高的压缩率；11 对几百 KB 的列表过慢
+BROTLI_QUALITY = 9
+
+
+def available_encodings():
+    """服务端支持的编码，按优先级排列"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate_encoding():
+    """按 Accept-Encoding（含 q 值）选出响应编码，不接受压缩时返回 None"""
+    if not request.accept_encodings:
+        return None
+    return request.accept_encodings.best_match(available_encodings())
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    # mtime=0 使相同内容的压缩结果逐字节一致
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def compressible(response, min_size):
+    """是否值得压缩：非流式、未编码、文本类且不小于 min_size 字节"""
+    if response.is_streamed or response.direct_passthrough or 'Content-Encoding' in response.headers:
+        return False
+    mimetype = response.mimetype or ''
+    if not (mimetype.startswith('text/') or mimetype.endswith(('json', 'xml'))):
+        return False
+    return (response.content_length or 0) >= min_size
+
+
+class CompressedResponseCache:
+    """已压缩响应的缓存
+
+    键为条件请求的 ETag（由目录摘要、完整 URL 与协商出的表示形式、编码生成），
+    命中时不执行视图、也不重新压缩；文章变化后摘要改变，旧条目按 LRU 淘汰。
+    按压缩后的总字节数限制容量。
+    """
+
+    def __init__(self, min_size=1024, max_bytes=32 * 1024 * 1024):
+        self.min_size = min_size
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._size = 0
+
+    def get(self, key):
+        """返回 (压缩后的内容, Content-Type)，未命中时返回 None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def compress_response(self, response, key, encoding):
+        """压缩响应并缓存，太小或不可压缩时保持原样"""
+        if not compressible(response, self.min_size):
+            return response
+        body = compress(response.get_data(), encoding)
+        self.put(key, body, response.headers['Content-Type'])
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    def put(self, key, body, content_type):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old[0])
+            self._entries[key] = (body, content_type)
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
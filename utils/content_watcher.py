@@ -0,0 +1,160 @@
+import os
+import time
+import logging
+import threading
+from datetime import datetime
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:  # 非 Linux 或未安装 inotify_simple 时退回轮询
+    INotify = None
+    flags = None
+
+logger = logging.getLogger(__name__)
+
+
+class ContentWatcher:
+    """后台监听 content/ 变化并推送到文章目录
+
+    mode 为 'inotify'、'poll' 或 'auto'（有 inotify 时使用 inotify，否则轮询）。
+    连续写入的事件在 debounce 秒内合并为一批，最长等待 max_delay 秒后强制提交。
+    """
+
+    def __init__(self, catalog, mode='auto', debounce=0.2, max_delay=2.0, poll_interval=2.0):
+        if mode == 'auto':
+            mode = 'inotify' if INotify is not None else 'poll'
+        if mode == 'inotify' and INotify is None:
+            raise RuntimeError('inotify_simple is not installed')
+        if mode not in ('inotify', 'poll'):
+            raise ValueError(f'Unknown watcher mode: {mode}')
+
+        self.catalog = catalog
+        self.mode = mode
+        self.debounce = debounce
+        self.max_delay = max(max_delay, debounce)
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._pending_since = None
+        self._last_sync = None
+        self._last_sync_at = None
+        self._batches = 0
+        self._last_error = None
+
+    def start(self):
+        """完成一次全量刷新后启动后台线程，之后请求线程不再扫描磁盘"""
+        if self._thread is not None:
+            return
+        self.catalog.refresh(force=True)
+        self._mark_synced()
+        self.catalog.auto_refresh = False
+        target = self._run_inotify if self.mode == 'inotify' else self._run_poll
+        self._thread = threading.Thread(target=target, name='content-watcher', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.catalog.auto_refresh = True
+
+    def is_alive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def lag(self):
+        """距离磁盘变化被应用到目录的延迟（秒）"""
+        now = time.monotonic()
+        if self.mode == 'poll':
+            return now - self._last_sync if self._last_sync is not None else None
+        if self._pending_since is not None:
+            return now - self._pending_since
+        return 0.0
+
+    def status(self):
+        return {
+            'mode': self.mode,
+            'running': self.is_alive(),
+            'lag_seconds': self.lag(),
+            'last_sync_at': self._last_sync_at,
+            'batches': self._batches,
+            'generation': self.catalog.generation,
+            'last_error': self._last_error
+        }
+
+    def _mark_synced(self):
+        self._last_sync = time.monotonic()
+        self._last_sync_at = datetime.now().isoformat()
+
+    def _sync(self, paths, full):
+        try:
+            if full:
+                self.catalog.refresh(force=True)
+            elif paths:
+                self.catalog.update_paths(paths)
+            self._batches += 1
+            self._last_error = None
+        except Exception as e:
+            logger.exception('Content watcher failed to apply changes')
+            self._last_error = str(e)
+        self._mark_synced()
+
+    def _run_poll(self):
+        # 轮询间隔本身即合并窗口，单线程按固定间隔做增量刷新
+        while not self._stop.wait(self.poll_interval):
+            self._sync(None, full=True)
+
+    def _run_inotify(self):
+        mask = (flags.CREATE | flags.MODIFY | flags.CLOSE_WRITE | flags.DELETE
+                | flags.MOVED_FROM | flags.MOVED_TO | flags.DELETE_SELF)
+        inotify = INotify()
+        watches = {}
+
+        def add_tree(path):
+            for root, dirs, files in os.walk(path):
+                try:
+                    watches[inotify.add_watch(root, mask)] = root
+                except OSError:
+                    pass
+
+        add_tree(self.catalog.content_dir)
+        pending = set()
+        full = False
+
+        try:
+            while not self._stop.is_set():
+                timeout = self.debounce if self._pending_since is not None else 1.0
+                events = inotify.read(timeout=int(timeout * 1000))
+                for event in events:
+                    if event.mask & flags.Q_OVERFLOW:
+                        full = True
+                    elif event.mask & flags.IGNORED:
+                        watches.pop(event.wd, None)
+                        continue
+                    else:
+                        directory = watches.get(event.wd)
+                        if directory is None:
+                            continue
+                        path = os.path.join(directory, event.name)
+                        if event.mask & flags.ISDIR or event.mask & flags.DELETE_SELF:
+                            # 目录新增、移动或删除时，补充监听并做一次增量全量刷新
+                            if event.mask & (flags.CREATE | flags.MOVED_TO):
+                                add_tree(path)
+                            full = True
+                        elif event.name.endswith('.md'):
+                            pending.add(os.path.relpath(path, self.catalog.content_dir))
+                        else:
+                            continue
+                    if self._pending_since is None:
+                        self._pending_since = time.monotonic()
+
+                if self._pending_since is None:
+                    continue
+                waited = time.monotonic() - self._pending_since
+                if not events or waited >= self.max_delay:
+                    self._sync(pending, full)
+                    pending = set()
+                    full = False
+                    self._pending_since = None
+        finally:
+            inotify.close()
@@ -0,0 +1,77 @@
+import threading
+
+
+def post_tags(post):
+    """文章的标签列表（去重，统一为字符串）"""
+    tags = post.get('tags') or []
+    if not isinstance(tags, list):
+        tags = [tags]
+    return list(dict.fromkeys(str(tag) for tag in tags if tag is not None))
+
+
+def post_category(post):
+    """文章的分类（统一为字符串），没有分类时为空列表"""
+    category = post['metadata'].get('category')
+    return [str(category)] if category else []
+
+
+def post_month(post):
+    """文章所在的归档月份，形如 2026-02"""
+    date = post.get('date')
+    if not hasattr(date, 'strftime'):
+        return []
+    return [date.strftime('%Y-%m')]
+
+
+class FacetIndex:
+    """分面索引：取值 -> 文章，随文章目录增量维护
+
+    key 接收文章并返回其取值列表（如标签）。每个取值下的文章按日期倒序，
+    只有发生变化的取值会在下次读取时重新排序。
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self._lock = threading.RLock()
+        self._members = {}     # 取值 -> {相对路径: 文章}
+        self._sorted = {}      # 取值 -> 已排序的文章列表
+
+    def __call__(self, changes):
+        with self._lock:
+            for rel_path, old, new in changes:
+                if old is not None:
+                    for value in self.key(old):
+                        members = self._members.get(value)
+                        if members is None:
+                            continue
+                        members.pop(rel_path, None)
+                        self._sorted.pop(value, None)
+                        if not members:
+                            del self._members[value]
+                if new is not None:
+                    for value in self.key(new):
+                        self._members.setdefault(value, {})[rel_path] = new
+                        self._sorted.pop(value, None)
+
+    def counts(self):
+        """{取值: 文章数}"""
+        with self._lock:
+            return {value: len(members) for value, members in self._members.items()}
+
+    def paths(self, value):
+        """某个取值下文章的相对路径"""
+        with self._lock:
+            return list(self._members.get(value, ()))
+
+    def __contains__(self, value):
+        return value in self._members
+
+    def posts(self, value):
+        """某个取值下的文章，按日期倒序"""
+        with self._lock:
+            result = self._sorted.get(value)
+            if result is None:
+                members = self._members.get(value, {})
+                result = sorted(members.values(), key=lambda x: (x['date'], x['filename']), reverse=True)
+                self._sorted[value] = result
+            return result
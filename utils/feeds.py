@@ -0,0 +1,107 @@
+import json
+import threading
+from datetime import datetime
+from collections import OrderedDict
+
+import feedgenerator
+
+# 格式 -> (feedgenerator 类, Content-Type)；JSON Feed 由 render_json_feed 生成
+FEED_FORMATS = {
+    'rss': (feedgenerator.Rss201rev2Feed, 'application/rss+xml; charset=utf-8'),
+    'atom': (feedgenerator.Atom1Feed, 'application/atom+xml; charset=utf-8'),
+    'json': (None, 'application/feed+json; charset=utf-8')
+}
+
+
+def pub_date(post):
+    """文章的发布时间，字符串日期无法解析时用当前时间"""
+    value = post['date']
+    if isinstance(value, str):
+        try:
+            value = datetime.strptime(value, '%Y-%m-%d')
+        except ValueError:
+            value = datetime.now()
+    return value
+
+
+def render_feed(fmt, posts, info, post_url):
+    """渲染订阅内容，返回 bytes
+
+    info 为频道信息（title、link、description、feed_url 等），post_url 接收文章返回其链接。
+    """
+    if fmt == 'json':
+        return render_json_feed(posts, info, post_url)
+
+    feed_class = FEED_FORMATS[fmt][0]
+    feed = feed_class(**info)
+    for post in posts:
+        feed.add_item(
+            title=post['title'],
+            link=post_url(post),
+            description=post['summary'],
+            pubdate=pub_date(post),
+            categories=post.get('tags', [])
+        )
+    return feed.writeString('utf-8').encode('utf-8')
+
+
+def render_json_feed(posts, info, post_url):
+    """JSON Feed 1.1"""
+    items = []
+    for post in posts:
+        url = post_url(post)
+        published = pub_date(post)
+        items.append({
+            'id': url,
+            'url': url,
+            'title': post['title'],
+            'content_text': post['summary'],
+            'summary': post['summary'],
+            # 没有时区的日期按服务器本地时区输出 RFC 3339
+            'date_published': published.astimezone().isoformat() if isinstance(published, datetime) else None,
+            'tags': [str(tag) for tag in post.get('tags') or []]
+        })
+    feed = {
+        'version': 'https://jsonfeed.org/version/1.1',
+        'title': info['title'],
+        'home_page_url': info['link'],
+        'feed_url': info.get('feed_url'),
+        'description': info['description'],
+        'language': info.get('language'),
+        'authors': [{'name': info['author_name']}] if info.get('author_name') else [],
+        'items': items
+    }
+    return json.dumps(feed, ensure_ascii=False, default=str).encode('utf-8')
+
+
+class FeedCache:
+    """已渲染订阅内容的缓存
+
+    键为 (格式, 根 URL, 标签, 条数)，每项记录生成时的目录摘要；摘要变化（文章有增删改）
+    之前一直复用，轮询请求不会重新查询文章或渲染 XML。
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key, digest, build):
+        """返回缓存的内容；未命中或已过期时调用 build() 生成（可返回 None 表示不存在）"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == digest:
+                self._entries.move_to_end(key)
+                return entry[1]
+
+        body = build()
+        with self._lock:
+            self._entries[key] = (digest, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return body
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
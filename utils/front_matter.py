@@ -0,0 +1,124 @@
+import re
+
+import yaml
+from yaml.nodes import ScalarNode
+from yaml.resolver import Resolver
+from yaml.constructor import SafeConstructor
+
+# 优先使用 libyaml 的 C 实现，没有编译 libyaml 时退回纯 Python 的 SafeLoader
+SafeLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+# 快速路径只接受的简单子集：key: 标量、key: [a, b]、key: 后跟 "- 项" 列表
+KEY_RE = re.compile(r'([A-Za-z_][\w-]*):(?:[ ]+(.*))?$')
+ITEM_RE = re.compile(r'[ ]*-[ ]+(.*)$')
+# 普通标量不能以这些 YAML 指示符开头；- ? : 后面紧跟非空白字符时可以
+INDICATORS = set(',[]{}#&*!|>\'"%@`')
+
+_resolver = Resolver()
+_constructor = SafeConstructor()
+
+
+class _Unsupported(Exception):
+    """超出快速路径支持的语法，交给 YAML 解析器"""
+
+
+def _plain(value, flow=False):
+    # 按 PyYAML 的隐式类型规则解析普通标量（null、布尔、数字、日期）
+    if not value or value[0] in INDICATORS or ': ' in value or ' #' in value or value.endswith(':'):
+        raise _Unsupported
+    if value[0] in '-?:' and (len(value) == 1 or value[1] == ' '):
+        raise _Unsupported
+    if flow and (value[0] in '-?:' or any(char in value for char in ',[]{}')):
+        raise _Unsupported
+    tag = _resolver.resolve(ScalarNode, value, (True, False))
+    node = ScalarNode(tag, value)
+    return _constructor.yaml_constructors[tag](_constructor, node)
+
+
+def _scalar(value, flow=False):
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] == "'":
+        inner = value[1:-1]
+        if "'" in inner.replace("''", ''):
+            raise _Unsupported
+        return inner.replace("''", "'")
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        inner = value[1:-1]
+        if '"' in inner or '\\' in inner:
+            raise _Unsupported
+        return inner
+    return _plain(value, flow)
+
+
+def _flow_list(value):
+    inner = value[1:-1].strip()
+    if not inner:
+        return []
+    if any(char in inner for char in '[]{}'):
+        raise _Unsupported
+    # 引号内含逗号时切出的片段引号不成对，会在 _scalar 中被拒绝
+    return [_scalar(item, flow=True) for item in inner.split(',')]
+
+
+def parse_simple(header):
+    """快速解析文章使用的简单元数据子集，超出子集时返回 None
+
+    只处理 key: 值、key: [a, b] 与 key: 后跟 "- 项" 的列表，标量的类型推断
+    复用 PyYAML 的解析规则，结果与 yaml.safe_load 一致。
+    """
+    metadata = {}
+    current = None
+    item_indent = 0
+    try:
+        for line in header.splitlines():
+            stripped = line.strip()
+            if not stripped or stripped.startswith('#'):
+                continue
+            if '\t' in line:
+                raise _Unsupported
+            item = ITEM_RE.match(line)
+            if item is not None:
+                indent = len(line) - len(line.lstrip(' '))
+                if current is None or indent != (item_indent if metadata[current] else indent):
+                    raise _Unsupported
+                if metadata[current] is None:
+                    metadata[current] = []
+                    item_indent = indent
+                metadata[current].append(_scalar(item.group(1)))
+                continue
+            if line[0] == ' ':
+                raise _Unsupported
+            match = KEY_RE.match(line.rstrip())
+            if match is None:
+                raise _Unsupported
+            key, value = match.group(1), (match.group(2) or '').strip()
+            if _resolver.resolve(ScalarNode, key, (True, False)) != 'tag:yaml.org,2002:str':
+                raise _Unsupported
+            current = None
+            if not value:
+                # 后面跟着 "- 项" 时为列表，否则为 null
+                metadata[key] = None
+                current = key
+            elif value[0] == '[' and value[-1] == ']':
+                metadata[key] = _flow_list(value)
+            else:
+                metadata[key] = _scalar(value)
+    except (_Unsupported, KeyError, ValueError, yaml.YAMLError):
+        return None
+    return metadata
+
+
+def parse_front_matter(header):
+    """解析元数据文本，返回 dict（可能为 None，与 yaml.safe_load 相同）
+
+    先走快速路径，超出子集时用 libyaml 的 CSafeLoader，再退回纯 Python 的 SafeLoader。
+    """
+    metadata = parse_simple(header)
+    if metadata is None:
+        try:
+            metadata = yaml.load(header, Loader=SafeLoader)
+        except yaml.YAMLError:
+            if SafeLoader is yaml.SafeLoader:
+                raise
+            metadata = yaml.load(header, Loader=yaml.SafeLoader)
+    return metadata
@@ -0,0 +1,70 @@
+import hashlib
+from functools import wraps
+from flask import request, current_app
+
+from utils.compression import negotiate_encoding
+
+
+def request_etag(digest, variant=None, encoding=None):
+    """由内容摘要、完整请求 URL（含查询参数和主机）和协商出的表示形式、编码生成强 ETag"""
+    return hashlib.sha1(f'{digest}:{request.url}:{variant or ""}:{encoding or ""}'.encode('utf-8')).hexdigest()
+
+
+def is_not_modified(etag, last_modified=None):
+    """判断请求携带的验证器是否命中；If-None-Match 优先于 If-Modified-Since"""
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since
+    return False
+
+
+def conditional(validator, variant=None):
+    """条件请求装饰器
+
+    validator 接收视图参数，返回 (摘要, 最后修改时间)；返回 None 时直接执行视图。
+    验证器命中时在执行视图（解析、序列化）之前返回 304。
+    variant 为按 Accept 头协商表示形式的函数，其结果参与 ETag 并添加 Vary: Accept。
+    应用注册了 extensions['compressed_responses']（CompressedResponseCache）时按
+    Accept-Encoding 返回压缩后的内容，压缩结果按 ETag 缓存，命中时同样不执行视图。
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            validators = validator(*args, **kwargs)
+            if validators is None:
+                return f(*args, **kwargs)
+
+            digest, last_modified = validators
+            compressed = current_app.extensions.get('compressed_responses')
+            encoding = negotiate_encoding() if compressed is not None else None
+            etag = request_etag(digest, variant() if variant else None, encoding)
+            cached = compressed.get(etag) if encoding else None
+            if is_not_modified(etag, last_modified):
+                response = current_app.response_class(status=304)
+            elif cached is not None:
+                body, content_type = cached
+                response = current_app.response_class(body, content_type=content_type)
+                response.headers['Content-Encoding'] = encoding
+            else:
+                response = current_app.make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                if encoding:
+                    compressed.compress_response(response, etag, encoding)
+
+            response.set_etag(etag)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            if variant:
+                response.vary.add('Accept')
+            if compressed is not None:
+                response.vary.add('Accept-Encoding')
+            cache_control = current_app.config.get('PUBLIC_CACHE_CONTROL')
+            if cache_control:
+                response.headers['Cache-Control'] = cache_control
+            return response
+
+        return decorated
+
+    return decorator
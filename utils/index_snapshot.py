@@ -0,0 +1,1123 @@
+import os
+import json
+import mmap
+import math
+import time
+import struct
+import hashlib
+import logging
+import tempfile
+import sys
+import bisect
+import itertools
+import threading
+from array import array
+from collections import Counter, defaultdict
+from collections.abc import Sequence
+from datetime import datetime, timezone
+
+try:
+    import fcntl
+except ImportError:  # Windows 开发环境只跑单个进程，不需要文件锁
+    fcntl = None
+
+from utils.post_catalog import load_posts, read_body, make_slug
+from utils.facet_index import post_tags, post_category, post_month
+from utils.search_index import tokenize, FIELD_BOOSTS, K1, B
+
+logger = logging.getLogger(__name__)
+
+
+
+MAGIC = b'BLOGIDX1'
+VERSION = 3
+FIELDS = tuple(FIELD_BOOSTS)
+BOOSTS = tuple(FIELD_BOOSTS.values())
+NONE = 0xFFFFFFFF
+
+# 文件头：魔数、版本、generation、最后修改时间 (ns)、记录槽位数、文章/标签/月份/分类/词条数、
+# 失效记录数、目录摘要、各检索字段的总词数、各段的起始偏移
+SECTIONS = ('strings', 'records', 'by_date', 'by_title', 'by_slug', 'tags', 'tag_refs', 'months', 'month_refs',
+            'categories', 'category_refs', 'terms', 'postings', 'doc_terms')
+HEADER = struct.Struct(f'<8sIQqIIIIIII40s{len(FIELDS)}Q{len(SECTIONS)}Q')
+# 分组表（标签、月份、分类）对应的引用段
+GROUP_REFS = {'tags': 'tag_refs', 'months': 'month_refs', 'categories': 'category_refs'}
+# 排序数组及其排序键（by_date 倒序，其余正序），filename / path 作为并列时的次序
+ORDER_FIELDS = {'by_date': ('date', 'filename'), 'by_title': ('title', 'filename'), 'by_slug': ('filename', 'path')}
+DESCENDING = ('by_date',)
+# 文章记录（定长）：mtime_ns、size、各字符串字段的 (偏移, 长度)、各检索字段的词数、正排词表的 (起点, 条数)
+# 记录按槽位存放，增量写入时槽位不变；删除的文章留下 path 为空的失效记录，压缩重建时回收
+STRING_FIELDS = ('path', 'filename', 'title', 'date', 'summary', 'category', 'author_id', 'author_name', 'tags', 'metadata')
+RECORD = struct.Struct(f'<qq{2 * len(STRING_FIELDS)}I{len(FIELDS)}I2I')
+TOMBSTONE = RECORD.pack(0, 0, *([NONE, 0] * len(STRING_FIELDS)), *([0] * len(FIELDS)), 0, 0)
+REF = struct.Struct('<II')
+# 标签、月份、分类、词条表的条目：键的 (偏移, 长度)、引用数组中的起点和条数
+ENTRY = struct.Struct('<4I')
+INDEX = struct.Struct('<I')
+# 倒排项：槽位及其在各字段中的词频，按槽位排序
+POSTING = struct.Struct(f'<I{len(FIELDS)}H')
+# 正排项：词的 (偏移, 长度) 及各字段词频，文章变化时据此找到需要修改的倒排表
+FORWARD = struct.Struct(f'<II{len(FIELDS)}H')
+# 失效记录（删除或被修改的旧版本）超过存活文章的 1/4 且至少 COMPACT_MIN_STALE 条时整体重建
+COMPACT_MIN_STALE = 64
+DIGEST_MOD = 1 << 160
+
+
+def _ident_hash(rel_path, ident):
+    raw = hashlib.sha1(f'{rel_path}:{ident[0]}:{ident[1]}'.encode('utf-8')).digest()
+    return int.from_bytes(raw, 'big')
+
+
+def stats_digest(stats, base=None, removed=None):
+    """目录摘要：各文件 (路径, mtime_ns, size) 哈希之和（模 2^160）
+
+    与顺序无关，可在旧摘要 base 上增量计算：减去 removed 中的旧 {路径: 标识}，加上 stats。
+    """
+    total = int(base, 16) if base else 0
+    for rel_path, ident in (removed or {}).items():
+        total -= _ident_hash(rel_path, ident)
+    for rel_path, ident in stats.items():
+        total += _ident_hash(rel_path, ident)
+    return f'{total % DIGEST_MOD:040x}'
+
+
+def _text(value):
+    return None if value is None else str(value)
+
+
+def _json_default(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+
+def _counts(counts):
+    return (min(count, 0xFFFF) for count in counts)
+
+
+def make_doc(rel_path, ident, post):
+    """由解析出的文章生成快照条目"""
+    metadata = post['metadata']
+    category = metadata.get('category')
+    tags = post_tags(post)
+    date = post['date']
+    tokens = {
+        'title': tokenize(str(post.get('title') or '')),
+        'tags': [token for tag in tags for token in tokenize(tag)],
+        'category': tokenize(str(category or '')),
+        'content': tokenize(post.get('content') or '')
+    }
+    terms = defaultdict(lambda: [0] * len(FIELDS))
+    for position, field in enumerate(FIELDS):
+        for token, count in Counter(tokens[field]).items():
+            terms[token][position] = count
+    return {
+        'path': rel_path,
+        'mtime_ns': ident[0],
+        'size': ident[1],
+        'strings': {
+            'path': rel_path,
+            'filename': post['filename'],
+            'title': _text(post['title']),
+            'date': date.isoformat() if hasattr(date, 'isoformat') else _text(date),
+            'summary': post['summary'],
+            'category': str(category) if category else None,
+            'author_id': _text(post['author_id']),
+            'author_name': _text(post['author_name']),
+            'tags': json.dumps(post['tags'], ensure_ascii=False, default=_json_default),
+            'metadata': json.dumps(metadata, ensure_ascii=False, default=_json_default)
+        },
+        'tags': tags,
+        'months': post_month(post),
+        'categories': post_category(post),
+        'terms': dict(terms),
+        'lengths': [len(tokens[field]) for field in FIELDS]
+    }
+
+
+def _doc_key(name, doc):
+    return tuple(doc['strings'][field] or '' for field in ORDER_FIELDS[name])
+
+
+class _StringTable:
+    """字符串表；base 为追加到已有字符串段之后时的起始偏移"""
+
+    def __init__(self, base=0):
+        self.base = base
+        self.data = bytearray()
+        self._offsets = {}
+
+    def add(self, value):
+        if value is None:
+            return NONE, 0
+        raw = value.encode('utf-8')
+        offset = self._offsets.get(raw)
+        if offset is None:
+            offset = self.base + len(self.data)
+            self._offsets[raw] = offset
+            self.data += raw
+        return offset, len(raw)
+
+
+def _pack_table(strings, groups, pack):
+    entries = bytearray()
+    values = bytearray()
+    count = 0
+    for key, items in groups:
+        offset, length = strings.add(key)
+        entries += ENTRY.pack(offset, length, count, len(items))
+        for item in items:
+            values += pack(item)
+        count += len(items)
+    return entries, values
+
+
+class _SectionWriter:
+    """按 SECTIONS 的顺序把各段写入文件，各段按 8 字节对齐，起始偏移最后写回文件头"""
+
+    def __init__(self, f):
+        self.f = f
+        self.position = HEADER.size
+        self.offsets = []
+        f.write(b'\0' * HEADER.size)
+
+    def begin(self, name):
+        assert name == SECTIONS[len(self.offsets)], name
+        self.write(b'\0' * (-self.position % 8))
+        self.offsets.append(self.position)
+
+    def write(self, data):
+        self.f.write(data)
+        self.position += len(data)
+
+
+def _write_file(path, fill):
+    """fill(writer) 依次写出各段并返回文件头中偏移之前的字段；先写临时文件再原子替换，读者不会看到半个文件"""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            writer = _SectionWriter(f)
+            fields = fill(writer)
+            f.seek(0)
+            f.write(HEADER.pack(*fields, *writer.offsets))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def write_snapshot(path, docs, generation, digest, last_modified_ns):
+    """把全部条目写成新快照（首次构建与压缩时使用），槽位按日期倒序分配"""
+    docs = sorted(docs, key=lambda doc: _doc_key('by_date', doc), reverse=True)
+    strings = _StringTable()
+    records = bytearray()
+    forward = bytearray()
+    totals = [0] * len(FIELDS)
+    groups = {table: defaultdict(list) for table in GROUP_REFS}
+    terms = defaultdict(list)
+    for slot, doc in enumerate(docs):
+        refs = []
+        for field in STRING_FIELDS:
+            refs.extend(strings.add(doc['strings'][field]))
+        doc_terms = sorted(doc['terms'].items())
+        start = len(forward) // FORWARD.size
+        for term, counts in doc_terms:
+            forward += FORWARD.pack(*strings.add(term), *_counts(counts))
+            terms[term].append((slot, counts))
+        records += RECORD.pack(doc['mtime_ns'], doc['size'], *refs, *doc['lengths'], start, len(doc_terms))
+        totals = [total + length for total, length in zip(totals, doc['lengths'])]
+        for table, members in groups.items():
+            for key in doc[table]:
+                members[key].append(slot)
+    orders = {
+        name: b''.join(INDEX.pack(slot) for slot in sorted(
+            range(len(docs)), key=lambda slot: _doc_key(name, docs[slot]), reverse=name in DESCENDING
+        ))
+        for name in ORDER_FIELDS
+    }
+    # 键按字符串排序（与 UTF-8 字节序一致），读取时二分查找
+    tables = {table: _pack_table(strings, sorted(members.items()), INDEX.pack) for table, members in groups.items()}
+    term_table = _pack_table(
+        strings, sorted(terms.items()), lambda posting: POSTING.pack(posting[0], *_counts(posting[1]))
+    )
+
+    def fill(writer):
+        for name, data in (('strings', strings.data), ('records', records), *orders.items()):
+            writer.begin(name)
+            writer.write(data)
+        for table, refs_section in GROUP_REFS.items():
+            writer.begin(table)
+            writer.write(tables[table][0])
+            writer.begin(refs_section)
+            writer.write(tables[table][1])
+        writer.begin('terms')
+        writer.write(term_table[0])
+        writer.begin('postings')
+        writer.write(term_table[1])
+        writer.begin('doc_terms')
+        writer.write(forward)
+        return (MAGIC, VERSION, generation, last_modified_ns, len(docs), len(docs),
+                *(len(groups[table]) for table in GROUP_REFS), len(terms), 0, digest.encode('ascii'), *totals)
+
+    _write_file(path, fill)
+
+
+def _load_uint32(raw):
+    slots = array('I')
+    slots.frombytes(raw)
+    if sys.byteorder == 'big':
+        slots.byteswap()
+    return slots
+
+
+def _dump_uint32(slots):
+    slots = array('I', slots)
+    if sys.byteorder == 'big':
+        slots.byteswap()
+    return slots.tobytes()
+
+
+def _copy_slots(writer, view, start, stop, dropped):
+    """复制一段排序数组，dropped 为空时按字节整段复制，否则去掉其中的槽位"""
+    if start >= stop:
+        return
+    if not dropped:
+        writer.write(view[start:stop])
+        return
+    # 分块解码，内存占用与数组长度无关
+    chunk = 16384 * INDEX.size
+    for position in range(start, stop, chunk):
+        slots = _load_uint32(view[position:min(stop, position + chunk)])
+        writer.write(_dump_uint32(slot for slot in slots if slot not in dropped))
+
+
+def _splice_postings(raw, edits):
+    """把 edits（槽位 -> 新倒排项，None 表示删除）应用到按槽位排序的倒排表，其余区间按字节复制"""
+    count = len(raw) // POSTING.size
+
+    def slot_at(position):
+        return INDEX.unpack_from(raw, position * POSTING.size)[0]
+
+    parts = []
+    cursor = 0
+    for slot in sorted(edits):
+        position = bisect.bisect_left(range(count), slot, lo=cursor, key=slot_at)
+        parts.append(raw[cursor * POSTING.size:position * POSTING.size])
+        cursor = position + 1 if position < count and slot_at(position) == slot else position
+        if edits[slot] is not None:
+            parts.append(edits[slot])
+    parts.append(raw[cursor * POSTING.size:])
+    return b''.join(parts)
+
+
+def _insort(members, slot, key_of, descending):
+    """把槽位按排序键插入已排序的列表"""
+    key = key_of(slot)
+    low, high = 0, len(members)
+    while low < high:
+        middle = (low + high) // 2
+        other = key_of(members[middle])
+        if (other < key) if descending else (other > key):
+            high = middle
+        else:
+            low = middle + 1
+    members.insert(low, slot)
+
+
+def _plan_table(old, table, updates, key_ref):
+    """受影响的键：[(旧表中的位置, 是否已存在, 键, 键的 (偏移, 长度), 新的打包条目)]，按位置排序"""
+    plan = []
+    for key, data in updates.items():
+        position, found = old.find_key(table, key)
+        if not found and not data:
+            continue
+        ref = old.key_ref(table, position) if found else key_ref(key)
+        plan.append((position, found, key, ref, data))
+    # 同一位置上新插入的键排在旧表该位置的键之前
+    plan.sort(key=lambda op: (op[0], op[1], op[2]))
+    return plan
+
+
+def _write_table(writer, old, view, table, items_section, item_size, plan):
+    """按计划写出条目表与引用段，返回条目数
+
+    未受影响的键只改写引用起点，其引用按字节区间整段从旧快照复制，不解码。
+    """
+    size = old.table_size(table)
+    count = 0
+    written = 0
+
+    def copy_entries(start, stop):
+        nonlocal count, written
+        if start >= stop:
+            return
+        base = old.offset(table)
+        entries = _load_uint32(view[base + start * ENTRY.size:base + stop * ENTRY.size])
+        items = entries[3::4]
+        entries[2::4] = array('I', itertools.accumulate(items[:-1], initial=count))
+        writer.write(_dump_uint32(entries))
+        count += sum(items)
+        written += stop - start
+
+    def copy_items(start, stop):
+        if start >= stop:
+            return
+        first = old.entry_range(table, start)[0]
+        last = sum(old.entry_range(table, stop - 1))
+        base = old.offset(items_section)
+        writer.write(view[base + first * item_size:base + last * item_size])
+
+    for copy, put in ((copy_entries, False), (copy_items, True)):
+        writer.begin(items_section if put else table)
+        cursor = 0
+        for position, found, key, ref, data in plan:
+            copy(cursor, position)
+            if put:
+                writer.write(data)
+            elif data:
+                items = len(data) // item_size
+                writer.write(ENTRY.pack(*ref, count, items))
+                count += items
+                written += 1
+            cursor = position + 1 if found else position
+        copy(cursor, size)
+    return written
+
+
+def update_snapshot(path, old, docs, removed, generation, digest, last_modified_ns):
+    """在旧快照的基础上写出新快照：docs 为新增或修改的文章条目，removed 为删除的相对路径
+
+    修改的文章保留原槽位，新文章追加槽位，删除的文章留下失效记录。未变化的记录、排序数组、
+    分组引用与倒排表按字节区间从旧快照的 mmap 直接复制；只解码受影响的标签 / 月份 / 分类
+    与词条（由旧记录的正排词表得知），内存占用与文章总数无关。
+    """
+    new_slots = {}   # 槽位 -> 新条目
+    dropped = set()  # 旧数据需要从各索引中去掉的槽位
+    next_slot = old.slot_count
+    for doc in docs:
+        slot = old.find_path(doc['path'])
+        if slot is None:
+            slot = next_slot
+            next_slot += 1
+        else:
+            dropped.add(slot)
+        new_slots[slot] = doc
+    for rel_path in removed:
+        slot = old.find_path(rel_path)
+        if slot is not None and slot not in new_slots:
+            dropped.add(slot)
+
+    strings = _StringTable(base=old.strings_size)
+    term_refs = {}
+
+    def term_ref(term):
+        ref = term_refs.get(term)
+        if ref is None:
+            position, found = old.find_key('terms', term)
+            ref = term_refs[term] = old.key_ref('terms', position) if found else strings.add(term)
+        return ref
+
+    def key_of(name, slot):
+        doc = new_slots.get(slot)
+        return _doc_key(name, doc) if doc is not None else old.order_key(name, slot)
+
+    # 记录、正排词表与总词数
+    records = {slot: TOMBSTONE for slot in dropped}
+    forward = bytearray()
+    totals = list(old.field_totals)
+    for slot in dropped:
+        totals = [total - length for total, length in zip(totals, old.lengths(slot))]
+    new_members = {table: defaultdict(list) for table in GROUP_REFS}
+    new_postings = defaultdict(dict)
+    for slot, doc in sorted(new_slots.items()):
+        refs = []
+        for field in STRING_FIELDS:
+            refs.extend(strings.add(doc['strings'][field]))
+        doc_terms = sorted(doc['terms'].items())
+        start = old.forward_count + len(forward) // FORWARD.size
+        for term, counts in doc_terms:
+            forward += FORWARD.pack(*term_ref(term), *_counts(counts))
+            new_postings[term][slot] = POSTING.pack(slot, *_counts(counts))
+        records[slot] = RECORD.pack(doc['mtime_ns'], doc['size'], *refs, *doc['lengths'], start, len(doc_terms))
+        totals = [total + length for total, length in zip(totals, doc['lengths'])]
+        for table, members in new_members.items():
+            for key in doc[table]:
+                members[key].append(slot)
+
+    # 排序数组：新条目在旧数组中的插入位置
+    inserts = {}
+    for name in ORDER_FIELDS:
+        descending = name in DESCENDING
+        items = sorted(new_slots, key=lambda slot: key_of(name, slot), reverse=descending)
+        positions = [old.order_position(name, key_of(name, slot)) for slot in items]
+        inserts[name] = sorted(zip(positions, items), key=lambda item: item[0])
+
+    # 分组与倒排表中受影响的键
+    group_plans = {}
+    for table in GROUP_REFS:
+        affected = set(new_members[table])
+        for slot in dropped:
+            affected.update(old.group_keys(table, slot))
+        updates = {}
+        for key in affected:
+            members = [slot for slot in _load_uint32(old.raw_refs(table, key)) if slot not in dropped]
+            for slot in new_members[table].get(key, ()):
+                _insort(members, slot, lambda member: key_of('by_date', member), descending=True)
+            updates[key] = _dump_uint32(members)
+        group_plans[table] = _plan_table(old, table, updates, strings.add)
+    edits = defaultdict(dict)
+    for slot in dropped:
+        for term, _ in old.forward(slot):
+            edits[term][slot] = None
+    for term, postings in new_postings.items():
+        edits[term].update(postings)
+    updates = {term: _splice_postings(old.raw_refs('terms', term), changes) for term, changes in edits.items()}
+    term_plan = _plan_table(old, 'terms', updates, term_ref)
+
+    def fill(writer):
+        with memoryview(old._buf) as view:
+            writer.begin('strings')
+            writer.write(view[old.offset('strings'):old.offset('records')])
+            writer.write(strings.data)
+
+            writer.begin('records')
+            base = old.offset('records')
+            cursor = 0
+            for slot in sorted(records):
+                stop = min(slot, old.slot_count)
+                writer.write(view[base + cursor * RECORD.size:base + stop * RECORD.size])
+                writer.write(records[slot])
+                cursor = max(cursor, slot + 1)
+            writer.write(view[base + cursor * RECORD.size:base + old.slot_count * RECORD.size])
+            for name in ORDER_FIELDS:
+                writer.begin(name)
+                base = old.offset(name)
+                cursor = 0
+                for position, slot in inserts[name] + [(old.post_count, None)]:
+                    _copy_slots(writer, view, base + cursor * INDEX.size, base + position * INDEX.size, dropped)
+                    if slot is not None:
+                        writer.write(INDEX.pack(slot))
+                    cursor = position
+            sizes = [
+                _write_table(writer, old, view, table, refs_section, INDEX.size, group_plans[table])
+                for table, refs_section in GROUP_REFS.items()
+            ]
+            term_count = _write_table(writer, old, view, 'terms', 'postings', POSTING.size, term_plan)
+
+            writer.begin('doc_terms')
+            writer.write(view[old.offset('doc_terms'):old.offset('doc_terms') + old.forward_count * FORWARD.size])
+            writer.write(forward)
+        post_count = old.post_count - len(dropped) + len(new_slots)
+        return (MAGIC, VERSION, generation, last_modified_ns, next_slot, post_count, *sizes, term_count,
+                old.stale_count + len(dropped), digest.encode('ascii'), *totals)
+
+    _write_file(path, fill)
+
+
+class IndexSnapshot:
+    """以只读 mmap 打开的快照，按需解码单条记录，不把文章载入进程内存"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            self._buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.identity = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if st.st_size < HEADER.size:
+            raise ValueError(f'Truncated index snapshot: {path}')
+        values = HEADER.unpack_from(self._buf, 0)
+        magic, version, self.generation, self.last_modified_ns = values[:4]
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'Unsupported index snapshot: {path}')
+        (self.slot_count, self.post_count, self.tag_count, self.month_count, self.category_count,
+         self.term_count, self.stale_count) = values[4:11]
+        self.digest = values[11].decode('ascii')
+        self.field_totals = values[12:12 + len(FIELDS)]
+        self._offsets = dict(zip(SECTIONS, values[12 + len(FIELDS):]))
+        self._table_sizes = {
+            'tags': self.tag_count, 'months': self.month_count,
+            'categories': self.category_count, 'terms': self.term_count
+        }
+        self.strings_size = self._offsets['records'] - self._offsets['strings']
+        self.forward_count = (st.st_size - self._offsets['doc_terms']) // FORWARD.size
+        self.last_modified = (
+            datetime.fromtimestamp(self.last_modified_ns / 1e9, timezone.utc) if self.last_modified_ns else None
+        )
+
+    def __len__(self):
+        return self.post_count
+
+    def offset(self, section):
+        return self._offsets[section]
+
+    def table_size(self, table):
+        return self._table_sizes[table]
+
+    def _string(self, offset, length):
+        if offset == NONE:
+            return None
+        start = self._offsets['strings'] + offset
+        return str(self._buf[start:start + length], 'utf-8')
+
+    def _record_offset(self, index):
+        return self._offsets['records'] + index * RECORD.size
+
+    def field(self, index, name):
+        """只解码一条记录的一个字符串字段"""
+        position = self._record_offset(index) + 16 + REF.size * STRING_FIELDS.index(name)
+        return self._string(*REF.unpack_from(self._buf, position))
+
+    def ident(self, index):
+        """(mtime_ns, size)"""
+        return struct.unpack_from('<qq', self._buf, self._record_offset(index))
+
+    def lengths(self, index):
+        values = RECORD.unpack_from(self._buf, self._record_offset(index))
+        start = 2 + 2 * len(STRING_FIELDS)
+        return values[start:start + len(FIELDS)]
+
+    def forward(self, index):
+        """正排词表：[(词, 各字段词频), ...]"""
+        start, count = RECORD.unpack_from(self._buf, self._record_offset(index))[-2:]
+        base = self._offsets['doc_terms'] + start * FORWARD.size
+        result = []
+        for i in range(count):
+            values = FORWARD.unpack_from(self._buf, base + i * FORWARD.size)
+            result.append((self._string(values[0], values[1]), list(values[2:])))
+        return result
+
+    def strings(self, index):
+        values = RECORD.unpack_from(self._buf, self._record_offset(index))
+        refs = values[2:2 + 2 * len(STRING_FIELDS)]
+        return {name: self._string(refs[2 * i], refs[2 * i + 1]) for i, name in enumerate(STRING_FIELDS)}
+
+    def post(self, index):
+        """与 SqliteCatalog 相同结构的文章字典（不含正文）"""
+        values = self.strings(index)
+        metadata = json.loads(values['metadata'])
+        try:
+            date = datetime.fromisoformat(values['date']) if values['date'] else None
+        except ValueError:
+            date = values['date']
+        if 'date' in metadata:
+            metadata['date'] = date
+        return {
+            'filename': values['filename'],
+            'title': values['title'],
+            'date': date,
+            'summary': values['summary'],
+            'metadata': metadata,
+            'tags': json.loads(values['tags']),
+            'author_id': metadata.get('author_id'),
+            'author_name': values['author_name']
+        }
+
+    def order(self, name):
+        """返回读取 by_date / by_title / by_slug 排序数组第 position 项的函数"""
+        base = self._offsets[name]
+        return lambda position: INDEX.unpack_from(self._buf, base + position * INDEX.size)[0]
+
+    def order_refs(self, name, reverse=False):
+        """排序数组的只读序列（全部存活文章的槽位）"""
+        return _Refs(self._buf, self._offsets[name], self.post_count, reverse)
+
+    def order_key(self, name, index):
+        return tuple(self.field(index, field) or '' for field in ORDER_FIELDS[name])
+
+    def order_position(self, name, key):
+        """key 在排序数组中的插入位置（相同键之后）"""
+        at = self.order(name)
+        descending = name in DESCENDING
+        low, high = 0, self.post_count
+        while low < high:
+            middle = (low + high) // 2
+            other = self.order_key(name, at(middle))
+            if (other < key) if descending else (other > key):
+                high = middle
+            else:
+                low = middle + 1
+        return low
+
+    def find_slug(self, slug):
+        """filename 对应的记录序号；冲突时取路径字典序最小者"""
+        at = self.order('by_slug')
+        low, high = 0, self.post_count
+        while low < high:
+            middle = (low + high) // 2
+            if self.field(at(middle), 'filename') < slug:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.post_count and self.field(at(low), 'filename') == slug:
+            return at(low)
+        return None
+
+    def find_path(self, rel_path):
+        """相对路径对应的记录序号"""
+        key = (make_slug(rel_path), rel_path)
+        at = self.order('by_slug')
+        position = bisect.bisect_left(range(self.post_count), key, key=lambda i: self.order_key('by_slug', at(i)))
+        if position < self.post_count and self.order_key('by_slug', at(position)) == key:
+            return at(position)
+        return None
+
+    def _entry(self, table, position):
+        offset, length, start, count = ENTRY.unpack_from(self._buf, self._offsets[table] + position * ENTRY.size)
+        return self._string(offset, length), start, count
+
+    def entry_range(self, table, position):
+        """条目在引用数组中的 (起点, 条数)"""
+        return ENTRY.unpack_from(self._buf, self._offsets[table] + position * ENTRY.size)[2:]
+
+    def key_ref(self, table, position):
+        """条目键在字符串表中的 (偏移, 长度)"""
+        return ENTRY.unpack_from(self._buf, self._offsets[table] + position * ENTRY.size)[:2]
+
+    def find_key(self, table, key):
+        """键在表中的 (位置, 是否存在)，不存在时位置为插入点"""
+        low, high = 0, self._table_sizes[table]
+        while low < high:
+            middle = (low + high) // 2
+            name = self._entry(table, middle)[0]
+            if name == key:
+                return middle, True
+            if name < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low, False
+
+    def _lookup(self, table, key):
+        position, found = self.find_key(table, key)
+        return self.entry_range(table, position) if found else None
+
+    def raw_refs(self, table, key):
+        """键对应的引用数组（分组为记录序号，词条为倒排项）的原始字节，不存在时为空"""
+        found = self._lookup(table, key)
+        if found is None:
+            return b''
+        start, count = found
+        section, size = ('postings', POSTING.size) if table == 'terms' else (GROUP_REFS[table], INDEX.size)
+        base = self._offsets[section] + start * size
+        return self._buf[base:base + count * size]
+
+    def groups(self, table):
+        """[(键, 条数), ...]，table 为 tags、months 或 categories"""
+        return [(name, count) for name, _, count in (self._entry(table, i) for i in range(self._table_sizes[table]))]
+
+    def group_posts(self, table, key):
+        """某个标签、月份或分类下的记录序号（按日期倒序），按需解码，切片只读取该页"""
+        found = self._lookup(table, key)
+        if found is None:
+            return []
+        start, count = found
+        return _Refs(self._buf, self._offsets[GROUP_REFS[table]] + start * INDEX.size, count)
+
+    def group_keys(self, table, index):
+        """记录所属的标签、月份或分类"""
+        if table == 'tags':
+            return post_tags({'tags': json.loads(self.field(index, 'tags'))})
+        if table == 'categories':
+            category = self.field(index, 'category')
+            return [category] if category else []
+        date = self.field(index, 'date') or ''
+        try:
+            datetime.fromisoformat(date)
+        except ValueError:
+            return []
+        return [date[:7]]
+
+    def postings(self, term):
+        """[(记录序号, 各字段词频), ...]"""
+        found = self._lookup('terms', term)
+        if found is None:
+            return []
+        start, count = found
+        base = self._offsets['postings'] + start * POSTING.size
+        result = []
+        for i in range(count):
+            values = POSTING.unpack_from(self._buf, base + i * POSTING.size)
+            result.append((values[0], values[1:]))
+        return result
+
+    def reuse_doc(self, index):
+        """由已有记录生成快照条目（压缩重建时使用），不重新读取和解析文件"""
+        values = self.strings(index)
+        mtime_ns, size = self.ident(index)
+        return {
+            'path': values['path'],
+            'mtime_ns': mtime_ns,
+            'size': size,
+            'strings': values,
+            'tags': self.group_keys('tags', index),
+            'months': self.group_keys('months', index),
+            'categories': self.group_keys('categories', index),
+            'terms': dict(self.forward(index)),
+            'lengths': list(self.lengths(index))
+        }
+
+
+class _Refs(Sequence):
+    """快照中一段记录序号数组的只读视图，reverse 为真时倒序读取"""
+
+    def __init__(self, buf, base, count, reverse=False):
+        self._buf = buf
+        self._base = base
+        self._count = count
+        self._reverse = reverse
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(self._count))]
+        if position < 0:
+            position += self._count
+        if not 0 <= position < self._count:
+            raise IndexError(position)
+        if self._reverse:
+            position = self._count - 1 - position
+        return INDEX.unpack_from(self._buf, self._base + position * INDEX.size)[0]
+
+
+class SnapshotCatalog:
+    """基于共享索引快照的文章目录
+
+    各 worker 以只读 mmap 方式读取 instance/ 下的快照文件，内存占用与文章数量基本无关。
+    请求时（受节流限制）比较 content/ 的 stat 摘要，发现变化的 worker 先拿构建锁
+    成为 leader：只重新解析变化的文件，其余记录与索引按字节区间从旧快照复制，写出新快照并原子替换；
+    其他 worker 发现文件被替换后重新映射。
+    """
+
+    def __init__(self, path, content_dir='content', min_interval=1.0, renderer=None, workers=0):
+        self.path = path
+        self.content_dir = content_dir
+        self.min_interval = min_interval
+        self.renderer = renderer
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._last_sync = None
+
+    def sync(self, force=False):
+        """检查 content/ 是否变化，必要时重建或重新映射快照，返回 (新增或更新数, 删除数)"""
+        now = time.monotonic()
+        if (not force and self._snapshot is not None and self._last_sync is not None
+                and now - self._last_sync < self.min_interval):
+            return 0, 0
+        with self._lock:
+            self._last_sync = now
+            self._reload()
+            stats, latest = self._scan()
+            digest = stats_digest(stats)
+            if self._snapshot is not None and self._snapshot.digest == digest:
+                return 0, 0
+            # 还没有快照或显式刷新时等待构建锁，否则由当前 leader 完成，继续使用旧快照
+            return self._rebuild(stats, latest, digest, wait=force or self._snapshot is None)
+
+    def update_paths(self, rel_paths):
+        """写入文章后立即更新快照：只 stat 和解析给定文件，其余记录从旧快照按字节复制"""
+        with self._lock:
+            fd = self._acquire(wait=True)
+            try:
+                self._reload()
+                old = self._snapshot
+                if old is None:
+                    stats, latest = self._scan()
+                    return self._write(None, stats, [], stats_digest(stats), latest)
+                stats = {}
+                previous = {}
+                removed = []
+                latest = old.last_modified_ns
+                for rel_path in dict.fromkeys(rel_paths):
+                    index = old.find_path(rel_path)
+                    ident = old.ident(index) if index is not None else None
+                    file_path = os.path.join(self.content_dir, rel_path)
+                    try:
+                        st = os.stat(file_path)
+                        latest = max(latest, st.st_mtime_ns, os.stat(os.path.dirname(file_path)).st_mtime_ns)
+                    except FileNotFoundError:
+                        st = None
+                    if st is not None and (st.st_mtime_ns, st.st_size) != ident:
+                        stats[rel_path] = (st.st_mtime_ns, st.st_size)
+                    elif st is None and ident is not None:
+                        removed.append(rel_path)
+                    else:
+                        continue
+                    if ident is not None:
+                        previous[rel_path] = ident
+                if not stats and not removed:
+                    return 0, 0
+                digest = stats_digest(stats, base=old.digest, removed=previous)
+                return self._write(old, stats, removed, digest, latest)
+            finally:
+                self._release(fd)
+                self._last_sync = time.monotonic()
+
+    def snapshot(self):
+        self.sync()
+        return self._snapshot
+
+    def _reload(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        if self._snapshot is not None and self._snapshot.identity == (st.st_ino, st.st_mtime_ns, st.st_size):
+            return
+        try:
+            # 旧映射由仍在使用它的请求持有，引用释放后自动关闭
+            self._snapshot = IndexSnapshot(self.path)
+        except (OSError, ValueError):
+            logger.exception('Failed to open index snapshot %s', self.path)
+
+    def _scan(self):
+        stats = {}
+        latest = 0
+        for root, dirs, files in os.walk(self.content_dir):
+            try:
+                latest = max(latest, os.stat(root).st_mtime_ns)
+            except FileNotFoundError:
+                continue
+            for name in files:
+                if not name.endswith('.md'):
+                    continue
+                file_path = os.path.join(root, name)
+                try:
+                    st = os.stat(file_path)
+                except FileNotFoundError:
+                    continue
+                stats[os.path.relpath(file_path, self.content_dir)] = (st.st_mtime_ns, st.st_size)
+                latest = max(latest, st.st_mtime_ns)
+        return stats, latest
+
+    def _acquire(self, wait):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        fd = os.open(f'{self.path}.lock', os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX if wait else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                return None
+        return fd
+
+    def _release(self, fd):
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+    def _rebuild(self, stats, latest, digest, wait):
+        fd = self._acquire(wait)
+        if fd is None:
+            return 0, 0
+        try:
+            # 等锁期间其他 worker 可能已经写好了新快照
+            self._reload()
+            old = self._snapshot
+            if old is not None and old.digest == digest:
+                return 0, 0
+
+            previous = {}
+            if old is not None:
+                previous = {old.field(index, 'path'): index for index in old.order_refs('by_date')}
+            changed = {path: ident for path, ident in stats.items()
+                       if path not in previous or old.ident(previous[path]) != ident}
+            removed = [path for path in previous if path not in stats]
+            return self._write(old, changed, removed, digest, latest)
+        finally:
+            self._release(fd)
+
+    def _write(self, old, stats, removed, digest, latest):
+        """解析 stats 中新增或修改的文件并写出新快照，返回 (新增或更新数, 删除数)；调用方持有构建锁
+
+        通常在旧快照上增量写入；失效记录过多时把存活记录连同新条目整体重写一遍。
+        """
+        docs = []
+        removed = list(removed)
+        for rel_path, post in load_posts(self.content_dir, list(stats), self.renderer, self.workers):
+            if post is not None:
+                docs.append(make_doc(rel_path, stats[rel_path], post))
+            else:
+                # 解析失败的文件不进入索引
+                removed.append(rel_path)
+        parsed = len(docs)
+        generation = (old.generation if old is not None else 0) + 1
+        stale = 0
+        if old is not None:
+            dropped = {path for path in (*stats, *removed) if old.find_path(path) is not None}
+            stale = old.stale_count + len(dropped)
+        if old is None or stale > max(COMPACT_MIN_STALE, (old.post_count + len(docs)) // 4):
+            if old is not None:
+                skip = {*stats, *removed}
+                docs += [
+                    old.reuse_doc(index) for index in old.order_refs('by_date')
+                    if old.field(index, 'path') not in skip
+                ]
+            write_snapshot(self.path, docs, generation, digest, latest)
+            mode = 'full'
+        else:
+            update_snapshot(self.path, old, docs, removed, generation, digest, latest)
+            mode = 'incremental'
+        self._reload()
+        logger.info('Index snapshot generation %d (%s): %d parsed, %d removed', generation, mode, parsed, len(removed))
+        return parsed, len(removed)
+
+    @property
+    def generation(self):
+        return self.snapshot().generation
+
+    def validators(self):
+        """(摘要, 最后修改时间)，用于 ETag / Last-Modified"""
+        snapshot = self.snapshot()
+        return snapshot.digest, snapshot.last_modified
+
+    def post_validators(self, slug):
+        snapshot = self.snapshot()
+        index = snapshot.find_slug(slug)
+        if index is None:
+            return None
+        path = snapshot.field(index, 'path')
+        mtime_ns, size = snapshot.ident(index)
+        digest = hashlib.sha1(f'{path}:{mtime_ns}:{size}'.encode('utf-8')).hexdigest()
+        return digest, datetime.fromtimestamp(mtime_ns / 1e9, timezone.utc)
+
+    def resolve(self, slug):
+        """filename 对应的文件相对路径"""
+        snapshot = self.snapshot()
+        index = snapshot.find_slug(slug)
+        return snapshot.field(index, 'path') if index is not None else None
+
+    def _with_body(self, snapshot, index):
+        post = snapshot.post(index)
+        try:
+            post['content'] = read_body(os.path.join(self.content_dir, snapshot.field(index, 'path')))
+        except FileNotFoundError:
+            return None
+        return post
+
+    def get(self, slug):
+        """按 filename 取单篇文章，正文直接从文件读取"""
+        snapshot = self.snapshot()
+        index = snapshot.find_slug(slug)
+        return self._with_body(snapshot, index) if index is not None else None
+
+    def _matches(self, snapshot, index, author_id, date_from, date_to):
+        if author_id and snapshot.field(index, 'author_id') != author_id:
+            return False
+        if date_from or date_to:
+            try:
+                post_date = datetime.fromisoformat(snapshot.field(index, 'date') or '')
+            except ValueError:
+                return False
+            post_date = post_date.replace(tzinfo=None)
+            if date_from and post_date < date_from:
+                return False
+            if date_to and post_date >= date_to:
+                return False
+        return True
+
+    def query_posts(self, sort='date', desc=True, limit=20, offset=0, after=None, with_body=False,
+                    tag=None, category=None, author_id=None, date_from=None, date_to=None):
+        """带过滤、排序和分页的文章查询，返回 (总数, 文章迭代器)
+
+        after 为游标解出的 (排序值, filename)，按键集分页。limit 为 None 时返回全部。
+        """
+        snapshot = self.snapshot()
+        if sort == 'date':
+            indices = snapshot.order_refs('by_date', reverse=not desc)
+        else:
+            indices = snapshot.order_refs('by_title', reverse=desc)
+
+        groups = [(table, key) for table, key in (('tags', tag), ('categories', category)) if key]
+        if groups and sort == 'date' and desc:
+            # 分组引用本身按日期倒序，直接作为结果序列，不遍历全部记录
+            indices = snapshot.group_posts(*groups.pop(0))
+        for table, key in groups:
+            members = set(snapshot.group_posts(table, key))
+            indices = [index for index in indices if index in members]
+        if author_id or date_from or date_to:
+            indices = [
+                index for index in indices
+                if self._matches(snapshot, index, author_id, date_from, date_to)
+            ]
+        indices = indices if isinstance(indices, Sequence) else list(indices)
+        total = len(indices)
+
+        if after is not None:
+            key = tuple(after)
+            field = 'date' if sort == 'date' else 'title'
+
+            def before_cursor(index):
+                current = (snapshot.field(index, field) or '', snapshot.field(index, 'filename'))
+                return not ((current < key) if desc else (current > key))
+
+            indices = itertools.dropwhile(before_cursor, indices)
+            page = itertools.islice(indices, offset, None if limit is None else offset + limit)
+        else:
+            page = indices[offset:] if limit is None else indices[offset:offset + limit]
+        if with_body:
+            return total, (post for post in (self._with_body(snapshot, index) for index in page) if post is not None)
+        return total, (snapshot.post(index) for index in page)
+
+    def paths(self, tag=None, category=None):
+        """带某个标签或分类的文章的相对路径（按快照中的分组表查找）"""
+        snapshot = self.snapshot()
+        indices = snapshot.group_posts('tags', tag) if tag else snapshot.order_refs('by_date')
+        if category:
+            members = set(snapshot.group_posts('categories', category))
+            indices = [index for index in indices if index in members]
+        return [snapshot.field(index, 'path') for index in indices]
+
+    def tag_counts(self):
+        return dict(self.snapshot().groups('tags'))
+
+    def tag_references(self):
+        """{标签: [filename, ...]}，每个标签下按日期倒序"""
+        snapshot = self.snapshot()
+        return {
+            tag: [snapshot.field(index, 'filename') for index in snapshot.group_posts('tags', tag)]
+            for tag, _ in snapshot.groups('tags')
+        }
+
+    def month_counts(self):
+        """{'YYYY-MM': 文章数}"""
+        return dict(self.snapshot().groups('months'))
+
+    def category_counts(self):
+        return dict(self.snapshot().groups('categories'))
+
+    def search(self, query, limit=20, offset=0):
+        """BM25F 全文搜索（与 SearchIndex 相同的打分），返回 (总数, [(得分, 文章含正文), ...])"""
+        tokens = set(tokenize(query))
+        snapshot = self.snapshot()
+        total_docs = len(snapshot)
+        if not tokens or not total_docs:
+            return 0, []
+        averages = [(total / total_docs) or 1.0 for total in snapshot.field_totals]
+        scores = defaultdict(float)
+        for token in tokens:
+            postings = snapshot.postings(token)
+            if not postings:
+                continue
+            idf = math.log(1 + (total_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for index, counts in postings:
+                lengths = snapshot.lengths(index)
+                weighted = 0.0
+                for position, count in enumerate(counts):
+                    if count:
+                        norm = 1 - B + B * lengths[position] / averages[position]
+                        weighted += BOOSTS[position] * count / norm
+                scores[index] += idf * weighted / (K1 + weighted)
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], snapshot.field(item[0], 'filename')))
+        results = []
+        for index, score in ranked[offset:offset + limit]:
+            post = self._with_body(snapshot, index)
+            if post is not None:
+                results.append((score, post))
+        return len(ranked), results
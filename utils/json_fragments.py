@@ -0,0 +1,67 @@
+import threading
+from collections import OrderedDict
+
+# 信封中待替换的占位值，序列化后为唯一的字符串字面量
+_PLACEHOLDER = '\0fragments\0'
+
+
+class FragmentCache:
+    """文章投影的 JSON 片段缓存，列表响应由片段拼接而成，不再逐篇序列化
+
+    按投影字段分组，每组为 {文章键: 片段}；最多保留 max_projections 种投影（LRU）。
+    作为 PostCatalog 的监听器时按文章对象失效；共享目录后端每次查询都会新建文章字典，
+    改为按 key 缓存，目录摘要变化时整体失效。
+    """
+
+    def __init__(self, dumps, max_projections=16):
+        self.dumps = dumps
+        self.max_projections = max_projections
+        self._lock = threading.Lock()
+        self._projections = OrderedDict()
+        self._digest = None
+
+    def __call__(self, changes):
+        with self._lock:
+            for _, old, _ in changes:
+                if old is None:
+                    continue
+                for fragments in self._projections.values():
+                    fragments.pop(id(old), None)
+
+    def encode(self, posts, fields, project, key=None, digest=None):
+        """返回各文章按 fields 投影后的 JSON 片段列表，未缓存的用 project(文章, fields) 生成
+
+        key 为 None 时按文章对象缓存：条目保留文章引用并校验是否为同一对象，id 不会被复用。
+        否则按 key(文章) 缓存，digest 为查询文章之前取得的目录摘要，与上次不同时清空全部片段；
+        清空前已取出的分组不再被引用，并发请求写入其中的旧片段会被丢弃。
+        """
+        with self._lock:
+            if key is not None and digest != self._digest:
+                self._projections.clear()
+                self._digest = digest
+            fragments = self._projections.get(fields)
+            if fragments is None:
+                fragments = self._projections[fields] = {}
+                while len(self._projections) > self.max_projections:
+                    self._projections.popitem(last=False)
+            else:
+                self._projections.move_to_end(fields)
+
+        result = []
+        for post in posts:
+            if key is None:
+                entry = fragments.get(id(post))
+                if entry is None or entry[0] is not post:
+                    entry = fragments[id(post)] = (post, self.dumps(project(post, fields)))
+            else:
+                post_key = key(post)
+                entry = fragments.get(post_key)
+                if entry is None:
+                    entry = fragments[post_key] = (None, self.dumps(project(post, fields)))
+            result.append(entry[1])
+        return result
+
+    def assemble(self, envelope, name, fragments):
+        """序列化 envelope，并把其中 name 字段替换为由片段拼接的数组"""
+        body = self.dumps(dict(envelope, **{name: _PLACEHOLDER}))
+        return body.replace(self.dumps(_PLACEHOLDER), '[' + ','.join(fragments) + ']', 1)
@@ -1,10 +1,20 @@
 import jwt
+import os
+import time
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from functools import wraps
-from flask import request, jsonify
-import os
+from flask import request, jsonify, g
 from dotenv import load_dotenv
 
+try:
+    import fcntl
+except ImportError:  # Windows 开发环境只跑单个进程，不需要文件锁
+    fcntl = None
+
 # 加载环境变量
 load_dotenv()
 
@@ -12,6 +22,176 @@ load_dotenv()
 SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'memory-blog-secret-key-2026-dev')
 TOKEN_EXPIRY_DAYS = 7
 
+# 已验证 token 的缓存：条目数上限与最长缓存秒数（不会超过 token 自身的 exp）
+TOKEN_CACHE_SIZE = int(os.getenv('JWT_CACHE_SIZE', '4096'))
+TOKEN_CACHE_TTL = float(os.getenv('JWT_CACHE_TTL', '300'))
+# 已注销 token 的记录文件，多个 worker 共享；按 JWT_REVOCATION_INTERVAL 秒节流检查文件变化
+REVOCATION_FILE = os.getenv('JWT_REVOCATION_FILE', os.path.join('instance', 'revoked_tokens'))
+REVOCATION_INTERVAL = float(os.getenv('JWT_REVOCATION_INTERVAL', '1.0'))
+
+
+def token_digest(token):
+    """token 的摘要，用作缓存与注销记录的键，不保存 token 原文"""
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+class TokenCache:
+    """已验证 token 的 TTL 缓存：摘要 -> (声明, 过期时间)
+
+    过期时间取缓存时长与 token 的 exp 中较早者，命中时不再做签名校验。
+    """
+
+    def __init__(self, max_entries=4096, ttl=300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, digest):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                return None
+            if entry[1] <= now:
+                del self._entries[digest]
+                return None
+            self._entries.move_to_end(digest)
+            return entry[0]
+
+    def put(self, digest, payload):
+        expires = time.time() + self.ttl
+        if isinstance(payload.get('exp'), (int, float)):
+            expires = min(expires, payload['exp'])
+        with self._lock:
+            self._entries[digest] = (payload, expires)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, digest):
+        with self._lock:
+            self._entries.pop(digest, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RevocationList:
+    """已注销的 token 摘要集合
+
+    检查只是一次集合查找；提供 path 时注销记录追加写入该文件（每行 "摘要 exp"），
+    其他 worker 按 min_interval 节流检查文件大小与修改时间，变化后重新读取。
+    已过期的 token 本就无法通过校验，读取时跳过；写入时若过期记录超过一半
+    （且文件超过 compact_lines 行），在文件锁内只保留有效记录并原子替换。
+    """
+
+    def __init__(self, path=None, min_interval=1.0, compact_lines=1024):
+        self.path = path
+        self.min_interval = min_interval
+        self.compact_lines = compact_lines
+        self._lock = threading.Lock()
+        self._revoked = {}
+        self._ident = None
+        self._last_check = None
+
+    def __contains__(self, digest):
+        self._refresh()
+        return digest in self._revoked
+
+    def revoke(self, digest, exp=None):
+        exp = int(exp) if isinstance(exp, (int, float)) else int(time.time() + TOKEN_EXPIRY_DAYS * 86400)
+        now = time.time()
+        with self._lock:
+            if not self.path:
+                self._revoked = {key: value for key, value in self._revoked.items() if value > now}
+                self._revoked[digest] = exp
+                return
+            fd = self._acquire()
+            try:
+                # 在锁内重新读取，保留其他 worker 追加的记录
+                revoked, lines = self._load(now)
+                revoked[digest] = exp
+                if lines >= self.compact_lines and lines + 1 > 2 * len(revoked):
+                    self._rewrite(revoked)
+                else:
+                    with open(self.path, 'a', encoding='utf-8') as f:
+                        f.write(f'{digest} {exp}\n')
+                st = os.stat(self.path)
+                self._revoked = revoked
+                self._ident = (st.st_mtime_ns, st.st_size)
+            finally:
+                self._release(fd)
+
+    def _load(self, now):
+        """读取文件中未过期的记录，返回 ({摘要: exp}, 总行数)"""
+        revoked = {}
+        lines = 0
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    lines += 1
+                    parts = line.split()
+                    if len(parts) == 2 and parts[1].isdigit() and int(parts[1]) > now:
+                        revoked[parts[0]] = int(parts[1])
+        except FileNotFoundError:
+            pass
+        return revoked, lines
+
+    def _rewrite(self, revoked):
+        directory = os.path.dirname(self.path) or '.'
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.writelines(f'{digest} {exp}\n' for digest, exp in revoked.items())
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def _acquire(self):
+        # 追加与压缩都持有同一把跨 worker 的锁，压缩时不会丢失其他 worker 追加的记录
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        fd = os.open(f'{self.path}.lock', os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        return fd
+
+    def _release(self, fd):
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+    def _refresh(self):
+        if not self.path:
+            return
+        now = time.monotonic()
+        if self._last_check is not None and now - self._last_check < self.min_interval:
+            return
+        with self._lock:
+            self._last_check = now
+            try:
+                st = os.stat(self.path)
+            except FileNotFoundError:
+                return
+            ident = (st.st_mtime_ns, st.st_size)
+            if ident == self._ident:
+                return
+            self._revoked = self._load(time.time())[0]
+            self._ident = ident
+
+
+token_cache = TokenCache(TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL)
+revoked_tokens = RevocationList(REVOCATION_FILE, REVOCATION_INTERVAL)
+
+
 def create_token(user_id, username, role='user'):
     """创建JWT token"""
     payload = {
@@ -24,102 +204,101 @@ def create_token(user_id, username, role='user'):
     return jwt.encode(payload, SECRET_KEY, algorithm='HS256')
 
 def verify_token(token):
-    """验证JWT token"""
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=['HS256'])
-        return payload
-    except jwt.ExpiredSignatureError:
-        return None
-    except jwt.InvalidTokenError:
+    """验证JWT token，返回声明；无效、过期或已注销时返回 None
+
+    验证通过的声明按 token 摘要缓存，重复请求不再做签名校验。
+    """
+    digest = token_digest(token)
+    if digest in revoked_tokens:
         return None
+    payload = token_cache.get(digest)
+    if payload is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=['HS256'])
+        except jwt.ExpiredSignatureError:
+            return None
+        except jwt.InvalidTokenError:
+            return None
+        token_cache.put(digest, payload)
+    return dict(payload)
+
+def revoke_token(token):
+    """注销 token（登出），之后 verify_token 返回 None；token 本身无效时不记录"""
+    payload = verify_token(token)
+    if payload is None:
+        return False
+    digest = token_digest(token)
+    revoked_tokens.revoke(digest, payload.get('exp'))
+    token_cache.discard(digest)
+    return True
+
+def get_request_token():
+    """从 Authorization: Bearer 头或 token cookie 中取出 token"""
+    auth_header = request.headers.get('Authorization', '')
+    if auth_header.startswith('Bearer '):
+        token = auth_header[7:]
+        if token:
+            return token
+    return request.cookies.get('token') or None
+
+def resolve_request_user():
+    """当前请求的 (token, 声明)，没有 token 时为 (None, None)，无效时声明为 None
+
+    同一请求内只解析一次。
+    """
+    if 'auth' not in g:
+        token = get_request_token()
+        g.auth = (token, verify_token(token) if token else None)
+    return g.auth
+
+def get_current_claims():
+    """当前登录用户的声明，未登录或 token 无效时返回 None"""
+    return resolve_request_user()[1]
+
+def _authenticate(role=None, default_role=None):
+    """认证当前请求并写入 request.user_id 等属性，失败时返回错误响应"""
+    token, payload = resolve_request_user()
+    if not token:
+        return jsonify({'error': 'Token is missing'}), 401
+    if not payload:
+        return jsonify({'error': 'Token is invalid or expired'}), 401
+    if role is not None and payload.get('role') != role:
+        return jsonify({'error': 'Admin permission required'}), 403
+
+    request.user_id = payload.get('user_id')
+    request.username = payload.get('username')
+    request.user_role = payload.get('role', default_role)
+    return None
 
 def token_required(f):
     """JWT认证装饰器"""
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = None
-        
-        if 'Authorization' in request.headers:
-            auth_header = request.headers['Authorization']
-            if auth_header.startswith('Bearer '):
-                token = auth_header[7:]
-        
-        if not token:
-            token = request.cookies.get('token')
-        
-        if not token:
-            return jsonify({'error': 'Token is missing'}), 401
-        
-        payload = verify_token(token)
-        if not payload:
-            return jsonify({'error': 'Token is invalid or expired'}), 401
-        
-        request.user_id = payload.get('user_id')
-        request.username = payload.get('username')
-        request.user_role = payload.get('role')
-        
+        error = _authenticate()
+        if error is not None:
+            return error
         return f(*args, **kwargs)
-    
+
     return decorated
 
 def admin_required(f):
     """管理员权限装饰器"""
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = None
-        
-        if 'Authorization' in request.headers:
-            auth_header = request.headers['Authorization']
-            if auth_header.startswith('Bearer '):
-                token = auth_header[7:]
-        
-        if not token:
-            token = request.cookies.get('token')
-        
-        if not token:
-            return jsonify({'error': 'Token is missing'}), 401
-        
-        payload = verify_token(token)
-        if not payload:
-            return jsonify({'error': 'Token is invalid or expired'}), 401
-        
-        role = payload.get('role')
-        if role != 'admin':
-            return jsonify({'error': 'Admin permission required'}), 403
-        
-        request.user_id = payload.get('user_id')
-        request.username = payload.get('username')
-        request.user_role = role
-        
+        error = _authenticate(role='admin')
+        if error is not None:
+            return error
         return f(*args, **kwargs)
-    
+
     return decorated
 
 def user_required(f):
     """普通用户权限装饰器"""
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = None
-        
-        if 'Authorization' in request.headers:
-            auth_header = request.headers['Authorization']
-            if auth_header.startswith('Bearer '):
-                token = auth_header[7:]
-        
-        if not token:
-            token = request.cookies.get('token')
-        
-        if not token:
-            return jsonify({'error': 'Token is missing'}), 401
-        
-        payload = verify_token(token)
-        if not payload:
-            return jsonify({'error': 'Token is invalid or expired'}), 401
-        
-        request.user_id = payload.get('user_id')
-        request.username = payload.get('username')
-        request.user_role = payload.get('role', 'user')
-        
+        error = _authenticate(default_role='user')
+        if error is not None:
+            return error
         return f(*args, **kwargs)
-    
+
     return decorated
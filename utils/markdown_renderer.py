@@ -0,0 +1,198 @@
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+
+import markdown
+from markdown.extensions.toc import slugify_unicode
+from pygments.formatters import HtmlFormatter
+
+DEFAULT_EXTENSIONS = ['fenced_code', 'tables', 'toc', 'codehilite']
+DEFAULT_EXTENSION_CONFIGS = {
+    # 保留中文标题作为锚点，避免生成 _1、_2 这样的 id
+    'toc': {'slugify': slugify_unicode},
+    # 由 Pygments 在服务端完成代码高亮，前端只需要引入对应的 CSS
+    'codehilite': {'css_class': 'highlight', 'guess_lang': False}
+}
+
+
+def _config_repr(value):
+    # 函数等对象按限定名参与哈希，保证各进程得到相同的缓存键
+    return f'{getattr(value, "__module__", "")}.{getattr(value, "__qualname__", repr(value))}'
+
+
+class MarkdownRenderer:
+    """Markdown 渲染引擎
+
+    每个线程复用一个 Markdown 实例；渲染结果（HTML、目录 HTML、目录树）
+    以正文和扩展配置的哈希为键，缓存在进程内 LRU 和 instance/ 下的磁盘目录中，
+    磁盘缓存可在多个 gunicorn worker 之间共享。磁盘缓存总大小超过 disk_max_bytes 时
+    按最近使用时间（命中时更新 mtime）淘汰到上限的 80%，旧正文的渲染结果不会无限堆积。
+    """
+
+    def __init__(self, cache_dir=None, max_entries=512, extensions=None, extension_configs=None,
+                 disk_max_bytes=256 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.disk_max_bytes = disk_max_bytes
+        self.extensions = list(extensions or DEFAULT_EXTENSIONS)
+        self.extension_configs = extension_configs if extension_configs is not None else DEFAULT_EXTENSION_CONFIGS
+        self._config_digest = hashlib.sha256(json.dumps(
+            [self.extensions, self.extension_configs], sort_keys=True, default=_config_repr
+        ).encode('utf-8')).hexdigest()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        # 自上次清理以来写入的字节数；初始即达到阈值，进程第一次写入时先清理一次
+        self._written = self._prune_threshold()
+
+    def __getstate__(self):
+        # 传给进程池子进程时只带配置，线程局部的 Markdown 实例和内存缓存在子进程中重建
+        state = self.__dict__.copy()
+        for name in ('_local', '_lock', '_memory'):
+            del state[name]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+
+    def render(self, text):
+        """返回 {'html', 'toc', 'toc_tokens'}"""
+        key = self.cache_key(text)
+        result = self._memory_get(key)
+        if result is not None:
+            return result
+
+        result = self._disk_get(key)
+        if result is None:
+            md = self._converter()
+            md.reset()
+            html = md.convert(text)
+            result = {
+                'html': html,
+                'toc': getattr(md, 'toc', ''),
+                'toc_tokens': getattr(md, 'toc_tokens', [])
+            }
+            self._disk_put(key, result)
+        self._memory_put(key, result)
+        return result
+
+    def highlight_css(self, style='default'):
+        """codehilite 输出对应的 Pygments CSS"""
+        css_class = self.extension_configs.get('codehilite', {}).get('css_class', 'codehilite')
+        return HtmlFormatter(style=style).get_style_defs(f'.{css_class}')
+
+    def cache_key(self, text):
+        digest = hashlib.sha256(self._config_digest.encode('ascii'))
+        digest.update(text.encode('utf-8'))
+        return digest.hexdigest()
+
+    def _converter(self):
+        md = getattr(self._local, 'md', None)
+        if md is None:
+            md = markdown.Markdown(extensions=self.extensions, extension_configs=self.extension_configs)
+            self._local.md = md
+        return md
+
+    def _memory_get(self, key):
+        with self._lock:
+            result = self._memory.get(key)
+            if result is not None:
+                self._memory.move_to_end(key)
+            return result
+
+    def _memory_put(self, key, result):
+        with self._lock:
+            self._memory[key] = result
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f'{key}.json')
+
+    def _disk_get(self, key):
+        if not self.cache_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                result = json.load(f)
+        except (OSError, ValueError):
+            return None
+        try:
+            # 命中时更新 mtime，淘汰时据此判断最近使用
+            os.utime(path)
+        except OSError:
+            pass
+        return result
+
+    def _disk_put(self, key, result):
+        if not self.cache_dir:
+            return
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        except OSError:
+            return
+        # 先写临时文件再原子替换，其他 worker 不会读到半个文件
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(result, f, ensure_ascii=False)
+                size = f.tell()
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+        with self._lock:
+            self._written += size
+            due = self._written >= self._prune_threshold()
+            if due:
+                self._written = 0
+        if due:
+            self.prune_disk()
+
+    def _prune_threshold(self):
+        # 每写入上限的 10% 扫描一次目录，扫描开销按写入量摊销
+        return self.disk_max_bytes // 10 if self.disk_max_bytes else float('inf')
+
+    def prune_disk(self):
+        """磁盘缓存超过 disk_max_bytes 时删除最久未使用的条目，返回删除的条目数"""
+        if not self.cache_dir or not self.disk_max_bytes:
+            return 0
+        entries = []
+        total = 0
+        for root, dirs, files in os.walk(self.cache_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime_ns, st.st_size, path))
+                total += st.st_size
+        if total <= self.disk_max_bytes:
+            return 0
+        entries.sort()
+        target = self.disk_max_bytes * 8 // 10
+        removed = 0
+        for mtime_ns, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                # 其他 worker 可能同时在清理
+                continue
+            total -= size
+            removed += 1
+        return removed
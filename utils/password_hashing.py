@@ -0,0 +1,149 @@
+import math
+import time
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+import bcrypt
+
+
+class HasherBusy(Exception):
+    """哈希队列已满或等待超时，应返回 503"""
+
+
+class PasswordHasher:
+    """在独立的有界线程池中执行 bcrypt
+
+    bcrypt 计算时释放 GIL，线程池即可并行；同时最多 workers 个哈希在算，另有 max_queue 个
+    排队，超出时立即抛出 HasherBusy，请求线程不会无限堆积在登录上。
+    """
+
+    def __init__(self, workers=2, max_queue=16, timeout=10.0, rounds=12):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.rounds = rounds
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._timeouts = 0
+        self._latencies = deque(maxlen=256)   # 最近的哈希耗时（秒）
+        self._waits = deque(maxlen=256)       # 最近的排队时间（秒）
+
+    def check(self, password, password_hash):
+        """校验密码，返回 bool"""
+        return self._submit(bcrypt.checkpw, password.encode('utf-8'), password_hash.encode('utf-8'))
+
+    def hash(self, password):
+        """生成密码哈希（str）"""
+        hashed = self._submit(bcrypt.hashpw, password.encode('utf-8'), bcrypt.gensalt(self.rounds))
+        return hashed.decode('utf-8')
+
+    def _submit(self, func, *args):
+        with self._lock:
+            if self._pending >= self.workers + self.max_queue:
+                self._rejected += 1
+                raise HasherBusy('Password hashing queue is full')
+            self._pending += 1
+        submitted = time.monotonic()
+        try:
+            future = self._executor.submit(self._run, func, args, submitted)
+        except BaseException:
+            with self._lock:
+                self._pending -= 1
+            raise
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            # 已开始的哈希无法取消，会在后台算完；未开始的直接取消
+            cancelled = future.cancel()
+            with self._lock:
+                self._timeouts += 1
+                if cancelled:
+                    self._pending -= 1
+            raise HasherBusy('Password hashing timed out')
+
+    def _run(self, func, args, submitted):
+        started = time.monotonic()
+        with self._lock:
+            self._running += 1
+        try:
+            return func(*args)
+        finally:
+            finished = time.monotonic()
+            with self._lock:
+                self._running -= 1
+                self._pending -= 1
+                self._completed += 1
+                self._waits.append(started - submitted)
+                self._latencies.append(finished - started)
+
+    def stats(self):
+        """队列深度与最近的哈希耗时（毫秒）"""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            waits = sorted(self._waits)
+            return {
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'running': self._running,
+                'queued': self._pending - self._running,
+                'completed': self._completed,
+                'rejected': self._rejected,
+                'timeouts': self._timeouts,
+                'hash_ms': _percentiles(latencies),
+                'wait_ms': _percentiles(waits)
+            }
+
+
+def _percentiles(values):
+    if not values:
+        return None
+    pick = lambda q: round(values[min(len(values) - 1, int(q * len(values)))] * 1000, 2)
+    return {'p50': pick(0.5), 'p95': pick(0.95), 'max': round(values[-1] * 1000, 2)}
+
+
+class TokenBucketLimiter:
+    """按键（IP、用户名）限流的令牌桶
+
+    每个键最多 burst 个令牌，每秒补充 rate 个；只保留最近使用的 max_keys 个键。
+    """
+
+    def __init__(self, rate, burst, max_keys=10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()   # 键 -> (令牌数, 上次更新时间)
+
+    def acquire(self, key):
+        """取一个令牌；成功返回 0，否则返回需要等待的秒数"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                wait = 0
+            else:
+                self._buckets[key] = (tokens, now)
+                wait = (1 - tokens) / self.rate
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def refund(self, key):
+        """退还一个令牌（如登录成功时不计入用户名的失败次数）"""
+        with self._lock:
+            entry = self._buckets.get(key)
+            if entry is not None:
+                self._buckets[key] = (min(self.burst, entry[0] + 1), entry[1])
+
+
+def retry_after(seconds):
+    """Retry-After 头的取值（整秒，至少 1）"""
+    return str(max(1, math.ceil(seconds)))
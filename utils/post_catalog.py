@@ -0,0 +1,372 @@
+import os
+import re
+import time
+import hashlib
+import logging
+import itertools
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, date, timezone
+
+import markdown
+
+from utils.front_matter import parse_front_matter
+
+logger = logging.getLogger(__name__)
+
+
+def make_slug(rel_path):
+    """由相对路径生成文章 filename，路径分隔符替换为连字符"""
+    filename_without_ext = os.path.splitext(rel_path)[0]
+    # 将路径分隔符替换为连字符，确保前端路由正常工作
+    return filename_without_ext.replace(os.path.sep, '-')
+
+
+def split_front_matter(text):
+    """拆分 YAML 元数据与正文，返回 (元数据文本或 None, 正文)"""
+    if text.startswith('---'):
+        parts = text.split('---', 2)[1:]
+        if len(parts) == 2:
+            return parts[0], parts[1]
+    return None, text
+
+
+def read_body(file_path):
+    """只读取文章正文（不解析元数据）"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return split_front_matter(f.read())[1]
+
+
+def load_post(file_path, rel_path, renderer=None):
+    """读取并解析单篇文章，返回与 get_posts() 相同结构的字典
+
+    提供 renderer 时用其（带缓存的）渲染结果生成摘要。
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+
+    metadata = {}
+    header, content = split_front_matter(content)
+    if header is not None:
+        metadata = parse_front_matter(header) or {}
+
+    if 'title' not in metadata:
+        metadata['title'] = os.path.splitext(os.path.basename(file_path))[0]
+
+    if 'date' not in metadata:
+        metadata['date'] = datetime.fromtimestamp(os.path.getmtime(file_path))
+    elif isinstance(metadata['date'], str):
+        try:
+            metadata['date'] = datetime.fromisoformat(metadata['date'])
+        except ValueError:
+            metadata['date'] = datetime.now()
+    elif isinstance(metadata['date'], date) and not isinstance(metadata['date'], datetime):
+        metadata['date'] = datetime.combine(metadata['date'], datetime.min.time())
+
+    if renderer is not None:
+        html_content = renderer.render(content)['html']
+    else:
+        html_content = markdown.markdown(content)
+    plain_text = re.sub('<[^<]+?>', '', html_content)
+    summary = plain_text[:200] + '...' if len(plain_text) > 200 else plain_text
+
+    tags = metadata.get('tags', [])
+    if isinstance(tags, str):
+        tags = [tag.strip() for tag in tags.split(',')]
+
+    return {
+        'filename': make_slug(rel_path),
+        'title': metadata.get('title'),
+        'date': metadata.get('date'),
+        'summary': summary,
+        'content': content,
+        'metadata': metadata,
+        'tags': tags,
+        'author_id': metadata.get('author_id'),
+        'author_name': metadata.get('author_name')
+    }
+
+
+def load_post_safely(content_dir, rel_path, renderer=None):
+    """解析单篇文章；文件已删除或解析失败时返回 None"""
+    file_path = os.path.join(content_dir, rel_path)
+    try:
+        return load_post(file_path, rel_path, renderer)
+    except FileNotFoundError:
+        return None
+    except Exception:
+        logger.exception('Failed to load post %s', file_path)
+        return None
+
+
+def _load_batch(content_dir, rel_paths, renderer=None):
+    return [(rel_path, load_post_safely(content_dir, rel_path, renderer)) for rel_path in rel_paths]
+
+
+# 进程池子进程中使用的渲染器，由 _init_worker 设置
+_worker_renderer = None
+
+
+def _init_worker(renderer):
+    global _worker_renderer
+    _worker_renderer = renderer
+
+
+def _load_batch_in_worker(content_dir, rel_paths):
+    return _load_batch(content_dir, rel_paths, _worker_renderer)
+
+
+def load_posts(content_dir, rel_paths, renderer=None, workers=0, batch_size=32):
+    """解析多篇文章，返回按相对路径排序的 [(相对路径, 文章或 None), ...]
+
+    workers > 1 且文件多于一批时，按批分给进程池并行读取、解析元数据、渲染摘要，
+    结果按路径顺序合并，与串行解析一致；渲染结果经磁盘缓存与父进程共享。
+    """
+    rel_paths = sorted(rel_paths)
+    if workers <= 1 or len(rel_paths) <= batch_size:
+        return _load_batch(content_dir, rel_paths, renderer)
+
+    batches = [rel_paths[i:i + batch_size] for i in range(0, len(rel_paths), batch_size)]
+    try:
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(batches)),
+            initializer=_init_worker,
+            initargs=(renderer,)
+        ) as executor:
+            return list(itertools.chain.from_iterable(
+                executor.map(_load_batch_in_worker, itertools.repeat(content_dir), batches)
+            ))
+    except (OSError, BrokenProcessPool):
+        logger.exception('Parallel post loading failed, falling back to serial loading')
+        return _load_batch(content_dir, rel_paths, renderer)
+
+
+class PostCatalog:
+    """进程内文章目录
+
+    首次访问时完整扫描 content/，之后只按 stat 结果增量刷新：
+    目录 mtime 未变时复用上次的目录列表，文件的 (mtime, size, inode)
+    未变时复用上次的解析结果。每次内容发生变化 generation 加一。
+    """
+
+    def __init__(self, content_dir='content', min_interval=1.0, renderer=None, workers=0):
+        self.content_dir = content_dir
+        self.renderer = renderer
+        self.min_interval = min_interval
+        # 一次变化的文件多于一批时用多少个进程并行解析，0 或 1 为串行
+        self.workers = workers
+        self.generation = 0
+        self._lock = threading.RLock()
+        self._dirs = {}      # 目录路径 -> (mtime_ns, 文件名列表, 子目录列表)
+        self._stats = {}     # 相对路径 -> (mtime_ns, size, inode)
+        self._posts = {}     # 相对路径 -> 文章字典
+        self._slugs = {}     # filename -> 相对路径集合，多于一个即为冲突
+        # 由文件路径、mtime、大小计算的目录摘要，各 worker 对同一份内容得到相同的值
+        self.digest = hashlib.sha1(b'').hexdigest()
+        self.last_modified = None
+        self._sorted = []
+        self._last_refresh = None
+        # 由后台监听线程维护时关闭，请求线程不再访问磁盘
+        self.auto_refresh = True
+        self._listeners = []
+
+    def refresh(self, force=False):
+        """增量刷新目录，返回刷新后的 generation"""
+        now = time.monotonic()
+        if (not force and self._last_refresh is not None
+                and now - self._last_refresh < self.min_interval):
+            return self.generation
+
+        with self._lock:
+            dirs = {}
+            stats = {}
+            if os.path.isdir(self.content_dir):
+                self._scan_dir(self.content_dir, dirs, stats)
+            self._dirs = dirs
+
+            # 解析失败的文件记为 None，从目录中移除
+            changed = dict(load_posts(
+                self.content_dir,
+                [rel_path for rel_path, ident in stats.items() if self._stats.get(rel_path) != ident],
+                self.renderer,
+                self.workers
+            ))
+            removed = [rel_path for rel_path in self._posts if rel_path not in stats]
+
+            self._stats = stats
+            self._apply(changed, removed)
+            self._last_refresh = time.monotonic()
+            return self.generation
+
+    def update_paths(self, rel_paths):
+        """只重新检查给定文件（相对 content/ 的路径），供后台监听线程使用"""
+        with self._lock:
+            changed = {}
+            removed = []
+            for rel_path in rel_paths:
+                try:
+                    st = os.stat(os.path.join(self.content_dir, rel_path))
+                except FileNotFoundError:
+                    self._stats.pop(rel_path, None)
+                    if rel_path in self._posts:
+                        removed.append(rel_path)
+                    continue
+                ident = (st.st_mtime_ns, st.st_size, st.st_ino)
+                if self._stats.get(rel_path) == ident:
+                    continue
+                self._stats[rel_path] = ident
+                changed[rel_path] = self._load(rel_path)
+
+            self._apply(changed, removed)
+            return self.generation
+
+    def get(self, slug):
+        """按 filename 查找单篇文章，只检查（必要时重新解析）这一个文件"""
+        rel_path = self.resolve(slug)
+        if rel_path is None:
+            # 可能是新加入的文件，做一次（受节流限制的）增量刷新
+            if self.auto_refresh:
+                self.refresh()
+                rel_path = self.resolve(slug)
+        elif self.auto_refresh:
+            self.update_paths([rel_path])
+            rel_path = self.resolve(slug)
+        if rel_path is None:
+            return None
+        return self._posts.get(rel_path)
+
+    def resolve(self, slug):
+        """filename 对应的相对路径；冲突时取路径字典序最小者"""
+        with self._lock:
+            paths = self._slugs.get(slug)
+            return min(paths) if paths else None
+
+    def collisions(self):
+        """返回 {filename: [相对路径, ...]}，列出映射到同一 filename 的文件"""
+        with self._lock:
+            return {slug: sorted(paths) for slug, paths in self._slugs.items() if len(paths) > 1}
+
+    def sync(self):
+        """请求线程调用：未启用后台监听时做一次（受节流限制的）增量刷新"""
+        if self.auto_refresh:
+            self.refresh()
+        return self.generation
+
+    def validators(self):
+        """全部文章的 (摘要, 最后修改时间)，用于 ETag / Last-Modified"""
+        self.sync()
+        return self.digest, self.last_modified
+
+    def post_validators(self, slug):
+        """单篇文章的 (摘要, 最后修改时间)，文章不存在时返回 None"""
+        if self.get(slug) is None:
+            return None
+        with self._lock:
+            rel_path = self.resolve(slug)
+            ident = self._stats.get(rel_path)
+        if ident is None:
+            return None
+        digest = hashlib.sha1(f'{rel_path}:{ident[0]}:{ident[1]}'.encode('utf-8')).hexdigest()
+        return digest, datetime.fromtimestamp(ident[0] / 1e9, timezone.utc)
+
+    def posts(self):
+        """按日期倒序返回全部文章"""
+        self.sync()
+        return self._sorted
+
+    def subscribe(self, listener):
+        """注册变更监听器，用于维护二级索引
+
+        listener 接收 [(相对路径, 旧文章或 None, 新文章或 None), ...]，
+        注册时会先以当前全部文章调用一次。
+        """
+        with self._lock:
+            self._listeners.append(listener)
+            if self._posts:
+                listener([(rel_path, None, post) for rel_path, post in self._posts.items()])
+
+    def _apply(self, changed, removed):
+        if not changed and not removed:
+            return
+        changes = []
+        for rel_path in removed:
+            old = self._posts.pop(rel_path, None)
+            changes.append((rel_path, old, None))
+        for rel_path, post in changed.items():
+            if post is None:
+                old = self._posts.pop(rel_path, None)
+            else:
+                old = self._posts.get(rel_path)
+                self._posts[rel_path] = post
+            changes.append((rel_path, old, post))
+        changes = [change for change in changes if change[1] is not None or change[2] is not None]
+        for rel_path, old, new in changes:
+            if old is not None:
+                paths = self._slugs.get(old['filename'], set())
+                paths.discard(rel_path)
+                if not paths:
+                    self._slugs.pop(old['filename'], None)
+            if new is not None:
+                paths = self._slugs.setdefault(new['filename'], set())
+                paths.add(rel_path)
+                if len(paths) > 1:
+                    logger.warning('Slug collision for %s: %s', new['filename'], ', '.join(sorted(paths)))
+        for listener in self._listeners:
+            try:
+                listener(changes)
+            except Exception:
+                logger.exception('Post catalog listener failed')
+        self._sorted = sorted(self._posts.values(), key=lambda x: (x['date'], x['filename']), reverse=True)
+        self._update_validators()
+        self.generation += 1
+
+    def _update_validators(self):
+        digest = hashlib.sha1()
+        latest = 0
+        for rel_path in sorted(self._stats):
+            mtime_ns, size, _ = self._stats[rel_path]
+            digest.update(f'{rel_path}:{mtime_ns}:{size}\n'.encode('utf-8'))
+            latest = max(latest, mtime_ns)
+        # 删除文件只会改变所在目录的 mtime
+        for dir_mtime, _, _ in self._dirs.values():
+            latest = max(latest, dir_mtime)
+        self.digest = digest.hexdigest()
+        self.last_modified = datetime.fromtimestamp(latest / 1e9, timezone.utc) if latest else None
+
+    def _scan_dir(self, path, dirs, stats):
+        try:
+            dir_mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return
+
+        cached = self._dirs.get(path)
+        if cached and cached[0] == dir_mtime:
+            files, subdirs = cached[1], cached[2]
+        else:
+            files, subdirs = [], []
+            try:
+                with os.scandir(path) as it:
+                    for entry in it:
+                        if entry.is_dir():
+                            subdirs.append(entry.name)
+                        elif entry.name.endswith('.md'):
+                            files.append(entry.name)
+            except FileNotFoundError:
+                return
+        dirs[path] = (dir_mtime, files, subdirs)
+
+        for name in files:
+            file_path = os.path.join(path, name)
+            try:
+                st = os.stat(file_path)
+            except FileNotFoundError:
+                continue
+            rel_path = os.path.relpath(file_path, self.content_dir)
+            stats[rel_path] = (st.st_mtime_ns, st.st_size, st.st_ino)
+
+        for name in subdirs:
+            self._scan_dir(os.path.join(path, name), dirs, stats)
+
+    def _load(self, rel_path):
+        return load_post_safely(self.content_dir, rel_path, self.renderer)
@@ -0,0 +1,125 @@
+import json
+import base64
+from datetime import datetime, timedelta
+
+# 列表默认返回的字段，不包含正文
+DEFAULT_FIELDS = ('filename', 'title', 'date', 'summary', 'tags', 'category', 'author_id', 'author_name')
+ALLOWED_FIELDS = DEFAULT_FIELDS + ('content', 'metadata')
+SORT_FIELDS = ('date', 'title')
+
+
+class QueryError(ValueError):
+    """查询参数不合法"""
+
+
+def parse_fields(value):
+    """解析 fields= 参数，filename 始终返回"""
+    if not value:
+        return DEFAULT_FIELDS
+    fields = ['filename']
+    for field in value.split(','):
+        field = field.strip()
+        if not field or field in fields:
+            continue
+        if field not in ALLOWED_FIELDS:
+            raise QueryError(f'Unknown field: {field}')
+        fields.append(field)
+    return tuple(fields)
+
+
+def parse_sort(value):
+    """解析 sort= 参数，返回 (字段, 是否倒序)，默认按日期倒序"""
+    value = value or '-date'
+    desc = value.startswith('-')
+    field = value.lstrip('-')
+    if field not in SORT_FIELDS:
+        raise QueryError(f'Unknown sort field: {field}')
+    return field, desc
+
+
+def parse_date(value, end=False):
+    """解析日期范围参数；end=True 时纯日期表示当天结束（不含次日零点）"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise QueryError(f'Invalid date: {value}')
+    if parsed.tzinfo is not None:
+        parsed = parsed.replace(tzinfo=None)
+    if end and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed
+
+
+def project(post, fields):
+    """按字段投影文章"""
+    result = {}
+    for field in fields:
+        if field == 'category':
+            result['category'] = post['metadata'].get('category')
+        else:
+            result[field] = post.get(field)
+    return result
+
+
+def filter_posts(posts, tag=None, category=None, author_id=None, date_from=None, date_to=None):
+    """按标签、分类、作者和日期范围过滤"""
+    result = []
+    for post in posts:
+        if tag and tag not in post.get('tags', []):
+            continue
+        if category and post['metadata'].get('category') != category:
+            continue
+        if author_id and str(post.get('author_id')) != author_id:
+            continue
+        post_date = post['date']
+        if getattr(post_date, 'tzinfo', None) is not None:
+            post_date = post_date.replace(tzinfo=None)
+        if date_from and post_date < date_from:
+            continue
+        if date_to and post_date >= date_to:
+            continue
+        result.append(post)
+    return result
+
+
+def sort_key(post, field):
+    """排序键，文件名作为并列时的次序，保证游标分页稳定"""
+    if field == 'date':
+        value = post['date'].isoformat() if hasattr(post['date'], 'isoformat') else str(post['date'])
+    else:
+        value = str(post.get('title') or '')
+    return value, post['filename']
+
+
+def sort_posts(posts, field, desc):
+    return sorted(posts, key=lambda post: sort_key(post, field), reverse=desc)
+
+
+def encode_cursor(post, field):
+    key = sort_key(post, field)
+    raw = json.dumps([field, key[0], key[1]], ensure_ascii=False).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, field):
+    """解析游标，返回排序键"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        cursor_field, value, filename = json.loads(raw.decode('utf-8'))
+    except (ValueError, TypeError):
+        raise QueryError('Invalid cursor')
+    if cursor_field != field:
+        raise QueryError('Cursor does not match sort order')
+    return value, filename
+
+
+def cursor_offset(posts, cursor, field, desc):
+    """游标对应的下一条记录在已排序列表中的位置"""
+    key = tuple(decode_cursor(cursor, field))
+    for index, post in enumerate(posts):
+        current = sort_key(post, field)
+        if (current < key) if desc else (current > key):
+            return index
+    return len(posts)
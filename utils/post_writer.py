@@ -0,0 +1,95 @@
+import os
+import hashlib
+import itertools
+import tempfile
+from contextlib import contextmanager
+
+import yaml
+
+try:
+    import fcntl
+except ImportError:  # Windows 开发环境只跑单个进程，不需要文件锁
+    fcntl = None
+
+# 文章写锁按路径哈希分到固定数量的锁文件上，锁文件数量有上限，不同文章的改写仍可并行
+LOCK_STRIPES = 64
+
+
+def render_post(metadata, content):
+    """生成文章文件内容：YAML 元数据 + 正文，值为空的字段不写入
+
+    用 yaml.safe_dump 序列化，标题中含冒号、引号等字符时也能被正确解析。
+    """
+    header = yaml.safe_dump(
+        {key: value for key, value in metadata.items() if value},
+        allow_unicode=True, sort_keys=False, default_flow_style=None, width=10000
+    )
+    return f'---\n{header}---\n\n{content}'
+
+
+def _write_temp(directory, text):
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o644)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return tmp_path
+
+
+def create_post_file(content_dir, base, text, taken=None, start=0):
+    """以不重复的文件名原子地新建文章，返回相对 content_dir 的路径
+
+    依次尝试 base.md、base-1.md、base-2.md……（从第 start 个开始），用 os.link 把写好的临时
+    文件链接到目标路径：目标已存在时 link 失败而不会覆盖，同一秒内并发创建也不会互相覆盖。
+    taken(filename) 返回 True 的文件名（如子目录中文章占用的 filename）同样跳过。
+    """
+    tmp_path = _write_temp(content_dir, text)
+    try:
+        for n in itertools.count(start):
+            name = base if n == 0 else f'{base}-{n}'
+            if taken is not None and taken(name):
+                continue
+            try:
+                os.link(tmp_path, os.path.join(content_dir, f'{name}.md'))
+            except FileExistsError:
+                continue
+            return f'{name}.md'
+    finally:
+        os.remove(tmp_path)
+
+
+@contextmanager
+def post_lock(content_dir, rel_path):
+    """单篇文章的跨进程写锁（content_dir/.locks/ 下的 flock）
+
+    覆盖已有文章的读-改-写都在锁内进行：后台批量改写元数据与编辑文章不会互相覆盖。
+    """
+    directory = os.path.join(content_dir, '.locks')
+    os.makedirs(directory, exist_ok=True)
+    stripe = int(hashlib.sha1(os.path.normpath(rel_path).encode('utf-8')).hexdigest(), 16) % LOCK_STRIPES
+    fd = os.open(os.path.join(directory, f'{stripe}.lock'), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+
+def replace_post_file(content_dir, rel_path, text):
+    """原子地覆盖已有文章：写临时文件后 os.replace，读者不会看到写了一半的内容"""
+    target = os.path.join(content_dir, rel_path)
+    tmp_path = _write_temp(os.path.dirname(target), text)
+    try:
+        os.replace(tmp_path, target)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
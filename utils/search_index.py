@@ -0,0 +1,190 @@
+import re
+import html
+import math
+import threading
+from collections import defaultdict
+
+# 中日韩统一表意文字及常用扩展区
+CJK_RANGES = '\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff'
+TOKEN_RE = re.compile(f'[{CJK_RANGES}]+|[a-z0-9]+(?:[._+#-][a-z0-9]+)*')
+CJK_RE = re.compile(f'[{CJK_RANGES}]')
+MARKDOWN_RE = re.compile(r'```.*?```|`[^`]*`|!\[[^\]]*\]\([^)]*\)|\[([^\]]*)\]\([^)]*\)|[#>*_~|-]+', re.S)
+SPACE_RE = re.compile(r'\s+')
+
+# 字段权重：标题和标签命中比正文更重要
+FIELD_BOOSTS = {
+    'title': 3.0,
+    'tags': 2.5,
+    'category': 2.0,
+    'content': 1.0
+}
+K1 = 1.2
+B = 0.75
+
+
+def tokenize(text):
+    """分词：拉丁字母和数字按单词切分，中文按相邻二字切分，单字单独成词"""
+    tokens = []
+    for match in TOKEN_RE.finditer(text.lower()):
+        token = match.group()
+        if CJK_RE.match(token):
+            if len(token) == 1:
+                tokens.append(token)
+            else:
+                tokens.extend(token[i:i + 2] for i in range(len(token) - 1))
+        else:
+            tokens.append(token)
+    return tokens
+
+
+def plain_text(markdown_text):
+    """粗略去掉 Markdown 标记，用于生成摘要片段"""
+    text = MARKDOWN_RE.sub(lambda m: m.group(1) or ' ', markdown_text)
+    return SPACE_RE.sub(' ', text).strip()
+
+
+def highlight(text, terms):
+    """转义文本并用 <mark> 标出命中的词"""
+    if not terms:
+        return html.escape(text)
+    pattern = re.compile('|'.join(re.escape(term) for term in sorted(terms, key=len, reverse=True)), re.I)
+    parts = []
+    last = 0
+    for match in pattern.finditer(text):
+        parts.append(html.escape(text[last:match.start()]))
+        parts.append(f'<mark>{html.escape(match.group())}</mark>')
+        last = match.end()
+    parts.append(html.escape(text[last:]))
+    return ''.join(parts)
+
+
+def make_snippet(text, terms, width=120):
+    """截取第一个命中位置附近的片段并高亮"""
+    lowered = text.lower()
+    positions = [lowered.find(term) for term in terms]
+    positions = [pos for pos in positions if pos >= 0]
+    start = max(0, min(positions) - width // 3) if positions else 0
+    snippet = text[start:start + width]
+    prefix = '...' if start > 0 else ''
+    suffix = '...' if start + width < len(text) else ''
+    return prefix + highlight(snippet, terms) + suffix
+
+
+class SearchIndex:
+    """随文章目录增量维护的倒排索引，按 BM25F 排序
+
+    通过 PostCatalog.subscribe() 接收变更，单篇文章变化时只更新该文章的倒排项。
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings = defaultdict(dict)                 # 词 -> {文档: {字段: 词频}}
+        self._doc_terms = {}                               # 文档 -> 词集合
+        self._doc_lengths = {}                             # 文档 -> {字段: 长度}
+        self._field_totals = defaultdict(int)              # 字段 -> 全部文档长度之和
+        self._docs = {}                                    # 文档 -> 文章
+
+    def __call__(self, changes):
+        with self._lock:
+            for rel_path, old, new in changes:
+                self.remove(rel_path)
+                if new is not None:
+                    self.add(rel_path, new)
+
+    def add(self, doc_id, post):
+        fields = {
+            'title': tokenize(str(post.get('title') or '')),
+            'tags': [token for tag in post.get('tags') or [] for token in tokenize(str(tag))],
+            'category': tokenize(str(post['metadata'].get('category') or '')),
+            'content': tokenize(post.get('content') or '')
+        }
+        with self._lock:
+            lengths = {}
+            terms = set()
+            for field, tokens in fields.items():
+                lengths[field] = len(tokens)
+                self._field_totals[field] += len(tokens)
+                counts = defaultdict(int)
+                for token in tokens:
+                    counts[token] += 1
+                for token, count in counts.items():
+                    self._postings[token].setdefault(doc_id, {})[field] = count
+                    terms.add(token)
+            self._doc_terms[doc_id] = terms
+            self._doc_lengths[doc_id] = lengths
+            self._docs[doc_id] = post
+
+    def remove(self, doc_id):
+        with self._lock:
+            terms = self._doc_terms.pop(doc_id, None)
+            if terms is None:
+                return
+            for token in terms:
+                postings = self._postings[token]
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[token]
+            for field, length in self._doc_lengths.pop(doc_id).items():
+                self._field_totals[field] -= length
+            del self._docs[doc_id]
+
+    def _averages(self):
+        total_docs = len(self._docs)
+        return {field: (self._field_totals[field] / total_docs) or 1.0 for field in FIELD_BOOSTS}
+
+    def _term_scores(self, postings, averages):
+        # 一个词对包含它的各文档贡献的 BM25F 得分
+        total_docs = len(self._docs)
+        idf = math.log(1 + (total_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+        for doc_id, field_counts in postings.items():
+            lengths = self._doc_lengths[doc_id]
+            weighted = 0.0
+            for field, count in field_counts.items():
+                norm = 1 - B + B * lengths[field] / averages[field]
+                weighted += FIELD_BOOSTS[field] * count / norm
+            yield doc_id, idf * weighted / (K1 + weighted)
+
+    def search(self, query):
+        """返回 [(得分, 文章), ...]，按得分降序"""
+        tokens = set(tokenize(query))
+        with self._lock:
+            if not tokens or not self._docs:
+                return []
+            averages = self._averages()
+            scores = defaultdict(float)
+            for token in tokens:
+                postings = self._postings.get(token)
+                if not postings:
+                    continue
+                for doc_id, score in self._term_scores(postings, averages):
+                    scores[doc_id] += score
+            results = [(score, self._docs[doc_id]) for doc_id, score in scores.items()]
+        results.sort(key=lambda item: (-item[0], item[1]['filename']))
+        return results
+
+    def export(self, precision=4):
+        """导出预先算好得分的倒排表，供静态站点在浏览器端检索
+
+        返回 {'docs': [文章, ...], 'terms': {词: [[文档序号, 得分], ...]}}；
+        查询时按 tokenize() 切词，把各词的得分相加即与 search() 的排序一致。
+        """
+        with self._lock:
+            doc_ids = sorted(self._docs, key=lambda doc_id: (self._docs[doc_id]['filename'], doc_id))
+            positions = {doc_id: position for position, doc_id in enumerate(doc_ids)}
+            averages = self._averages() if self._docs else {}
+            terms = {}
+            for token in sorted(self._postings):
+                terms[token] = sorted(
+                    [positions[doc_id], round(score, precision)]
+                    for doc_id, score in self._term_scores(self._postings[token], averages)
+                )
+            return {'docs': [self._docs[doc_id] for doc_id in doc_ids], 'terms': terms}
+
+
+def query_terms(query):
+    """用于高亮的查询词：完整的查询片段及其分词结果"""
+    terms = [match.group() for match in TOKEN_RE.finditer(query.lower())]
+    for token in tokenize(query):
+        if token not in terms:
+            terms.append(token)
+    return terms
@@ -0,0 +1,139 @@
+import os
+import copy
+import json
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import namedtuple
+from datetime import datetime, timezone
+
+try:
+    import fcntl
+except ImportError:  # Windows 开发环境只跑单个进程，不需要文件锁
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# settings 与 public 为只读快照，调用方不能修改；digest / last_modified 用于条件请求
+SettingsSnapshot = namedtuple('SettingsSnapshot', 'settings public digest last_modified ident')
+
+
+class SettingsStore:
+    """网站设置服务
+
+    读取返回进程内的只读快照，最多每 min_interval 秒 stat 一次文件，(mtime, size, inode)
+    变化（其他 worker 写入）后才重新读取。写入持有进程内锁和文件锁，在锁内重新读取磁盘上的
+    最新内容再合并，写临时文件后 os.replace 原子替换，读者不会看到写了一半的文件。
+    """
+
+    def __init__(self, path, defaults, public_keys=(), min_interval=0.5):
+        self.path = path
+        self.defaults = defaults
+        self.public_keys = tuple(public_keys)
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._last_check = None
+
+    def snapshot(self):
+        """当前设置的只读快照"""
+        now = time.monotonic()
+        snapshot = self._snapshot
+        if snapshot is not None and now - self._last_check < self.min_interval:
+            return snapshot
+        with self._lock:
+            self._last_check = now
+            ident = self._stat()
+            if self._snapshot is None or ident != self._snapshot.ident:
+                try:
+                    self._snapshot = self._load(ident)
+                except ValueError:
+                    # 文件被外部编辑成不合法的 JSON 时继续使用上一份快照
+                    logger.exception('Failed to load settings from %s', self.path)
+                    if self._snapshot is None:
+                        self._snapshot = self._load(None, missing=True)
+            return self._snapshot
+
+    def update(self, data):
+        """合并顶层字段并写入，返回更新后的全部设置（副本）"""
+        def change(current):
+            current.update(data)
+            current['updated_at'] = datetime.now().isoformat()
+            # 返回本次写入的内容，而不是之后可能已被其他线程替换的快照
+            return copy.deepcopy(current)
+
+        return self.modify(change)
+
+    def modify(self, change):
+        """在锁内读取磁盘上的最新内容，交给 change(当前内容) 原地修改后写入，返回 change 的返回值
+
+        change 抛出异常时不写入。
+        """
+        with self._lock:
+            fd = self._acquire()
+            try:
+                current = self._read()
+                current = copy.deepcopy(current) if current is not None else {}
+                result = change(current)
+                self._write(current)
+                self._snapshot = self._load(self._stat())
+                self._last_check = time.monotonic()
+            finally:
+                self._release(fd)
+        return result
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    def _read(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _load(self, ident, missing=False):
+        settings = None if missing else self._read()
+        if settings is None:
+            settings = copy.deepcopy(self.defaults)
+        public = {key: settings[key] for key in self.public_keys if key in settings}
+        body = json.dumps(settings, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')
+        last_modified = datetime.fromtimestamp(ident[0] / 1e9, timezone.utc) if ident else None
+        return SettingsSnapshot(settings, public, hashlib.sha1(body).hexdigest(), last_modified, ident)
+
+    def _write(self, settings):
+        directory = os.path.dirname(self.path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(settings, f, ensure_ascii=False, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def _acquire(self):
+        # 跨 worker 的写锁，保证读-改-写不丢失其他 worker 的修改
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        fd = os.open(f'{self.path}.lock', os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        return fd
+
+    def _release(self, fd):
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
@@ -0,0 +1,425 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from datetime import datetime, timezone
+
+from utils.post_catalog import load_posts, load_post_safely
+from utils.search_index import tokenize
+from utils.facet_index import post_tags
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS catalog_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS catalog_file (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS catalog_post (
+    path TEXT PRIMARY KEY REFERENCES catalog_file(path) ON DELETE CASCADE,
+    slug TEXT NOT NULL,
+    title TEXT,
+    date TEXT,
+    summary TEXT,
+    category TEXT,
+    author_id TEXT,
+    author_name TEXT,
+    tags TEXT,
+    metadata TEXT,
+    content TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_catalog_post_slug ON catalog_post (slug);
+CREATE INDEX IF NOT EXISTS idx_catalog_post_date ON catalog_post (date, slug);
+CREATE INDEX IF NOT EXISTS idx_catalog_post_title ON catalog_post (title, slug);
+CREATE INDEX IF NOT EXISTS idx_catalog_post_category ON catalog_post (category, date);
+CREATE INDEX IF NOT EXISTS idx_catalog_post_author ON catalog_post (author_id, date);
+CREATE TABLE IF NOT EXISTS catalog_post_tag (
+    path TEXT NOT NULL REFERENCES catalog_post(path) ON DELETE CASCADE,
+    tag TEXT NOT NULL,
+    PRIMARY KEY (path, tag)
+);
+CREATE INDEX IF NOT EXISTS idx_catalog_post_tag_tag ON catalog_post_tag (tag, path);
+CREATE VIRTUAL TABLE IF NOT EXISTS catalog_post_fts USING fts5(
+    path UNINDEXED, title, tags, category, content
+);
+"""
+
+POST_COLUMNS = 'p.path, p.slug, p.title, p.date, p.summary, p.author_id, p.author_name, p.tags, p.metadata'
+SORT_COLUMNS = {'date': 'p.date', 'title': 'p.title'}
+# bm25() 的列权重，与 search_index.FIELD_BOOSTS 一致（path 列不参与）
+FTS_WEIGHTS = '0.0, 3.0, 2.5, 2.0, 1.0'
+
+
+def _fts_text(text):
+    # 预先用 search_index 的分词器切分（中文二元组），FTS5 只按空白拆分
+    return ' '.join(tokenize(text or ''))
+
+
+def _json_default(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+
+class SqliteCatalog:
+    """把 content/ 镜像到 SQLite 的文章目录
+
+    多个 gunicorn worker 共享同一个数据库文件：同步时只对 (mtime, size) 变化的文件
+    重新解析并 upsert，列表、过滤、聚合和全文搜索都是带索引的查询。
+    """
+
+    def __init__(self, db_path, content_dir='content', min_interval=1.0, renderer=None, workers=0):
+        self.db_path = db_path
+        self.content_dir = content_dir
+        self.min_interval = min_interval
+        self.renderer = renderer
+        self.workers = workers
+        self._local = threading.local()
+        self._last_sync = None
+        self._schema_ready = False
+        self._schema_lock = threading.Lock()
+        if hasattr(os, 'register_at_fork'):
+            # 连接不能跨进程使用，fork 出的子进程（进程池、gunicorn --preload）重新连接
+            os.register_at_fork(after_in_child=self._reset_connections)
+
+    def _reset_connections(self):
+        self._local = threading.local()
+
+    def connect(self):
+        """当前线程的数据库连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA foreign_keys=ON')
+            with self._schema_lock:
+                if not self._schema_ready:
+                    conn.executescript(SCHEMA)
+                    self._schema_ready = True
+            self._local.conn = conn
+        return conn
+
+    def sync(self, force=False):
+        """增量同步 content/ 到数据库，返回 (新增或更新数, 删除数)"""
+        now = time.monotonic()
+        if not force and self._last_sync is not None and now - self._last_sync < self.min_interval:
+            return 0, 0
+        self._last_sync = now
+
+        stats, latest = self._scan()
+        conn = self.connect()
+        # 先在写事务之外（可多进程并行）解析变化的文件，避免长时间持有写锁
+        stored = self._stored(conn)
+        loaded = dict(load_posts(
+            self.content_dir,
+            [path for path, ident in stats.items() if stored.get(path) != ident],
+            self.renderer,
+            self.workers
+        ))
+        # BEGIN IMMEDIATE 保证同一时间只有一个 worker 在写
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            stored = self._stored(conn)
+            changed = [path for path, ident in stats.items() if stored.get(path) != ident]
+            removed = [path for path in stored if path not in stats]
+
+            for path in removed:
+                conn.execute('DELETE FROM catalog_post_fts WHERE path = ?', (path,))
+                conn.execute('DELETE FROM catalog_file WHERE path = ?', (path,))
+            for path in changed:
+                if path in loaded:
+                    post = loaded[path]
+                else:
+                    post = load_post_safely(self.content_dir, path, self.renderer)
+                self._upsert(conn, path, stats[path], post)
+
+            if changed or removed:
+                self._update_meta(conn, latest)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return len(changed), len(removed)
+
+    def update_paths(self, rel_paths):
+        """只同步给定文件（相对 content/ 的路径），写入文章后使用，不扫描整个目录
+
+        全部变化在一个事务中提交，返回 (新增或更新数, 删除数)。
+        """
+        stats = {}
+        latest = 0
+        for path in rel_paths:
+            try:
+                st = os.stat(os.path.join(self.content_dir, path))
+            except FileNotFoundError:
+                continue
+            stats[path] = (st.st_mtime_ns, st.st_size)
+            latest = max(latest, st.st_mtime_ns)
+        loaded = dict(load_posts(self.content_dir, list(stats), self.renderer, self.workers))
+        conn = self.connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            stored = self._stored(conn)
+            changed = [path for path, ident in stats.items() if stored.get(path) != ident]
+            removed = [path for path in rel_paths if path not in stats and path in stored]
+            for path in removed:
+                conn.execute('DELETE FROM catalog_post_fts WHERE path = ?', (path,))
+                conn.execute('DELETE FROM catalog_file WHERE path = ?', (path,))
+            for path in changed:
+                self._upsert(conn, path, stats[path], loaded.get(path))
+            if changed or removed:
+                latest = max(latest, int(self._meta(conn, 'last_modified') or 0))
+                self._update_meta(conn, latest)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return len(changed), len(removed)
+
+    def _scan(self):
+        stats = {}
+        latest = 0
+        for root, dirs, files in os.walk(self.content_dir):
+            try:
+                latest = max(latest, os.stat(root).st_mtime_ns)
+            except FileNotFoundError:
+                continue
+            for name in files:
+                if not name.endswith('.md'):
+                    continue
+                file_path = os.path.join(root, name)
+                try:
+                    st = os.stat(file_path)
+                except FileNotFoundError:
+                    continue
+                stats[os.path.relpath(file_path, self.content_dir)] = (st.st_mtime_ns, st.st_size)
+                latest = max(latest, st.st_mtime_ns)
+        return stats, latest
+
+    def _stored(self, conn):
+        return {row['path']: (row['mtime_ns'], row['size'])
+                for row in conn.execute('SELECT path, mtime_ns, size FROM catalog_file')}
+
+    def _upsert(self, conn, path, ident, post):
+        conn.execute('DELETE FROM catalog_post_fts WHERE path = ?', (path,))
+        conn.execute('DELETE FROM catalog_post WHERE path = ?', (path,))
+        conn.execute(
+            'INSERT INTO catalog_file (path, mtime_ns, size) VALUES (?, ?, ?) '
+            'ON CONFLICT(path) DO UPDATE SET mtime_ns = excluded.mtime_ns, size = excluded.size',
+            (path, ident[0], ident[1])
+        )
+        if post is None:
+            # 解析失败的文件只记录 stat，文件变化后再重试
+            return
+
+        metadata = post['metadata']
+        tags = post_tags(post)
+        category = metadata.get('category')
+        conn.execute(
+            'INSERT INTO catalog_post (path, slug, title, date, summary, category, author_id, author_name, '
+            'tags, metadata, content) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (
+                path, post['filename'], post['title'], _json_default(post['date']), post['summary'],
+                str(category) if category else None,
+                str(post['author_id']) if post['author_id'] is not None else None,
+                post['author_name'], json.dumps(post['tags'], ensure_ascii=False, default=_json_default),
+                json.dumps(metadata, ensure_ascii=False, default=_json_default), post['content']
+            )
+        )
+        conn.executemany('INSERT INTO catalog_post_tag (path, tag) VALUES (?, ?)', [(path, tag) for tag in tags])
+        conn.execute(
+            'INSERT INTO catalog_post_fts (path, title, tags, category, content) VALUES (?, ?, ?, ?, ?)',
+            (path, _fts_text(str(post['title'] or '')), _fts_text(' '.join(tags)),
+             _fts_text(str(category or '')), _fts_text(post['content']))
+        )
+
+    def _update_meta(self, conn, latest):
+        # 与 PostCatalog 相同的摘要算法，两种后端对同一份内容给出相同的 ETag
+        digest = hashlib.sha1()
+        for row in conn.execute('SELECT path, mtime_ns, size FROM catalog_file ORDER BY path'):
+            digest.update(f"{row['path']}:{row['mtime_ns']}:{row['size']}\n".encode('utf-8'))
+        generation = int(self._meta(conn, 'generation') or 0) + 1
+        conn.executemany('INSERT OR REPLACE INTO catalog_meta (key, value) VALUES (?, ?)', [
+            ('generation', str(generation)),
+            ('digest', digest.hexdigest()),
+            ('last_modified', str(latest))
+        ])
+
+    def _meta(self, conn, key):
+        row = conn.execute('SELECT value FROM catalog_meta WHERE key = ?', (key,)).fetchone()
+        return row['value'] if row else None
+
+    @property
+    def generation(self):
+        return int(self._meta(self.connect(), 'generation') or 0)
+
+    def validators(self):
+        """(摘要, 最后修改时间)，用于 ETag / Last-Modified"""
+        self.sync()
+        conn = self.connect()
+        digest = self._meta(conn, 'digest') or hashlib.sha1(b'').hexdigest()
+        latest = int(self._meta(conn, 'last_modified') or 0)
+        return digest, datetime.fromtimestamp(latest / 1e9, timezone.utc) if latest else None
+
+    def post_validators(self, slug):
+        self.sync()
+        row = self.connect().execute(
+            'SELECT f.path, f.mtime_ns, f.size FROM catalog_post p JOIN catalog_file f ON f.path = p.path '
+            'WHERE p.slug = ? ORDER BY p.path LIMIT 1', (slug,)
+        ).fetchone()
+        if row is None:
+            return None
+        digest = hashlib.sha1(f"{row['path']}:{row['mtime_ns']}:{row['size']}".encode('utf-8')).hexdigest()
+        return digest, datetime.fromtimestamp(row['mtime_ns'] / 1e9, timezone.utc)
+
+    def _row_to_post(self, row, with_body=False):
+        metadata = json.loads(row['metadata'])
+        date = datetime.fromisoformat(row['date']) if row['date'] else None
+        if 'date' in metadata:
+            metadata['date'] = date
+        post = {
+            'filename': row['slug'],
+            'title': row['title'],
+            'date': date,
+            'summary': row['summary'],
+            'metadata': metadata,
+            'tags': json.loads(row['tags']),
+            'author_id': metadata.get('author_id'),
+            'author_name': row['author_name']
+        }
+        if with_body:
+            post['content'] = row['content']
+        return post
+
+    def resolve(self, slug):
+        """filename 对应的文件相对路径"""
+        self.sync()
+        row = self.connect().execute(
+            'SELECT path FROM catalog_post WHERE slug = ? ORDER BY path LIMIT 1', (slug,)
+        ).fetchone()
+        return row['path'] if row else None
+
+    def get(self, slug):
+        """按 filename 取单篇文章（含正文）；冲突时取路径字典序最小者"""
+        self.sync()
+        row = self.connect().execute(
+            f'SELECT {POST_COLUMNS}, p.content FROM catalog_post p WHERE p.slug = ? ORDER BY p.path LIMIT 1',
+            (slug,)
+        ).fetchone()
+        return self._row_to_post(row, with_body=True) if row else None
+
+    def _where(self, tag=None, category=None, author_id=None, date_from=None, date_to=None):
+        clauses = []
+        params = []
+        if tag:
+            clauses.append('p.path IN (SELECT path FROM catalog_post_tag WHERE tag = ?)')
+            params.append(tag)
+        if category:
+            clauses.append('p.category = ?')
+            params.append(category)
+        if author_id:
+            clauses.append('p.author_id = ?')
+            params.append(author_id)
+        if date_from:
+            clauses.append('p.date >= ?')
+            params.append(date_from.isoformat())
+        if date_to:
+            clauses.append('p.date < ?')
+            params.append(date_to.isoformat())
+        return clauses, params
+
+    def paths(self, tag=None, category=None):
+        """带某个标签或分类的文章的相对路径（按索引查找）"""
+        self.sync()
+        clauses, params = self._where(tag=tag, category=category)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        return [row['path'] for row in self.connect().execute(f'SELECT p.path FROM catalog_post p {where}', params)]
+
+    def query_posts(self, sort='date', desc=True, limit=20, offset=0, after=None, with_body=False, **filters):
+        """带过滤、排序和分页的文章查询，返回 (总数, 文章列表)
+
+        after 为游标解出的 (排序值, filename)，按键集分页。limit 为 None 时返回全部。
+        """
+        self.sync()
+        conn = self.connect()
+        clauses, params = self._where(**filters)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        total = conn.execute(f'SELECT COUNT(*) FROM catalog_post p {where}', params).fetchone()[0]
+
+        column = SORT_COLUMNS[sort]
+        direction = 'DESC' if desc else 'ASC'
+        page_clauses = list(clauses)
+        page_params = list(params)
+        if after is not None:
+            page_clauses.append(f"({column}, p.slug) {'<' if desc else '>'} (?, ?)")
+            page_params.extend(after)
+        where = f"WHERE {' AND '.join(page_clauses)}" if page_clauses else ''
+        columns = POST_COLUMNS + (', p.content' if with_body else '')
+        sql = f'SELECT {columns} FROM catalog_post p {where} ORDER BY {column} {direction}, p.slug {direction}'
+        if limit is not None:
+            sql += ' LIMIT ? OFFSET ?'
+            page_params.extend([limit, offset])
+        return total, self._iter_rows(conn.execute(sql, page_params), with_body)
+
+    def _iter_rows(self, cursor, with_body):
+        # 游标逐行读取，流式导出时不会一次性载入全部结果
+        for row in cursor:
+            yield self._row_to_post(row, with_body)
+
+    def tag_counts(self):
+        self.sync()
+        return {row['tag']: row['n'] for row in self.connect().execute(
+            'SELECT tag, COUNT(*) AS n FROM catalog_post_tag GROUP BY tag'
+        )}
+
+    def tag_references(self):
+        """{标签: [filename, ...]}，每个标签下按日期倒序"""
+        self.sync()
+        references = {}
+        for row in self.connect().execute(
+            'SELECT t.tag, p.slug FROM catalog_post_tag t JOIN catalog_post p ON p.path = t.path '
+            'ORDER BY t.tag, p.date DESC, p.slug DESC'
+        ):
+            references.setdefault(row['tag'], []).append(row['slug'])
+        return references
+
+    def month_counts(self):
+        """{'YYYY-MM': 文章数}"""
+        self.sync()
+        return {row['month']: row['n'] for row in self.connect().execute(
+            'SELECT substr(date, 1, 7) AS month, COUNT(*) AS n FROM catalog_post '
+            'WHERE date IS NOT NULL GROUP BY month'
+        )}
+
+    def category_counts(self):
+        self.sync()
+        return {row['category']: row['n'] for row in self.connect().execute(
+            'SELECT category, COUNT(*) AS n FROM catalog_post WHERE category IS NOT NULL GROUP BY category'
+        )}
+
+    def search(self, query, limit=20, offset=0):
+        """FTS5 全文搜索，bm25 排序，返回 (总数, [(得分, 文章含正文), ...])"""
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return 0, []
+        self.sync()
+        conn = self.connect()
+        match = ' OR '.join('"{}"'.format(token.replace('"', '""')) for token in tokens)
+        total = conn.execute(
+            'SELECT COUNT(*) FROM catalog_post_fts WHERE catalog_post_fts MATCH ?', (match,)
+        ).fetchone()[0]
+        rows = conn.execute(
+            f'SELECT {POST_COLUMNS}, p.content, -bm25(catalog_post_fts, {FTS_WEIGHTS}) AS score '
+            'FROM catalog_post_fts f JOIN catalog_post p ON p.path = f.path '
+            'WHERE catalog_post_fts MATCH ? ORDER BY score DESC, p.slug LIMIT ? OFFSET ?',
+            (match, limit, offset)
+        )
+        return total, [(row['score'], self._row_to_post(row, with_body=True)) for row in rows]
@@ -0,0 +1,174 @@
+import os
+import json
+import hashlib
+import logging
+import tempfile
+import itertools
+import multiprocessing
+from urllib.parse import quote
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = '.export-manifest.json'
+
+# 进程池子进程中使用的应用与站点根 URL，fork 前设置
+_export_app = None
+_export_base_url = None
+
+
+def safe_name(value):
+    """能否直接用作静态文件名"""
+    return bool(value) and value not in ('.', '..') and '/' not in value and '\\' not in value and '\0' not in value
+
+
+def _get_json(client, url, base_url):
+    response = client.get(url, base_url=base_url)
+    if response.status_code != 200:
+        raise RuntimeError(f'GET {url} returned {response.status_code}')
+    return response.get_json()
+
+
+def _pages(path, url, pages):
+    """分页列表：第 n 页写入 path/page/n.json"""
+    separator = '&' if '?' in url else '?'
+    return [(f'{path}/page/{page}.json', f'{url}{separator}page={page}') for page in range(1, max(pages, 1) + 1)]
+
+
+def collect_jobs(client, base_url):
+    """通过 API 本身列出需要导出的 (文件相对路径, 请求 URL)"""
+    jobs = [
+        ('api/posts.json', '/api/posts'),
+        ('api/tags.json', '/api/tags'),
+        ('api/archive.json', '/api/archive'),
+        ('api/pygments.css', '/api/pygments.css'),
+        ('feed.xml', '/feed.xml'),
+        ('atom.xml', '/atom.xml'),
+        ('feed.json', '/feed.json')
+    ]
+    jobs += _pages('api/posts', '/api/posts', _get_json(client, '/api/posts', base_url)['pages'])
+
+    response = client.get('/api/posts?format=ndjson&fields=filename', base_url=base_url)
+    for line in response.get_data(as_text=True).splitlines():
+        filename = json.loads(line)['filename']
+        if not safe_name(filename):
+            logger.warning('Skipping post with unsafe filename %r', filename)
+            continue
+        jobs.append((f'api/posts/{filename}.json', f'/api/posts/{quote(filename, safe="")}?include=html,toc'))
+
+    for tag in _get_json(client, '/api/tags', base_url)['tags']:
+        if not safe_name(tag):
+            logger.warning('Skipping tag with unsafe name %r', tag)
+            continue
+        # 文件名保留原始标签，请求 URL 需要转义（如 ? 与 #）
+        quoted = quote(tag, safe='')
+        first = _get_json(client, f'/api/tags/{quoted}', base_url)
+        jobs += _pages(f'api/tags/{tag}', f'/api/tags/{quoted}', first['pages'])
+        jobs.append((f'tags/{tag}/feed.xml', f'/tags/{quoted}/feed.xml'))
+
+    for bucket in _get_json(client, '/api/archive', base_url)['years']:
+        year = bucket['year']
+        first = _get_json(client, f'/api/archive?year={year}', base_url)
+        jobs += _pages(f'api/archive/{year}', f'/api/archive?year={year}', first['pages'])
+        for item in bucket['months']:
+            month = item['month']
+            first = _get_json(client, f'/api/archive?year={year}&month={month}', base_url)
+            jobs += _pages(f'api/archive/{year}/{month}', f'/api/archive?year={year}&month={month}', first['pages'])
+    return jobs
+
+
+def _render_batch(app, base_url, batch, previous):
+    client = app.test_client()
+    results = []
+    for path, url in batch:
+        response = client.get(url, base_url=base_url)
+        if response.status_code != 200:
+            raise RuntimeError(f'GET {url} returned {response.status_code}')
+        body = response.get_data()
+        digest = hashlib.sha256(body).hexdigest()
+        # 内容哈希未变的文件不传回父进程，也不会重写
+        results.append((path, digest, None if previous.get(path) == digest else body))
+    return results
+
+
+def _render_batch_in_worker(batch, previous):
+    return _render_batch(_export_app, _export_base_url, batch, previous)
+
+
+def _write(output, path, body):
+    target = os.path.join(output, *path.split('/'))
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(body)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, target)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def export_site(app, output, base_url='http://localhost/', workers=0, batch_size=32, extra_files=None):
+    """把公开只读 API 预先渲染为静态文件，返回 {'written', 'unchanged', 'removed'}
+
+    只重写内容哈希变化的文件（记录在 .export-manifest.json 中），删除已不存在的页面；
+    workers > 1 且支持 fork 时按批分给进程池渲染。extra_files 为额外写入的 {相对路径: bytes}。
+    """
+    global _export_app, _export_base_url
+    manifest_path = os.path.join(output, MANIFEST)
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+    except (OSError, ValueError):
+        previous = {}
+    # 文件被手动删除时重新写入
+    previous = {path: digest for path, digest in previous.items()
+                if os.path.exists(os.path.join(output, *path.split('/')))}
+
+    jobs = sorted(set(collect_jobs(app.test_client(), base_url)))
+    batches = [jobs[i:i + batch_size] for i in range(0, len(jobs), batch_size)]
+    if workers > 1 and len(batches) > 1 and 'fork' in multiprocessing.get_all_start_methods():
+        # 子进程通过 fork 继承已加载的应用和文章目录，不需要重新解析
+        _export_app, _export_base_url = app, base_url
+        try:
+            with ProcessPoolExecutor(
+                max_workers=min(workers, len(batches)),
+                mp_context=multiprocessing.get_context('fork')
+            ) as executor:
+                results = list(itertools.chain.from_iterable(
+                    executor.map(_render_batch_in_worker, batches, itertools.repeat(previous))
+                ))
+        finally:
+            _export_app = _export_base_url = None
+    else:
+        results = list(itertools.chain.from_iterable(
+            _render_batch(app, base_url, batch, previous) for batch in batches
+        ))
+
+    for path, body in (extra_files or {}).items():
+        digest = hashlib.sha256(body).hexdigest()
+        results.append((path, digest, None if previous.get(path) == digest else body))
+
+    manifest = {}
+    written = 0
+    for path, digest, body in results:
+        manifest[path] = digest
+        if body is not None:
+            _write(output, path, body)
+            written += 1
+
+    removed = 0
+    for path in previous:
+        if path not in manifest:
+            try:
+                os.remove(os.path.join(output, *path.split('/')))
+                removed += 1
+            except FileNotFoundError:
+                pass
+
+    _write(output, MANIFEST, json.dumps(manifest, indent=0, sort_keys=True).encode('utf-8'))
+    return {'written': written, 'unchanged': len(manifest) - written, 'removed': removed}
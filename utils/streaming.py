@@ -0,0 +1,34 @@
+from flask import request, current_app, Response
+
+STREAM_FORMATS = ('ndjson', 'json-stream')
+
+
+def stream_format():
+    """请求的流式格式：?format=ndjson|json-stream 或 Accept: application/x-ndjson"""
+    fmt = request.args.get('format')
+    if fmt in STREAM_FORMATS:
+        return fmt
+    if request.accept_mimetypes.best == 'application/x-ndjson':
+        return 'ndjson'
+    return None
+
+
+def stream_records(records, fmt, transform=None):
+    """逐条序列化并发送记录，不在内存中拼出完整的 JSON
+
+    ndjson 每行一条记录；json-stream 以分块传输发送一个 JSON 数组。
+    """
+    dumps = current_app.json.dumps
+
+    def generate():
+        if fmt == 'ndjson':
+            for record in records:
+                yield dumps(transform(record) if transform else record) + '\n'
+            return
+        yield '['
+        for index, record in enumerate(records):
+            yield (',' if index else '') + dumps(transform(record) if transform else record)
+        yield ']'
+
+    mimetype = 'application/x-ndjson' if fmt == 'ndjson' else 'application/json'
+    return Response(generate(), mimetype=mimetype)
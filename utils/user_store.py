@@ -0,0 +1,185 @@
+import os
+import math
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS user_meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO user_meta (key, value) VALUES ('version', 0);
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    username TEXT NOT NULL UNIQUE,
+    password_hash TEXT NOT NULL,
+    email TEXT,
+    role TEXT NOT NULL DEFAULT 'user',
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_users_role ON users (role, created_at);
+CREATE INDEX IF NOT EXISTS idx_users_created ON users (created_at, id);
+"""
+
+USER_COLUMNS = 'id, username, password_hash, email, role, created_at'
+
+
+class UserExists(ValueError):
+    """用户名或 id 已存在"""
+
+
+class UserStore:
+    """SQLite 用户表，多个 gunicorn worker 共享 instance/ 下的同一个数据库
+
+    id 与 username 均有唯一索引。按用户名 / id 的查找经过进程内的读缓存，
+    每次写入都会在同一事务中递增 user_meta.version。缓存最多每 min_interval 秒
+    查询一次版本号，发现变化即整体失效，其他 worker 的修改在 min_interval 秒内可见；
+    本进程的写入立即清空缓存。
+    """
+
+    def __init__(self, db_path, cache_size=1024, min_interval=0.5):
+        self.db_path = db_path
+        self.cache_size = cache_size
+        self.min_interval = min_interval
+        self._local = threading.local()
+        self._schema_ready = False
+        self._schema_lock = threading.Lock()
+        self._cache_lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._cache_version = None
+        self._last_check = None
+        if hasattr(os, 'register_at_fork'):
+            # 连接不能跨进程使用，fork 出的子进程重新连接
+            os.register_at_fork(after_in_child=self._reset_connections)
+
+    def _reset_connections(self):
+        self._local = threading.local()
+
+    def connect(self):
+        """当前线程的数据库连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            with self._schema_lock:
+                if not self._schema_ready:
+                    conn.executescript(SCHEMA)
+                    self._schema_ready = True
+            self._local.conn = conn
+        return conn
+
+    def version(self):
+        """共享的写入版本号"""
+        return self.connect().execute("SELECT value FROM user_meta WHERE key = 'version'").fetchone()[0]
+
+    def _cached(self, key, load):
+        now = time.monotonic()
+        with self._cache_lock:
+            version = self._cache_version
+            stale = version is None or now - self._last_check >= self.min_interval
+        if stale:
+            version = self.version()
+        with self._cache_lock:
+            if stale:
+                self._last_check = now
+                if version != self._cache_version:
+                    self._cache.clear()
+                    self._cache_version = version
+            if version == self._cache_version and key in self._cache:
+                self._cache.move_to_end(key)
+                user = self._cache[key]
+                return dict(user) if user is not None else None
+        user = load()
+        with self._cache_lock:
+            # 加载期间版本可能已变化，只缓存与当前版本一致的结果
+            if version == self._cache_version:
+                self._cache[key] = user
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return dict(user) if user is not None else None
+
+    def _fetch(self, column, value):
+        row = self.connect().execute(
+            f'SELECT {USER_COLUMNS} FROM users WHERE {column} = ?', (value,)
+        ).fetchone()
+        return dict(row) if row is not None else None
+
+    def get_by_username(self, username):
+        return self._cached(('username', username), lambda: self._fetch('username', username))
+
+    def get_by_id(self, user_id):
+        return self._cached(('id', user_id), lambda: self._fetch('id', user_id))
+
+    def _write(self, sql, params):
+        conn = self.connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            cursor = conn.execute(sql, params)
+            if cursor.rowcount:
+                conn.execute("UPDATE user_meta SET value = value + 1 WHERE key = 'version'")
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        if cursor.rowcount:
+            with self._cache_lock:
+                # 本进程的修改立即生效，下次读取时重新查询版本号
+                self._cache.clear()
+                self._cache_version = None
+        return cursor.rowcount
+
+    def create(self, user):
+        """新增用户（dict，字段同 users 表），用户名或 id 重复时抛出 UserExists"""
+        try:
+            self._write(
+                f'INSERT INTO users ({USER_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)',
+                (user['id'], user['username'], user['password_hash'], user.get('email'),
+                 user.get('role', 'user'), user['created_at'])
+            )
+        except sqlite3.IntegrityError:
+            raise UserExists(user['username'])
+        return dict(user)
+
+    def ensure(self, user):
+        """用户名不存在时新增，用于初始化管理员账号"""
+        try:
+            self.create(user)
+        except UserExists:
+            pass
+
+    def update_role(self, user_id, role):
+        """修改角色，返回更新后的用户；用户不存在时返回 None"""
+        if not self._write('UPDATE users SET role = ? WHERE id = ?', (role, user_id)):
+            return None
+        return self.get_by_id(user_id)
+
+    def delete(self, user_id):
+        """删除用户，返回是否存在"""
+        return bool(self._write('DELETE FROM users WHERE id = ?', (user_id,)))
+
+    def list_users(self, page=1, per_page=20, q=None, role=None):
+        """按创建时间分页列出用户，返回 (用户列表, 总数, 页数)
+
+        q 按用户名或邮箱子串过滤，role 按角色过滤。
+        """
+        clauses, params = [], []
+        if q:
+            pattern = '%' + q.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            clauses.append("(username LIKE ? ESCAPE '\\' OR email LIKE ? ESCAPE '\\')")
+            params.extend([pattern, pattern])
+        if role:
+            clauses.append('role = ?')
+            params.append(role)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        conn = self.connect()
+        total = conn.execute(f'SELECT COUNT(*) FROM users {where}', params).fetchone()[0]
+        pages = max(1, math.ceil(total / per_page))
+        rows = conn.execute(
+            f'SELECT {USER_COLUMNS} FROM users {where} ORDER BY created_at, id LIMIT ? OFFSET ?',
+            params + [per_page, (page - 1) * per_page]
+        )
+        return [dict(row) for row in rows], total, pages